@@ -0,0 +1,121 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticAnswerCache:
+    """Answers to recent queries, reused for later queries whose embeddings are close enough.
+
+    A lookup scores the query embedding against every cached query with the same retrieval scope
+    (k and filters) and returns the best answer at or above ``threshold`` cosine similarity.
+    Entries are evicted least-recently-used beyond ``max_entries`` and expire after ``ttl_seconds``.
+    Every entry is dropped as soon as the vector store's content version changes.
+    """
+
+    def __init__(self, dimension: int, max_entries: int = 1024, ttl_seconds: float = 1800.0, threshold: float = 0.95):
+        self.dimension = dimension
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.seconds_saved = 0.0
+
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        # Entry slot -> (scope, created, answer, seconds the answer took to compute), in LRU order.
+        self._entries: "OrderedDict[int, Tuple[str, float, Dict, float]]" = OrderedDict()
+        self._vectors = np.zeros((max_entries, dimension), dtype="float32")
+        self._free = list(range(max_entries - 1, -1, -1))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def scope(k: int, filters: Optional[Dict]) -> str:
+        return json.dumps([k, filters or {}], sort_keys=True, default=str)
+
+    @staticmethod
+    def _normalize(vector: np.ndarray) -> np.ndarray:
+        vector = np.asarray(vector, dtype="float32").reshape(-1)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def _check_version(self, version: int) -> bool:
+        """Drop every entry if the store moved past the cached version; False if ``version`` is already stale."""
+        if self._version is not None and version < self._version:
+            return False
+        if self._version != version:
+            if self._entries:
+                logger.info(f"Vector store changed; dropping {len(self._entries)} cached answers.")
+                self.invalidations += 1
+            self._clear()
+            self._version = version
+        return True
+
+    def _clear(self) -> None:
+        self._free.extend(self._entries)
+        self._entries.clear()
+
+    def get(self, vector: np.ndarray, scope: str, version: int) -> Optional[Dict]:
+        """A copy of the closest cached answer in ``scope``, or None on a miss."""
+        query = self._normalize(vector)
+        now = time.monotonic()
+        with self._lock:
+            if not self._check_version(version):
+                self.misses += 1
+                return None
+            for slot in [slot for slot, entry in self._entries.items() if now - entry[1] > self.ttl_seconds]:
+                del self._entries[slot]
+                self._free.append(slot)
+
+            slots = [slot for slot, entry in self._entries.items() if entry[0] == scope]
+            if slots:
+                scores = self._vectors[slots] @ query
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    slot = slots[best]
+                    self._entries.move_to_end(slot)
+                    _, _, answer, seconds = self._entries[slot]
+                    self.hits += 1
+                    self.seconds_saved += seconds
+                    cached = dict(answer)
+                    cached["cache_similarity"] = float(scores[best])
+                    return cached
+
+            self.misses += 1
+            return None
+
+    def put(self, vector: np.ndarray, scope: str, version: int, answer: Dict, seconds: float) -> None:
+        """Store an answer computed against store ``version``, which took ``seconds`` to produce."""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            # An answer computed while the store was being updated may already be out of date.
+            if not self._check_version(version):
+                return
+            if not self._free:
+                slot, _ = self._entries.popitem(last=False)
+                self._free.append(slot)
+            slot = self._free.pop()
+            self._vectors[slot] = self._normalize(vector)
+            self._entries[slot] = (scope, time.monotonic(), answer, seconds)
+
+    def get_stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "answer_cache_hits": self.hits,
+            "answer_cache_misses": self.misses,
+            "answer_cache_hit_rate": self.hits / lookups if lookups else 0.0,
+            "answer_cache_entries": len(self),
+            "answer_cache_invalidations": self.invalidations,
+            "answer_cache_seconds_saved": self.seconds_saved,
+        }
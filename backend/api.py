@@ -1,7 +1,9 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, List, Dict
+from typing import Any, Optional, List, Dict
+import json
 import logging
 import sys
 import os
@@ -13,6 +15,7 @@ os.chdir(project_root)
 
 from rag_system import RAGSystem
 from config import Config
+from facet_index import parse_filters
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -61,10 +64,13 @@ def get_rag_system() -> RAGSystem:
 class QueryRequest(BaseModel):
     query: str
     k: Optional[int] = 5
+    # e.g. {"url_prefix": "nitkkr.ac.in/departments/cse", "content_type": "pdf", "crawled_after": "2024-01-01"}
+    filters: Optional[Dict[str, Any]] = None
 
 class Source(BaseModel):
     title: str
     url: str
+    source_urls: List[str] = []
     score: float
     score_type: str
     content_preview: str
@@ -74,6 +80,7 @@ class QueryResponse(BaseModel):
     response: str
     sources: List[Source]
     num_sources: int
+    cached: bool = False
 
 class StatsResponse(BaseModel):
     total_chunks: int
@@ -86,6 +93,8 @@ class StatsResponse(BaseModel):
     groq_model: Optional[str]
     groq_available: bool
     reranker_enabled: bool
+    stream_first_token_p50_ms: Optional[float] = None
+    stream_first_token_p95_ms: Optional[float] = None
 
 class HealthResponse(BaseModel):
     status: str
@@ -101,6 +110,7 @@ async def root():
         "endpoints": {
             "health": "/api/health",
             "query": "/api/query",
+            "query_stream": "/api/query/stream",
             "stats": "/api/stats"
         }
     }
@@ -139,12 +149,18 @@ async def query(request: QueryRequest):
         if not request.query or not request.query.strip():
             raise HTTPException(status_code=400, detail="Query cannot be empty")
         
-        result = rag.answer_query(request.query, k=request.k or 5)
+        try:
+            parse_filters(request.filters)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        result = await rag.answer_query_async(request.query, k=request.k or 5, filters=request.filters)
         
         sources = [
             Source(
                 title=s.get("title", "Unknown"),
                 url=s.get("url", "Unknown"),
+                source_urls=s.get("source_urls", []),
                 score=s.get("score", 0.0),
                 score_type=s.get("score_type", "similarity"),
                 content_preview=s.get("content_preview", "")
@@ -156,7 +172,8 @@ async def query(request: QueryRequest):
             query=result.get("query", request.query),
             response=result.get("response", "No response generated"),
             sources=sources,
-            num_sources=result.get("num_sources", 0)
+            num_sources=result.get("num_sources", 0),
+            cached=result.get("cached", False)
         )
         
     except HTTPException:
@@ -168,6 +185,37 @@ async def query(request: QueryRequest):
             detail=f"Error processing query: {str(e)}"
         )
 
+@app.post("/api/query/stream", tags=["RAG"])
+async def query_stream(request: QueryRequest):
+    """
+    Query the RAG system and stream the answer as Server-Sent Events.
+    
+    Sends a ``sources`` event once retrieval is done, ``token`` events as the answer is
+    generated, and a final ``done`` event (with time to first token) or ``error`` event.
+    Each event's data is a JSON object.
+    """
+    rag = get_rag_system()
+    
+    if not request.query or not request.query.strip():
+        raise HTTPException(status_code=400, detail="Query cannot be empty")
+    
+    try:
+        parse_filters(request.filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    async def events():
+        async for event in rag.answer_query_stream(request.query, k=request.k or 5, filters=request.filters):
+            name = event.pop("event")
+            yield f"event: {name}\ndata: {json.dumps(event)}\n\n"
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/api/stats", response_model=StatsResponse, tags=["RAG"])
 async def get_stats():
     """Get system statistics."""
@@ -185,7 +233,9 @@ async def get_stats():
             groq_enabled=stats.get("groq_enabled", False),
             groq_model=stats.get("groq_model"),
             groq_available=stats.get("groq_available", False),
-            reranker_enabled=stats.get("reranker_enabled", False)
+            reranker_enabled=stats.get("reranker_enabled", False),
+            stream_first_token_p50_ms=stats.get("stream_first_token_p50_ms"),
+            stream_first_token_p95_ms=stats.get("stream_first_token_p95_ms")
         )
     except Exception as e:
         logger.error(f"Error getting stats: {e}")
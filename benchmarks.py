@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""Offline benchmarks for the vector store. Run ``python benchmarks.py --help``."""
+
+import argparse
+import logging
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import Config
+from document_index import DocumentIndex
+from faiss_index import FAISS_AVAILABLE, INDEX_TYPES, VECTOR_STORAGES, build_faiss_index, faiss, include_search_params
+from numpy_index import METRIC_L2, NumpyFlatIndex
+from onnx_encoder import MODEL_FILES, PARITY_SENTENCES, OnnxSentenceEncoder, check_parity, export_dir, time_encoder
+from reranker import CROSS_ENCODER_AVAILABLE, CrossEncoder, OnnxCrossEncoder, ranking_overlap, time_cross_encoder
+from segment_store import Segment
+from snapshot_store import SnapshotStore
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+def load_stored_embeddings(path: Optional[Path] = None) -> np.ndarray:
+    """Load the corpus embedding matrix of the current snapshot written by save_vector_store."""
+    if path is None:
+        path = SnapshotStore(Path(Config.VECTOR_STORE_PATH)).current_dir() / "segment" / "embeddings.npy"
+    if not path.exists():
+        raise FileNotFoundError(f"{path} not found. Run 'python main.py embed' first.")
+    return np.load(path, mmap_mode="r")
+
+
+def held_out_mask(num_rows: int, num_queries: int, seed: int = 0) -> np.ndarray:
+    """Boolean mask that is False for num_queries random rows (at most a tenth) held out as queries."""
+    rng = np.random.default_rng(seed)
+    num_queries = min(num_queries, num_rows // 10 or 1)
+    mask = np.ones(num_rows, dtype=bool)
+    mask[rng.choice(num_rows, size=num_queries, replace=False)] = False
+    return mask
+
+
+def split_queries(vectors: np.ndarray, num_queries: int, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Hold out num_queries random rows as queries and return (database, queries)."""
+    mask = held_out_mask(len(vectors), num_queries, seed)
+    return np.ascontiguousarray(vectors[mask], dtype="float32"), np.ascontiguousarray(vectors[~mask], dtype="float32")
+
+
+def recall_at_k(approx: np.ndarray, exact: np.ndarray) -> float:
+    """Mean fraction of the exact top-k neighbours present in the approximate top-k."""
+    hits = [len(set(a[a >= 0]) & set(e[e >= 0])) / max(1, int((e >= 0).sum())) for a, e in zip(approx, exact)]
+    return float(np.mean(hits)) if hits else 0.0
+
+
+def time_queries(search, queries: np.ndarray, k: int) -> Tuple[np.ndarray, Dict[str, float]]:
+    """Run one query at a time (as the API does) and report p50/p99 latency in milliseconds."""
+    latencies: List[float] = []
+    results: List[np.ndarray] = []
+    for query in queries:
+        start = time.perf_counter()
+        ids = search(query.reshape(1, -1), k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append(ids[0])
+
+    return np.array(results), {
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+    }
+
+
+def benchmark_index_types(
+    vectors: np.ndarray, k: int = 10, num_queries: int = 200, index_types: Sequence[str] = INDEX_TYPES
+) -> List[Dict]:
+    """Compare each ANN index type against the exact flat index."""
+    if not FAISS_AVAILABLE:
+        raise RuntimeError("FAISS is required for the index benchmark.")
+
+    database, queries = split_queries(vectors, num_queries)
+    ids = np.arange(len(database), dtype=np.int64)
+    dimension = database.shape[1]
+    exact = None
+    rows: List[Dict] = []
+
+    for index_type in ["flat"] + [t for t in index_types if t != "flat"]:
+        start = time.perf_counter()
+        index = build_faiss_index(dimension, index_type, database)
+        index.add_with_ids(database, ids)
+        build_s = time.perf_counter() - start
+
+        found, latency = time_queries(lambda q, n: index.search(q, n)[1], queries, k)
+        if exact is None:
+            exact = found
+
+        rows.append(
+            {
+                "index_type": index_type,
+                f"recall@{k}": recall_at_k(found, exact),
+                **latency,
+                "index_mb": faiss.serialize_index(index).nbytes / 1e6,
+                "build_s": build_s,
+            }
+        )
+
+    return rows
+
+
+def benchmark_quantization(
+    vectors: np.ndarray, k: int = 10, num_queries: int = 200, rescore_factor: int = 4, index_type: str = "flat"
+) -> List[Dict]:
+    """Measure the accuracy cost of float16/int8 storage for cosine search, with and without exact re-scoring."""
+    if not FAISS_AVAILABLE:
+        raise RuntimeError("FAISS is required for the quantization benchmark.")
+
+    database, queries = split_queries(vectors, num_queries)
+    faiss.normalize_L2(database)
+    faiss.normalize_L2(queries)
+    ids = np.arange(len(database), dtype=np.int64)
+    dimension = database.shape[1]
+
+    # Brute-force ground truth, so trained index types are not measured against themselves.
+    similarities = queries @ database.T
+    exact_ids = np.argsort(-similarities, axis=1)[:, :k]
+    exact_scores = np.take_along_axis(similarities, exact_ids, axis=1)
+
+    rows: List[Dict] = []
+    for storage in VECTOR_STORAGES:
+        index = build_faiss_index(dimension, index_type, database, metric="cosine", storage=storage)
+        index.add_with_ids(database, ids)
+        scores, found = index.search(queries, k * rescore_factor)
+
+        # Exact re-score against the float32 vectors, as VectorEmbeddingSystem does with the segment.
+        rescored = np.empty_like(exact_ids)
+        for i, candidates in enumerate(found):
+            candidates = candidates[candidates >= 0]
+            exact = database[candidates] @ queries[i]
+            rescored[i] = candidates[np.argsort(-exact)[:k]]
+
+        rows.append(
+            {
+                "storage": storage,
+                f"recall@{k}": recall_at_k(found[:, :k], exact_ids),
+                f"rescored@{k}": recall_at_k(rescored, exact_ids),
+                "score_err": float(np.abs(scores[:, :k] - exact_scores).mean()),
+                "index_mb": faiss.serialize_index(index).nbytes / 1e6,
+            }
+        )
+
+    return rows
+
+
+def benchmark_numpy_engine(vectors: np.ndarray, k: int = 10, num_queries: int = 200) -> List[Dict]:
+    """Compare the NumPy fallback engine with FAISS flat search on the same vectors."""
+    database, queries = split_queries(vectors, num_queries)
+    ids = np.arange(len(database), dtype=np.int64)
+    engines = [("numpy", NumpyFlatIndex(database.shape[1], METRIC_L2, database, ids, Config.NUMPY_SEARCH_BLOCK_ROWS))]
+    if FAISS_AVAILABLE:
+        flat = build_faiss_index(database.shape[1], "flat")
+        flat.add_with_ids(database, ids)
+        engines.insert(0, ("faiss_flat", flat))
+
+    reference = None
+    rows: List[Dict] = []
+    for name, index in engines:
+        found, latency = time_queries(lambda q, n: index.search(q, n)[1], queries, k)
+        if reference is None:
+            reference = found
+
+        start = time.perf_counter()
+        index.search(queries, k)
+        batch_s = time.perf_counter() - start
+
+        rows.append(
+            {
+                "engine": name,
+                f"agree@{k}": recall_at_k(found, reference),
+                **latency,
+                "batch_qps": len(queries) / batch_s if batch_s > 0 else float("inf"),
+            }
+        )
+
+    return rows
+
+
+def load_stored_documents(path: Optional[Path] = None) -> np.ndarray:
+    """Document number of every row of the current snapshot's embedding matrix."""
+    if path is None:
+        path = SnapshotStore(Path(Config.VECTOR_STORE_PATH)).current_dir() / "segment" / "chunks.npy"
+    if not path.exists():
+        raise FileNotFoundError(f"{path} not found. Run 'python main.py embed' first.")
+    return np.asarray(np.load(path)["doc_ref"], dtype=np.int64)
+
+
+def benchmark_two_stage(
+    vectors: np.ndarray,
+    doc_refs: np.ndarray,
+    k: int = 10,
+    num_queries: int = 200,
+    documents: Sequence[int] = (5, 10, 20, 50),
+) -> List[Dict]:
+    """Recall and latency of document-centroid two-stage search against flat search over all chunks."""
+    mask = held_out_mask(len(vectors), num_queries)
+    database, queries = split_queries(vectors, num_queries)
+    database_docs = doc_refs[mask]
+    ids = np.arange(len(database), dtype=np.int64)
+    dimension = database.shape[1]
+
+    doc_index = DocumentIndex(dimension)
+    chunks_of: Dict[str, np.ndarray] = {}
+    for doc in np.unique(database_docs).tolist():
+        rows = np.flatnonzero(database_docs == doc)
+        doc_index.set(str(doc), database[rows])
+        chunks_of[str(doc)] = ids[rows]
+
+    if FAISS_AVAILABLE:
+        index = build_faiss_index(dimension, "flat")
+        index.add_with_ids(database, ids)
+        restricted = lambda q, n, allowed: index.search(q, n, params=include_search_params(index, allowed))[1]
+    else:
+        index = NumpyFlatIndex(dimension, METRIC_L2, database, ids, Config.NUMPY_SEARCH_BLOCK_ROWS)
+        restricted = lambda q, n, allowed: index.search(q, n, included=allowed)[1]
+
+    exact, latency = time_queries(lambda q, n: index.search(q, n)[1], queries, k)
+    rows: List[Dict] = [{"documents": "all", f"recall@{k}": 1.0, **latency, "chunks_scored": float(len(database))}]
+
+    for num_documents in documents:
+        scored: List[int] = []
+
+        def two_stage(query: np.ndarray, n: int) -> np.ndarray:
+            allowed = np.sort(np.concatenate([chunks_of[doc] for doc in doc_index.search(query, num_documents)[0]]))
+            scored.append(len(allowed))
+            return restricted(query, n, allowed)
+
+        found, latency = time_queries(two_stage, queries, k)
+        rows.append(
+            {
+                "documents": num_documents,
+                f"recall@{k}": recall_at_k(found, exact),
+                **latency,
+                "chunks_scored": float(np.mean(scored)),
+            }
+        )
+
+    return rows
+
+
+def load_stored_texts(limit: int = 512, seed: int = 0) -> List[str]:
+    """A random sample of chunk texts from the current snapshot."""
+    directory = SnapshotStore(Path(Config.VECTOR_STORE_PATH)).current_dir() / "segment"
+    if not (directory / "header.json").exists():
+        raise FileNotFoundError(f"{directory} not found. Run 'python main.py embed' first.")
+    segment = Segment(directory)
+    try:
+        rows = np.random.default_rng(seed).permutation(len(segment))[:limit]
+        return [segment.text(int(row)) for row in rows]
+    finally:
+        segment.close()
+
+
+def benchmark_encoders(texts: List[str], model_name: str = Config.EMBEDDING_MODEL, batch_size: int = 64) -> List[Dict]:
+    """Query latency, throughput and parity with PyTorch of each available embedding backend."""
+    encoders: Dict[str, object] = {}
+    try:
+        from sentence_transformers import SentenceTransformer  # type: ignore
+
+        encoders["torch"] = SentenceTransformer(model_name, device="cpu")
+    except (ImportError, ModuleNotFoundError):
+        logger.warning("sentence-transformers not installed; skipping the PyTorch backend and parity checks.")
+    for backend in ("onnx", "onnx-int8"):
+        if (export_dir(model_name) / MODEL_FILES[backend]).exists():
+            encoders[backend] = OnnxSentenceEncoder(export_dir(model_name), backend, Config.ONNX_NUM_THREADS)
+    if len(encoders) < 2 and "torch" in encoders:
+        logger.warning("No ONNX export found. Run 'python onnx_encoder.py export' first.")
+
+    rows: List[Dict] = []
+    for backend, encoder in encoders.items():
+        parity = check_parity(encoders["torch"], encoder, texts) if "torch" in encoders else {}
+        rows.append(
+            {
+                "backend": backend,
+                **time_encoder(encoder, texts, batch_size),
+                "min_cosine": parity.get("min_cosine", float("nan")),
+                "max_abs_diff": parity.get("max_abs_diff", float("nan")),
+            }
+        )
+    return rows
+
+
+def benchmark_rerankers(
+    texts: List[str], model_name: str = Config.RERANKER_MODEL, k: int = 5, candidates: int = 40, batch_size: int = 32
+) -> List[Dict]:
+    """Pairs/sec and top-k overlap with PyTorch of each available cross-encoder backend.
+
+    Each parity sentence is used as a query against its own random sample of ``candidates`` chunks.
+    """
+    rng = np.random.default_rng(0)
+    queries = list(PARITY_SENTENCES)
+    passages = [[texts[i] for i in rng.choice(len(texts), size=min(candidates, len(texts)), replace=False)] for _ in queries]
+    pairs = [(query, passage) for query, group in zip(queries, passages) for passage in group]
+
+    models: Dict[str, object] = {}
+    if CROSS_ENCODER_AVAILABLE:
+        models["torch"] = CrossEncoder(model_name)
+    else:
+        logger.warning("sentence-transformers not installed; skipping the PyTorch backend and parity checks.")
+    for backend in ("onnx", "onnx-int8"):
+        if (export_dir(model_name) / MODEL_FILES[backend]).exists():
+            models[backend] = OnnxCrossEncoder(export_dir(model_name), backend, Config.ONNX_NUM_THREADS)
+    if len(models) < 2 and "torch" in models:
+        logger.warning("No ONNX export found. Run 'python reranker.py export' first.")
+
+    rows: List[Dict] = []
+    for backend, model in models.items():
+        parity = ranking_overlap(models["torch"], model, queries, passages, k) if "torch" in models else {}
+        rows.append(
+            {
+                "backend": backend,
+                **time_cross_encoder(model, pairs, batch_size),
+                f"top{k}_overlap": parity.get("mean_overlap", float("nan")),
+                f"min_top{k}_overlap": parity.get("min_overlap", float("nan")),
+            }
+        )
+    return rows
+
+
+def print_table(rows: List[Dict]) -> None:
+    if not rows:
+        return
+    columns = list(rows[0])
+    print(" | ".join(f"{c:>12}" for c in columns))
+    for row in rows:
+        print(" | ".join(f"{row[c]:>12.3f}" if isinstance(row[c], float) else f"{row[c]:>12}" for c in columns))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Vector store benchmarks")
+    sub = parser.add_subparsers(dest="benchmark", required=True)
+
+    index_parser = sub.add_parser("index", help="Recall@k, latency and size of each ANN index type vs flat")
+    index_parser.add_argument("--k", type=int, default=10)
+    index_parser.add_argument("--queries", type=int, default=200)
+    index_parser.add_argument("--types", nargs="+", default=list(INDEX_TYPES), choices=INDEX_TYPES)
+
+    quant_parser = sub.add_parser("quantization", help="Recall and score error of float16/int8 cosine storage")
+    quant_parser.add_argument("--k", type=int, default=10)
+    quant_parser.add_argument("--queries", type=int, default=200)
+    quant_parser.add_argument("--rescore-factor", type=int, default=4)
+    quant_parser.add_argument("--type", default="flat", choices=INDEX_TYPES)
+
+    numpy_parser = sub.add_parser("numpy", help="Latency of the NumPy fallback engine vs FAISS flat")
+    numpy_parser.add_argument("--k", type=int, default=10)
+    numpy_parser.add_argument("--queries", type=int, default=200)
+
+    two_stage_parser = sub.add_parser("two-stage", help="Recall and latency of document-centroid two-stage search vs flat")
+    two_stage_parser.add_argument("--k", type=int, default=10)
+    two_stage_parser.add_argument("--queries", type=int, default=200)
+    two_stage_parser.add_argument("--documents", type=int, nargs="+", default=[5, 10, 20, 50])
+
+    encoder_parser = sub.add_parser("encoders", help="Latency, throughput and parity of the PyTorch and ONNX embedding backends")
+    encoder_parser.add_argument("--texts", type=int, default=512)
+    encoder_parser.add_argument("--batch-size", type=int, default=Config.EMBEDDING_BATCH_SIZE)
+
+    reranker_parser = sub.add_parser("rerankers", help="Pairs/sec and top-k overlap of the PyTorch and ONNX cross-encoder backends")
+    reranker_parser.add_argument("--k", type=int, default=5)
+    reranker_parser.add_argument("--candidates", type=int, default=Config.RERANK_MAX_CANDIDATES)
+    reranker_parser.add_argument("--batch-size", type=int, default=Config.RERANK_BATCH_SIZE)
+
+    args = parser.parse_args()
+
+    if args.benchmark == "index":
+        print_table(benchmark_index_types(load_stored_embeddings(), args.k, args.queries, args.types))
+    elif args.benchmark == "quantization":
+        rows = benchmark_quantization(load_stored_embeddings(), args.k, args.queries, args.rescore_factor, args.type)
+        print_table(rows)
+    elif args.benchmark == "numpy":
+        print_table(benchmark_numpy_engine(load_stored_embeddings(), args.k, args.queries))
+    elif args.benchmark == "two-stage":
+        rows = benchmark_two_stage(load_stored_embeddings(), load_stored_documents(), args.k, args.queries, args.documents)
+        print_table(rows)
+    elif args.benchmark == "encoders":
+        print_table(benchmark_encoders(load_stored_texts(args.texts), batch_size=args.batch_size))
+    elif args.benchmark == "rerankers":
+        texts = load_stored_texts(args.candidates * 4)
+        print_table(benchmark_rerankers(texts, k=args.k, candidates=args.candidates, batch_size=args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
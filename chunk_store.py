@@ -0,0 +1,214 @@
+import logging
+import sys
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping, MutableMapping
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+from segment_store import DOCUMENT_FIELDS, Segment, decompress_text
+
+logger = logging.getLogger(__name__)
+
+_CHUNK_FIELDS = ("id", "chunk_text") + DOCUMENT_FIELDS
+
+
+class ChunkView(MutableMapping):
+    """Dict-like view of one chunk; stored fields are resolved lazily, extra keys (scores) live on the view."""
+
+    __slots__ = ("_store", "_chunk_id", "_extra")
+
+    def __init__(self, store: "ChunkStore", chunk_id: int):
+        self._store = store
+        self._chunk_id = chunk_id
+        self._extra: Dict[str, Any] = {}
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._extra:
+            return self._extra[key]
+        if key == "id":
+            return self._chunk_id
+        if key == "chunk_text":
+            return self._store.text(self._chunk_id)
+        if key in DOCUMENT_FIELDS:
+            return self._store.document(self._chunk_id)[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self._extra[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        del self._extra[key]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from _CHUNK_FIELDS
+        yield from (key for key in self._extra if key not in _CHUNK_FIELDS)
+
+    def __len__(self) -> int:
+        return len(_CHUNK_FIELDS) + sum(1 for key in self._extra if key not in _CHUNK_FIELDS)
+
+    def __contains__(self, key: object) -> bool:
+        return key in _CHUNK_FIELDS or key in self._extra
+
+    def copy(self) -> Dict[str, Any]:
+        return dict(self)
+
+    def __repr__(self) -> str:
+        return f"ChunkView(id={self._chunk_id}, extra={self._extra})"
+
+
+class ChunkStore(Mapping):
+    """Columnar chunk_id -> chunk mapping.
+
+    Document fields (url, title, source_file) are stored once per document and chunks hold an
+    integer document reference. Chunks loaded from disk stay in the memory-mapped segment; chunks
+    added since live in parallel arrays over one contiguous UTF-8 text buffer. Deletions are masked
+    until the next segment write drops them.
+    """
+
+    def __init__(self, segment: Optional[Segment] = None):
+        self.segment = segment
+        self.documents: List[Dict] = [dict(doc) for doc in segment.documents] if segment is not None else []
+        self._doc_refs: Dict[str, int] = {doc["source_file"]: ref for ref, doc in enumerate(self.documents)}
+
+        self._ids = array("q")
+        self._doc_ref = array("i")
+        self._word_counts = array("i")
+        self._offsets = array("q")
+        self._lengths = array("i")
+        self._text = bytearray()
+
+        self._removed: Set[int] = set()
+        self._base_count = len(segment) if segment is not None else 0
+        self.total_words = int(segment.records["word_count"].sum()) if self._base_count else 0
+
+    @classmethod
+    def open(cls, directory: Path) -> Optional["ChunkStore"]:
+        """Open a segment directory as a chunk store, or return None if it is absent or unreadable."""
+        if not (Path(directory) / "header.json").exists():
+            return None
+        try:
+            return cls(Segment(directory))
+        except Exception as exc:
+            logger.error(f"Failed to open segment at {directory}: {exc}")
+            return None
+
+    # -- writes -------------------------------------------------------------------------------
+
+    def _intern_document(self, document: Dict) -> int:
+        fields = {field: document.get(field, "Unknown") for field in DOCUMENT_FIELDS}
+        ref = self._doc_refs.get(fields["source_file"])
+        if ref is None:
+            ref = len(self.documents)
+            self._doc_refs[fields["source_file"]] = ref
+            self.documents.append(fields)
+        elif self.documents[ref] != fields:
+            self.documents[ref] = fields
+        return ref
+
+    def add(self, chunk_id: int, document: Dict, text: str) -> None:
+        """Append a chunk; ids must increase, which holds because they come from next_chunk_id."""
+        if (self._ids and chunk_id <= self._ids[-1]) or self._base_row(chunk_id) >= 0:
+            raise ValueError(f"Chunk id {chunk_id} is not newer than the stored chunks.")
+
+        encoded = text.encode("utf-8")
+        word_count = len(text.split())
+        self._ids.append(chunk_id)
+        self._doc_ref.append(self._intern_document(document))
+        self._word_counts.append(word_count)
+        self._offsets.append(len(self._text))
+        self._lengths.append(len(encoded))
+        self._text.extend(encoded)
+        self.total_words += word_count
+
+    def pop(self, chunk_id: int, default: Any = None) -> Any:
+        if chunk_id not in self:
+            return default
+        view = ChunkView(self, chunk_id)
+        self.total_words -= self.word_count(chunk_id)
+        self._removed.add(chunk_id)
+        return view
+
+    # -- lookups ------------------------------------------------------------------------------
+
+    def _base_row(self, chunk_id: int) -> int:
+        return self.segment.row_of(chunk_id) if self.segment is not None else -1
+
+    def base_row(self, chunk_id: int) -> int:
+        """Segment row for a live chunk that is still stored in the segment, else -1."""
+        return -1 if chunk_id in self._removed else self._base_row(chunk_id)
+
+    def _tail_row(self, chunk_id: int) -> int:
+        row = bisect_left(self._ids, chunk_id)
+        return row if row < len(self._ids) and self._ids[row] == chunk_id else -1
+
+    def _locate(self, chunk_id: int):
+        if chunk_id in self._removed:
+            raise KeyError(chunk_id)
+        row = self._base_row(chunk_id)
+        if row >= 0:
+            return True, row
+        row = self._tail_row(chunk_id)
+        if row >= 0:
+            return False, row
+        raise KeyError(chunk_id)
+
+    def text(self, chunk_id: int) -> str:
+        in_base, row = self._locate(chunk_id)
+        if in_base:
+            return decompress_text(self.segment.compressed_text(row))
+        offset = self._offsets[row]
+        return self._text[offset : offset + self._lengths[row]].decode("utf-8")
+
+    def document(self, chunk_id: int) -> Dict:
+        in_base, row = self._locate(chunk_id)
+        ref = int(self.segment.records[row]["doc_ref"]) if in_base else self._doc_ref[row]
+        return self.documents[ref]
+
+    def word_count(self, chunk_id: int) -> int:
+        in_base, row = self._locate(chunk_id)
+        return int(self.segment.records[row]["word_count"]) if in_base else self._word_counts[row]
+
+    def view(self, chunk_id: int) -> ChunkView:
+        self._locate(chunk_id)
+        return ChunkView(self, chunk_id)
+
+    # -- Mapping protocol -----------------------------------------------------------------------
+
+    def __getitem__(self, chunk_id: int) -> ChunkView:
+        return self.view(chunk_id)
+
+    def get(self, chunk_id: int, default: Any = None) -> Any:
+        try:
+            return self.view(chunk_id)
+        except KeyError:
+            return default
+
+    def __contains__(self, chunk_id: object) -> bool:
+        try:
+            self._locate(chunk_id)  # type: ignore[arg-type]
+            return True
+        except KeyError:
+            return False
+
+    def __iter__(self) -> Iterator[int]:
+        if self.segment is not None:
+            for chunk_id in self.segment.chunk_ids.tolist():
+                if chunk_id not in self._removed:
+                    yield chunk_id
+        for chunk_id in list(self._ids):
+            if chunk_id not in self._removed:
+                yield chunk_id
+
+    def __len__(self) -> int:
+        return self._base_count + len(self._ids) - len(self._removed)
+
+    def memory_bytes(self) -> int:
+        """Approximate heap footprint; the memory-mapped segment is paged in by the OS on demand."""
+        columns = sum(col.itemsize * len(col) for col in (self._ids, self._doc_ref, self._word_counts, self._offsets, self._lengths))
+        documents = sum(sys.getsizeof(value) for doc in self.documents for value in doc.values())
+        return columns + len(self._text) + documents + sys.getsizeof(self._removed)
+
+    def close(self) -> None:
+        if self.segment is not None:
+            self.segment.close()
@@ -20,10 +20,71 @@ class Config:
     VECTOR_STORE_PATH: str = "vector_store"
     EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
     
+    # Embedding Throughput Configuration
+    EMBEDDING_BACKEND: str = os.getenv("EMBEDDING_BACKEND", "torch")  # torch | onnx | onnx-int8 (see onnx_encoder.py)
+    ONNX_MODEL_DIR: str = os.getenv("ONNX_MODEL_DIR", "models/onnx")  # Exported ONNX models, one directory per model
+    ONNX_NUM_THREADS: int = int(os.getenv("ONNX_NUM_THREADS", "0"))  # ONNX Runtime intra-op threads; 0 = one per core
+    ONNX_PARITY_MIN_COSINE: float = float(os.getenv("ONNX_PARITY_MIN_COSINE", "0.99"))  # Export fails below this similarity to PyTorch
+    EMBEDDING_BATCH_SIZE: int = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+    EMBEDDING_WORKERS: int = int(os.getenv("EMBEDDING_WORKERS", "0"))  # 0 = one worker per CPU core
+    EMBEDDING_POOL_MIN_CHUNKS: int = 2000  # Smaller jobs are encoded in-process
+    EMBEDDING_STREAM_BATCH: int = int(os.getenv("EMBEDDING_STREAM_BATCH", "4096"))  # Chunks held in memory per pipeline step
+    EMBEDDING_CACHE_ENABLED: bool = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    EMBEDDING_CACHE_MAX_ENTRIES: int = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "100000"))
+    NEAR_DUPLICATE_DEDUP: bool = os.getenv("NEAR_DUPLICATE_DEDUP", "true").lower() == "true"  # Collapse repeated chunks into one vector
+    NEAR_DUPLICATE_MAX_DISTANCE: int = int(os.getenv("NEAR_DUPLICATE_MAX_DISTANCE", "3"))  # SimHash bits two duplicates may differ by
+    QUERY_CACHE_SIZE: int = int(os.getenv("QUERY_CACHE_SIZE", "2048"))  # Query embeddings kept in memory; 0 disables
+    QUERY_CACHE_TTL: float = float(os.getenv("QUERY_CACHE_TTL", "3600"))  # Seconds before a cached query is re-encoded
+    QUERY_CACHE_WARMUP: int = int(os.getenv("QUERY_CACHE_WARMUP", "500"))  # Most frequent past queries pre-encoded at startup
+    QUERY_HISTORY_MAX_ENTRIES: int = int(os.getenv("QUERY_HISTORY_MAX_ENTRIES", "10000"))  # Distinct queries kept in the frequency log
+    BUILD_WORKERS: int = int(os.getenv("BUILD_WORKERS", "0"))  # Processes for 'main.py build'; 0 = one per CPU core
+    BUILD_UNITS_PER_WORKER: int = 4  # More, smaller work units even out stragglers
+    BUILD_CLAIM_TIMEOUT: int = int(os.getenv("BUILD_CLAIM_TIMEOUT", "3600"))  # Seconds before another machine's unit claim is taken over
+    
+    # ANN Index Configuration (flat | ivf | hnsw | ivfpq)
+    INDEX_TYPE: str = os.getenv("INDEX_TYPE", "flat")
+    IVF_NLIST: int = int(os.getenv("IVF_NLIST", "256"))
+    IVF_NPROBE: int = int(os.getenv("IVF_NPROBE", "16"))
+    HNSW_M: int = int(os.getenv("HNSW_M", "32"))
+    HNSW_EF_CONSTRUCTION: int = int(os.getenv("HNSW_EF_CONSTRUCTION", "80"))
+    HNSW_EF_SEARCH: int = int(os.getenv("HNSW_EF_SEARCH", "64"))
+    PQ_M: int = int(os.getenv("PQ_M", "16"))  # Sub-quantizers; must divide the embedding dimension
+    PQ_NBITS: int = int(os.getenv("PQ_NBITS", "8"))
+    INDEX_TRAINING_SAMPLE: int = int(os.getenv("INDEX_TRAINING_SAMPLE", "200000"))  # Vectors sampled to train ivf/ivfpq/int8
+    INDEX_METRIC: str = os.getenv("INDEX_METRIC", "l2")  # l2 | cosine (normalized inner product)
+    VECTOR_STORAGE: str = os.getenv("VECTOR_STORAGE", "float32")  # float32 | float16 | int8
+    EXACT_RESCORE_FACTOR: int = int(os.getenv("EXACT_RESCORE_FACTOR", "0"))  # >1 re-scores k*factor candidates exactly
+    SEARCH_ENGINE: str = os.getenv("SEARCH_ENGINE", "auto")  # auto | faiss | numpy (memory-mapped exact search)
+    NUMPY_SEARCH_BLOCK_ROWS: int = int(os.getenv("NUMPY_SEARCH_BLOCK_ROWS", "65536"))
+    SEARCH_MODE: str = os.getenv("SEARCH_MODE", "dense")  # dense | hybrid (BM25 + dense, reciprocal rank fusion)
+    HYBRID_RRF_K: int = int(os.getenv("HYBRID_RRF_K", "60"))
+    TWO_STAGE_SEARCH: bool = os.getenv("TWO_STAGE_SEARCH", "false").lower() == "true"  # Search document centroids first
+    TWO_STAGE_DOCUMENTS: int = int(os.getenv("TWO_STAGE_DOCUMENTS", "20"))  # Documents whose chunks are searched
+    NUM_SHARDS: int = int(os.getenv("NUM_SHARDS", "1"))  # >1 serves the index from that many worker processes
+    SHARD_KEY: str = os.getenv("SHARD_KEY", "document")  # document | site (partition by source file or website host)
+    
+    # Snapshot / Update Log Configuration
+    SNAPSHOT_RETAIN: int = int(os.getenv("SNAPSHOT_RETAIN", "2"))  # Published snapshots kept for in-flight readers
+    WAL_COMPACT_RECORDS: int = int(os.getenv("WAL_COMPACT_RECORDS", "50"))  # Logged updates before a background snapshot
+    WAL_COMPACT_BYTES: int = int(os.getenv("WAL_COMPACT_BYTES", str(64 * 1024 * 1024)))
+    TOMBSTONE_COMPACT_RATIO: float = float(os.getenv("TOMBSTONE_COMPACT_RATIO", "0.2"))  # Renumber ids past this deleted fraction
+    
     # RAG Configuration
     DEFAULT_RETRIEVAL_COUNT: int = 5
     MAX_CONTEXT_LENGTH: int = 4000
     MAX_RESPONSE_TOKENS: int = 1024
+    RERANKER_MODEL: str = os.getenv("RERANKER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+    RERANKER_BACKEND: str = os.getenv("RERANKER_BACKEND", "torch")  # torch | onnx | onnx-int8 (see reranker.py)
+    RERANK_PARITY_MIN_OVERLAP: float = float(os.getenv("RERANK_PARITY_MIN_OVERLAP", "0.9"))  # Export fails below this top-k overlap with PyTorch
+    RERANK_MAX_CANDIDATES: int = int(os.getenv("RERANK_MAX_CANDIDATES", "40"))  # Best dense candidates sent to the cross-encoder
+    RERANK_BATCH_SIZE: int = int(os.getenv("RERANK_BATCH_SIZE", "32"))  # Pairs per cross-encoder forward pass
+    RERANK_EARLY_EXIT_MARGIN: float = float(os.getenv("RERANK_EARLY_EXIT_MARGIN", "0.1"))  # Skip reranking when the top k lead by this much; 0 = never
+    RERANK_SCORE_CACHE_SIZE: int = int(os.getenv("RERANK_SCORE_CACHE_SIZE", "20000"))  # Cached (query, chunk) scores
+    RAG_CPU_WORKERS: int = int(os.getenv("RAG_CPU_WORKERS", "0"))  # Threads for encoding, search and reranking in async queries; 0 = one per core
+    RAG_IO_WORKERS: int = int(os.getenv("RAG_IO_WORKERS", "16"))  # Threads waiting on LLM calls in async queries
+    ANSWER_CACHE_SIZE: int = int(os.getenv("ANSWER_CACHE_SIZE", "1024"))  # Cached answers; 0 disables the semantic answer cache
+    ANSWER_CACHE_TTL: float = float(os.getenv("ANSWER_CACHE_TTL", "1800"))  # Seconds an answer may be reused
+    ANSWER_CACHE_THRESHOLD: float = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))  # Query cosine similarity needed to reuse an answer
     
     # Available Groq models
     AVAILABLE_MODELS = [
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""Distributed offline index build. Run ``python distributed_build.py --help``.
+
+A build has three steps:
+
+1. ``plan`` splits ``extracted_text/`` into work units of roughly equal size.
+2. ``worker`` claims units one at a time and writes one self-contained segment per unit. Any
+   number of workers can run, on any machine that mounts the same vector store directory.
+3. ``merge`` combines the unit segments in plan order into a published snapshot with global
+   chunk ids.
+
+``run`` does all three on this machine with a pool of local worker processes.
+
+A unit is claimed by creating ``unit-NNNN.claim`` with O_EXCL; the file holds ``host:pid`` of the
+worker. A worker that dies leaves its claim behind, so a claim counts as stale when its pid is
+no longer running on this host, or when it is older than ``Config.BUILD_CLAIM_TIMEOUT`` (the only
+signal for a worker on another machine). Stale claims are removed and the unit claimed again.
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import socket
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from config import Config
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+BUILD_DIR = Path(Config.VECTOR_STORE_PATH) / "build"
+
+
+def _unit_name(unit: int) -> str:
+    return f"unit-{unit:04d}"
+
+
+def plan_build(text_dir: str = "extracted_text", num_units: int = 1, build_dir: Path = BUILD_DIR) -> Dict:
+    """Split the text files into num_units work units balanced by total file size."""
+    files = sorted(Path(text_dir).glob("*.txt"))
+    num_units = max(1, min(num_units, len(files)))
+    units: List[List[str]] = [[] for _ in range(num_units)]
+    sizes = [0] * num_units
+
+    # Largest files first, each to the currently lightest unit.
+    for path in sorted(files, key=lambda p: p.stat().st_size, reverse=True):
+        unit = sizes.index(min(sizes))
+        units[unit].append(str(path))
+        sizes[unit] += path.stat().st_size
+
+    if build_dir.exists():
+        shutil.rmtree(build_dir)
+    build_dir.mkdir(parents=True)
+
+    plan = {"text_dir": text_dir, "created": time.time(), "units": [sorted(unit) for unit in units]}
+    tmp_path = build_dir / "plan.json.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as plan_file:
+        json.dump(plan, plan_file, indent=2)
+    os.replace(tmp_path, build_dir / "plan.json")
+    logger.info(f"Planned {len(files)} files into {num_units} work units.")
+    return plan
+
+
+def load_plan(build_dir: Path = BUILD_DIR) -> Dict:
+    with open(build_dir / "plan.json", "r", encoding="utf-8") as plan_file:
+        return json.load(plan_file)
+
+
+def _claim_is_stale(claim_path: Path) -> bool:
+    """True if the worker holding claim_path has exited on this host or the claim has timed out."""
+    try:
+        owner = claim_path.read_text(encoding="utf-8")
+        age = time.time() - claim_path.stat().st_mtime
+    except FileNotFoundError:
+        # Released in the meantime; the next O_EXCL attempt decides who gets it.
+        return True
+
+    host, _, pid = owner.rpartition(":")
+    if host == socket.gethostname() and pid.isdigit():
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            # Running under another user.
+            pass
+    return age > Config.BUILD_CLAIM_TIMEOUT
+
+
+def _claim(build_dir: Path, unit: int) -> bool:
+    """Atomically claim a unit; creating the claim file fails if another live worker holds it."""
+    claim_path = build_dir / f"{_unit_name(unit)}.claim"
+    for _ in range(2):
+        try:
+            fd = os.open(claim_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            if not _claim_is_stale(claim_path):
+                return False
+            logger.warning(f"Taking over stale claim on unit {unit}.")
+            try:
+                claim_path.unlink()
+            except FileNotFoundError:
+                pass
+            continue
+        with os.fdopen(fd, "w") as claim_file:
+            claim_file.write(f"{socket.gethostname()}:{os.getpid()}")
+        return True
+    return False
+
+
+def build_unit(system, files: List[str], unit: int, build_dir: Path = BUILD_DIR) -> int:
+    """Encode one unit into build_dir/unit-NNNN, publishing it with a rename so it is never seen half-written."""
+    final_dir = build_dir / _unit_name(unit)
+    staging = build_dir / f"{_unit_name(unit)}.tmp"
+    if staging.exists():
+        shutil.rmtree(staging)
+    staging.mkdir()
+
+    start = time.perf_counter()
+    num_chunks = system.build_segment(files, staging)
+    if final_dir.exists():
+        shutil.rmtree(final_dir)
+    staging.rename(final_dir)
+    logger.info(f"Unit {unit}: {len(files)} files, {num_chunks} chunks in {time.perf_counter() - start:.1f}s.")
+    return num_chunks
+
+
+def run_worker(build_dir: Path = BUILD_DIR, unit: Optional[int] = None, threads: int = 0) -> int:
+    """Build the given unit, or keep claiming unbuilt units until none are left. Returns units built."""
+    if threads:
+        try:
+            import torch  # type: ignore
+
+            torch.set_num_threads(threads)
+        except (ImportError, ModuleNotFoundError):
+            pass
+
+    from vector_embeddings import VectorEmbeddingSystem
+
+    plan = load_plan(build_dir)
+    # The process pool inside the encoder would compete with the other build workers.
+    system = VectorEmbeddingSystem(num_workers=1)
+
+    if unit is not None:
+        build_unit(system, plan["units"][unit], unit, build_dir)
+        return 1
+
+    built = 0
+    for candidate, files in enumerate(plan["units"]):
+        if (build_dir / _unit_name(candidate)).exists() or not _claim(build_dir, candidate):
+            continue
+        build_unit(system, files, candidate, build_dir)
+        built += 1
+    return built
+
+
+def merge_build(build_dir: Path = BUILD_DIR) -> int:
+    """Merge all unit segments into a new published snapshot and remove the build directory."""
+    from vector_embeddings import VectorEmbeddingSystem
+
+    plan = load_plan(build_dir)
+    unit_dirs = [build_dir / _unit_name(unit) for unit in range(len(plan["units"]))]
+    missing = [unit for unit, unit_dir in enumerate(unit_dirs) if not (unit_dir / "unit.json").exists()]
+    if missing:
+        raise RuntimeError(f"Units {missing} are not built yet; run 'python distributed_build.py worker --unit N'.")
+
+    system = VectorEmbeddingSystem()
+    total = system.merge_segments(unit_dirs, build_dir / "merged")
+    shutil.rmtree(build_dir, ignore_errors=True)
+    return total
+
+
+def _local_worker(build_dir: str, threads: int) -> None:
+    run_worker(Path(build_dir), threads=threads)
+
+
+def run_local_build(text_dir: str = "extracted_text", num_workers: int = 0, build_dir: Path = BUILD_DIR) -> int:
+    """Plan, build with num_workers local processes, and merge. Returns the number of chunks indexed."""
+    num_workers = num_workers or Config.BUILD_WORKERS or os.cpu_count() or 1
+    start = time.perf_counter()
+    plan_build(text_dir, num_workers * Config.BUILD_UNITS_PER_WORKER, build_dir)
+
+    threads = max(1, (os.cpu_count() or 1) // num_workers)
+    context = multiprocessing.get_context("spawn")
+    workers = [
+        context.Process(target=_local_worker, args=(str(build_dir), threads), name=f"build-worker-{i}")
+        for i in range(num_workers)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    total = merge_build(build_dir)
+    logger.info(f"Built {total} chunks with {num_workers} workers in {time.perf_counter() - start:.1f}s.")
+    return total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Distributed offline index build")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    plan_parser = sub.add_parser("plan", help="Split the text directory into work units")
+    plan_parser.add_argument("--text-dir", default="extracted_text")
+    plan_parser.add_argument("--units", type=int, default=16)
+
+    worker_parser = sub.add_parser("worker", help="Build unclaimed units (or one given unit)")
+    worker_parser.add_argument("--unit", type=int, default=None)
+
+    sub.add_parser("merge", help="Merge built units into the vector store")
+
+    run_parser = sub.add_parser("run", help="Plan, build with local processes, and merge")
+    run_parser.add_argument("--text-dir", default="extracted_text")
+    run_parser.add_argument("--workers", type=int, default=0)
+
+    args = parser.parse_args()
+    if args.command == "plan":
+        plan_build(args.text_dir, args.units)
+    elif args.command == "worker":
+        run_worker(unit=args.unit)
+    elif args.command == "merge":
+        merge_build()
+    elif args.command == "run":
+        run_local_build(args.text_dir, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import json
+import logging
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentIndex:
+    """One centroid vector per document, searched exactly; the coarse stage of two-stage retrieval.
+
+    A document's centroid is the mean of its chunk vectors (re-normalized for cosine search).
+    Documents number in the thousands where chunks number in the millions, so scoring every
+    centroid is cheap, and chunk search can then be restricted to the best documents' chunks.
+    """
+
+    def __init__(self, dimension: int, metric: str = "l2"):
+        self.dimension = dimension
+        self.metric = metric
+        self.source_files: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._centroids = np.empty((0, dimension), dtype="float32")
+        self._live = np.zeros(0, dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def set(self, source_file: str, vectors: np.ndarray) -> None:
+        """Store the centroid of a document's chunk vectors, replacing any previous one."""
+        vectors = np.asarray(vectors, dtype="float32").reshape(-1, self.dimension)
+        if not len(vectors):
+            self.remove(source_file)
+            return
+
+        centroid = vectors.mean(axis=0)
+        if self.metric == "cosine":
+            centroid /= max(float(np.linalg.norm(centroid)), 1e-12)
+
+        row = self._rows.get(source_file)
+        if row is None:
+            row = len(self.source_files)
+            self.source_files.append(source_file)
+            self._rows[source_file] = row
+            if row >= len(self._centroids):
+                capacity = max(64, 2 * len(self._centroids))
+                self._centroids = np.vstack([self._centroids, np.zeros((capacity - len(self._centroids), self.dimension), dtype="float32")])
+                self._live = np.concatenate([self._live, np.zeros(capacity - len(self._live), dtype=bool)])
+        self._centroids[row] = centroid
+        self._live[row] = True
+
+    def remove(self, source_file: str) -> None:
+        row = self._rows.pop(source_file, None)
+        if row is not None:
+            # The slot is dropped when the index is next saved.
+            self._live[row] = False
+
+    def search(self, queries: np.ndarray, m: int) -> List[List[str]]:
+        """Source files of the m documents whose centroids best match each query, best first."""
+        queries = np.asarray(queries, dtype="float32").reshape(-1, self.dimension)
+        count = len(self.source_files)
+        if not len(self._rows) or m <= 0:
+            return [[] for _ in queries]
+
+        centroids = self._centroids[:count]
+        scores = queries @ centroids.T
+        if self.metric != "cosine":
+            # Larger is better: -||c - q||^2 up to the per-query constant ||q||^2.
+            scores = 2.0 * scores - np.einsum("ij,ij->i", centroids, centroids)[None, :]
+        scores[:, ~self._live[:count]] = -np.inf
+
+        take = min(m, len(self._rows))
+        top = np.argpartition(-scores, take - 1, axis=1)[:, :take]
+        order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+        return [[self.source_files[row] for row in rows] for rows in np.take_along_axis(top, order, axis=1)]
+
+    def save(self, directory: Path) -> None:
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        rows = sorted(self._rows.values())
+        np.save(directory / "centroids.npy", self._centroids[rows] if rows else np.empty((0, self.dimension), dtype="float32"))
+        with open(directory / "documents.json", "w", encoding="utf-8") as doc_file:
+            json.dump({"metric": self.metric, "source_files": [self.source_files[row] for row in rows]}, doc_file)
+
+    @classmethod
+    def load(cls, directory: Path) -> "DocumentIndex":
+        directory = Path(directory)
+        with open(directory / "documents.json", "r", encoding="utf-8") as doc_file:
+            header = json.load(doc_file)
+
+        centroids = np.load(directory / "centroids.npy")
+        index = cls(centroids.shape[1], header.get("metric", "l2"))
+        index.source_files = list(header["source_files"])
+        index._rows = {source_file: row for row, source_file in enumerate(index.source_files)}
+        index._centroids = np.ascontiguousarray(centroids, dtype="float32")
+        index._live = np.ones(len(centroids), dtype=bool)
+        return index
@@ -0,0 +1,125 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from typing import Dict, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# SQLite caps the number of bound parameters per statement; stay well below it.
+_QUERY_BATCH = 500
+
+
+def hash_text(text: str) -> str:
+    """Content hash used as the cache key for a chunk."""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Persistent (model name, chunk hash) -> float32 vector cache with LRU eviction."""
+
+    def __init__(self, path: str, model_name: str, dimension: int, max_entries: int = 100_000):
+        self.path = path
+        self.model_name = model_name
+        self.dimension = dimension
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings (last_used)")
+        self._conn.commit()
+
+    def get_many(self, texts: Sequence[str]) -> Dict[int, np.ndarray]:
+        """Return cached vectors keyed by position in ``texts``."""
+        hashes = [hash_text(text) for text in texts]
+        found: Dict[str, np.ndarray] = {}
+
+        with self._lock:
+            unique = list(dict.fromkeys(hashes))
+            for start in range(0, len(unique), _QUERY_BATCH):
+                batch = unique[start : start + _QUERY_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [self.model_name, *batch],
+                ).fetchall()
+                for text_hash, blob in rows:
+                    vector = np.frombuffer(blob, dtype="float32")
+                    if vector.shape[0] == self.dimension:
+                        found[text_hash] = vector
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(now, self.model_name, text_hash) for text_hash in found],
+                )
+                self._conn.commit()
+
+        result = {i: found[h] for i, h in enumerate(hashes) if h in found}
+        self.hits += len(result)
+        self.misses += len(texts) - len(result)
+        return result
+
+    def put_many(self, texts: Sequence[str], vectors: np.ndarray) -> None:
+        """Store freshly encoded vectors and evict the least recently used overflow."""
+        if not len(texts):
+            return
+
+        now = time.time()
+        rows = [
+            (self.model_name, hash_text(text), np.asarray(vector, dtype="float32").tobytes(), now)
+            for text, vector in zip(texts, vectors)
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        overflow = count - self.max_entries
+        if overflow <= 0:
+            return
+
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+            (overflow,),
+        )
+        logger.info(f"Evicted {overflow} entries from the embedding cache.")
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        return int(count)
+
+    def get_stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "embedding_cache_hits": self.hits,
+            "embedding_cache_misses": self.misses,
+            "embedding_cache_hit_rate": self.hits / lookups if lookups else 0.0,
+            "embedding_cache_entries": len(self),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
@@ -0,0 +1,186 @@
+import json
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+from urllib.parse import urlparse
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FILTER_KEYS = ("url_prefix", "host", "path_prefix", "content_type", "crawled_after", "crawled_before")
+CONTENT_TYPES = ("html", "pdf")
+
+# Path prefixes up to this many segments ("/departments/cse") get a precomputed bitmap.
+PRECOMPUTED_PATH_DEPTH = 2
+COMPILED_CACHE_SIZE = 64
+
+
+def content_type_for(url: str) -> str:
+    return "pdf" if urlparse(url).path.lower().endswith(".pdf") else "html"
+
+
+def _timestamp(value) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        raise ValueError(f"Invalid crawl date '{value}'; use ISO format (2024-01-31) or a Unix timestamp.")
+
+
+def _normalize_path(path: str) -> str:
+    path = "/" + path.strip("/")
+    return path if path != "/" else ""
+
+
+def parse_filters(filters: Optional[Dict]) -> Dict:
+    """Validate and normalize a filter expression; raises ValueError for unknown keys or bad values.
+
+    Supported keys: ``host`` ("nitkkr.ac.in"), ``path_prefix`` ("/departments/cse", matched on whole
+    path segments), ``url_prefix`` (host plus path prefix in one string), ``content_type``
+    ("pdf" or "html"), and ``crawled_after`` / ``crawled_before`` (ISO date or Unix timestamp).
+    """
+    if not filters:
+        return {}
+    unknown = set(filters) - set(FILTER_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown filter keys: {sorted(unknown)}. Supported: {list(FILTER_KEYS)}")
+
+    parsed: Dict = {}
+    url_prefix = filters.get("url_prefix")
+    if url_prefix:
+        url = urlparse(url_prefix if "://" in url_prefix else f"//{url_prefix}")
+        if url.netloc:
+            parsed["host"] = url.netloc.lower()
+        if _normalize_path(url.path):
+            parsed["path_prefix"] = _normalize_path(url.path)
+    if filters.get("host"):
+        parsed["host"] = str(filters["host"]).lower()
+    if filters.get("path_prefix") and _normalize_path(str(filters["path_prefix"])):
+        parsed["path_prefix"] = _normalize_path(str(filters["path_prefix"]))
+    if filters.get("content_type"):
+        content_type = str(filters["content_type"]).lower()
+        if content_type not in CONTENT_TYPES:
+            raise ValueError(f"content_type must be one of {list(CONTENT_TYPES)}")
+        parsed["content_type"] = content_type
+    for key in ("crawled_after", "crawled_before"):
+        if filters.get(key) is not None:
+            parsed[key] = _timestamp(filters[key])
+    return parsed
+
+
+class FacetIndex:
+    """Chunk-id bitmaps per document facet (host, content type, path prefix) for filtered search.
+
+    Bitmaps use FAISS ``IDSelectorBitmap`` layout: bit ``id & 7`` of byte ``id >> 3``. A
+    document covers its own chunks and the chunks its near-duplicates were collapsed into, so
+    a filter matches a chunk if any page carrying it matches. Per-facet bitmaps are rebuilt
+    lazily after the documents under them change; compiled filter bitmaps are cached until then.
+    """
+
+    def __init__(self):
+        self.documents: Dict[str, Dict] = {}
+        self._chunks: Dict[str, np.ndarray] = {}
+        self._members: Dict[str, Set[str]] = {}
+        self._bitmaps: Dict[str, np.ndarray] = {}
+        self._compiled: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        # Concurrent queries share the lazily built bitmaps.
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    @staticmethod
+    def _keys(facets: Dict) -> List[str]:
+        keys = [f"host:{facets['host']}", f"type:{facets['content_type']}"]
+        segments = [segment for segment in facets["path"].split("/") if segment]
+        for depth in range(1, min(len(segments), PRECOMPUTED_PATH_DEPTH) + 1):
+            keys.append("path:/" + "/".join(segments[:depth]))
+        return keys
+
+    def set_document(self, source_file: str, url: str, content_type: str, crawled: float, chunk_ids: Iterable[int]) -> None:
+        """Add or replace a document's facets and the chunk ids it covers."""
+        self.remove_document(source_file)
+        parsed = urlparse(url)
+        facets = {
+            "host": parsed.netloc.lower(),
+            "path": _normalize_path(parsed.path),
+            "content_type": content_type,
+            "crawled": float(crawled),
+        }
+        self.documents[source_file] = facets
+        self._chunks[source_file] = np.fromiter(chunk_ids, dtype=np.int64)
+        for key in self._keys(facets):
+            self._members.setdefault(key, set()).add(source_file)
+            self._bitmaps.pop(key, None)
+        self._compiled.clear()
+
+    def remove_document(self, source_file: str) -> None:
+        facets = self.documents.pop(source_file, None)
+        if facets is None:
+            return
+        del self._chunks[source_file]
+        for key in self._keys(facets):
+            members = self._members[key]
+            members.discard(source_file)
+            if not members:
+                del self._members[key]
+            self._bitmaps.pop(key, None)
+        self._compiled.clear()
+
+    def _union(self, source_files: Iterable[str], num_ids: int) -> np.ndarray:
+        bits = np.zeros(num_ids, dtype=bool)
+        chunk_ids = [self._chunks[source_file] for source_file in source_files]
+        if chunk_ids:
+            ids = np.concatenate(chunk_ids)
+            bits[ids[ids < num_ids]] = True
+        return np.packbits(bits, bitorder="little")
+
+    def _facet_bitmap(self, key: str, num_ids: int) -> np.ndarray:
+        bitmap = self._bitmaps.get(key)
+        if bitmap is None or len(bitmap) != (num_ids + 7) // 8:
+            bitmap = self._union(self._members.get(key, ()), num_ids)
+            self._bitmaps[key] = bitmap
+        return bitmap
+
+    def _path_matches(self, path: str, prefix: str) -> bool:
+        return path == prefix or path.startswith(prefix + "/")
+
+    def bitmap(self, filters: Dict, num_ids: int) -> np.ndarray:
+        """Bitmap over chunk ids 0..num_ids-1 of the chunks matching every clause of parsed filters."""
+        with self._lock:
+            cache_key = json.dumps([filters, num_ids], sort_keys=True)
+            cached = self._compiled.get(cache_key)
+            if cached is not None:
+                self._compiled.move_to_end(cache_key)
+                return cached
+
+            clauses: List[np.ndarray] = []
+            if "host" in filters:
+                clauses.append(self._facet_bitmap(f"host:{filters['host']}", num_ids))
+            if "content_type" in filters:
+                clauses.append(self._facet_bitmap(f"type:{filters['content_type']}", num_ids))
+            if "path_prefix" in filters:
+                prefix = filters["path_prefix"]
+                if prefix.count("/") <= PRECOMPUTED_PATH_DEPTH:
+                    clauses.append(self._facet_bitmap(f"path:{prefix}", num_ids))
+                else:
+                    matching = [sf for sf, facets in self.documents.items() if self._path_matches(facets["path"], prefix)]
+                    clauses.append(self._union(matching, num_ids))
+            if "crawled_after" in filters or "crawled_before" in filters:
+                after = filters.get("crawled_after", float("-inf"))
+                before = filters.get("crawled_before", float("inf"))
+                matching = [sf for sf, facets in self.documents.items() if after <= facets["crawled"] <= before]
+                clauses.append(self._union(matching, num_ids))
+
+            bitmap = self._union(self.documents, num_ids) if not clauses else clauses[0].copy()
+            for clause in clauses[1:]:
+                np.bitwise_and(bitmap, clause, out=bitmap)
+
+            self._compiled[cache_key] = bitmap
+            if len(self._compiled) > COMPILED_CACHE_SIZE:
+                self._compiled.popitem(last=False)
+            return bitmap
@@ -0,0 +1,121 @@
+import logging
+from typing import Optional
+
+import numpy as np
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+try:
+    import faiss  # type: ignore
+
+    FAISS_AVAILABLE = True
+except (ImportError, ModuleNotFoundError):
+    logger.warning("FAISS not available. Using the NumPy search engine.")
+    faiss = None  # type: ignore
+    FAISS_AVAILABLE = False
+
+
+INDEX_TYPES = ("flat", "ivf", "hnsw", "ivfpq")
+INDEX_METRICS = ("l2", "cosine")
+VECTOR_STORAGES = ("float32", "float16", "int8")
+
+# Scalar-quantizer factory codes for each storage option; float32 keeps full vectors.
+_STORAGE_CODES = {"float32": "Flat", "float16": "SQfp16", "int8": "SQ8"}
+
+# FAISS k-means wants roughly this many training points per centroid.
+MIN_POINTS_PER_CENTROID = 39
+
+
+def _index_description(dimension: int, index_type: str, num_training: int, storage: str = "float32") -> str:
+    """Translate the configured index type into a FAISS factory string that can be trained on num_training vectors."""
+    if storage not in _STORAGE_CODES:
+        logger.warning(f"Unknown VECTOR_STORAGE '{storage}'. Storing float32 vectors.")
+        storage = "float32"
+    if storage == "int8" and num_training == 0:
+        storage = "float32"  # SQ8 learns per-dimension ranges, so it needs training data
+    codes = _STORAGE_CODES[storage]
+
+    if index_type == "hnsw":
+        return f"HNSW{Config.HNSW_M}" if codes == "Flat" else f"HNSW{Config.HNSW_M},{codes}"
+
+    if index_type in ("ivf", "ivfpq"):
+        nlist = min(Config.IVF_NLIST, num_training // MIN_POINTS_PER_CENTROID)
+        if nlist < 1:
+            logger.warning(f"Only {num_training} vectors available; too few to train {index_type}. Using a flat index.")
+            return codes
+        if index_type == "ivf":
+            return f"IVF{nlist},{codes}"
+        if dimension % Config.PQ_M != 0 or num_training < 2**Config.PQ_NBITS:
+            logger.warning(f"PQ{Config.PQ_M}x{Config.PQ_NBITS} cannot be trained here. Using IVF{nlist},{codes}.")
+            return f"IVF{nlist},{codes}"
+        return f"IVF{nlist},PQ{Config.PQ_M}x{Config.PQ_NBITS}"
+
+    if index_type != "flat":
+        logger.warning(f"Unknown INDEX_TYPE '{index_type}'. Using a flat index.")
+    return codes
+
+
+def apply_search_params(index) -> None:
+    """Apply the configured query-time knobs (nprobe / efSearch) to an index."""
+    params = faiss.ParameterSpace()
+    if faiss.try_extract_index_ivf(index) is not None:
+        params.set_index_parameter(index, "nprobe", Config.IVF_NPROBE)
+    elif isinstance(faiss.downcast_index(getattr(index, "index", index)), faiss.IndexHNSW):
+        params.set_index_parameter(index, "efSearch", Config.HNSW_EF_SEARCH)
+
+
+def build_faiss_index(
+    dimension: int,
+    index_type: str = "flat",
+    training_vectors: Optional[np.ndarray] = None,
+    metric: str = "l2",
+    storage: str = "float32",
+):
+    """Create an empty ID-mapped FAISS index of the given type, trained on training_vectors when needed.
+
+    With metric="cosine" the index uses inner product; callers must L2-normalize vectors and queries.
+    """
+    num_training = 0 if training_vectors is None else len(training_vectors)
+    description = _index_description(dimension, index_type, num_training, storage)
+    faiss_metric = faiss.METRIC_INNER_PRODUCT if metric == "cosine" else faiss.METRIC_L2
+    index = faiss.index_factory(dimension, f"IDMap,{description}", faiss_metric)
+
+    if description.startswith("HNSW"):
+        faiss.downcast_index(index.index).hnsw.efConstruction = Config.HNSW_EF_CONSTRUCTION
+    if not index.is_trained:
+        logger.info(f"Training {description} index on {num_training} vectors...")
+        index.train(training_vectors)
+
+    apply_search_params(index)
+    return index
+
+
+def filter_search_params(index, excluded: np.ndarray):
+    """FAISS search parameters that skip the excluded ids, keeping the index's own nprobe / efSearch."""
+    return _selector_search_params(index, faiss.IDSelectorNot(faiss.IDSelectorBatch(excluded)))
+
+
+def include_search_params(index, included: np.ndarray):
+    """FAISS search parameters that only consider the included ids."""
+    return _selector_search_params(index, faiss.IDSelectorBatch(included))
+
+
+def bitmap_search_params(index, bitmap: np.ndarray):
+    """FAISS search parameters that only consider ids whose bit is set in a FacetIndex bitmap."""
+    selector = faiss.IDSelectorBitmap(len(bitmap), faiss.swig_ptr(bitmap))
+    params = _selector_search_params(index, selector)
+    # The selector only points at the bitmap, so keep the array alive as long as the parameters.
+    params.referenced_objects = [selector, bitmap]
+    return params
+
+
+def _selector_search_params(index, selector):
+    ivf = faiss.try_extract_index_ivf(index)
+    inner = faiss.downcast_index(getattr(index, "index", index))
+    if ivf is not None:
+        return faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nprobe)
+    if isinstance(inner, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=inner.hnsw.efSearch)
+    return faiss.SearchParameters(sel=selector)
@@ -29,26 +29,42 @@ function ChatInterface() {
     setMessages(prev => [...prev, userMessage])
     setLoading(true)
 
+    const botId = Date.now() + 1
+    const updateBot = (update) => {
+      setMessages(prev => prev.map(message => (
+        message.id === botId ? { ...message, ...update(message) } : message
+      )))
+    }
+
     try {
-      const response = await queryRAG(query)
-      const botMessage = {
-        id: Date.now() + 1,
-        type: 'bot',
-        content: response.response,
-        sources: response.sources,
-        timestamp: new Date()
-      }
-      setMessages(prev => [...prev, botMessage])
+      // The bot message appears with its sources and then fills in token by token
+      const response = await queryRAG(query, 5, {
+        onSources: ({ sources }) => {
+          setMessages(prev => [...prev, {
+            id: botId,
+            type: 'bot',
+            content: '',
+            sources,
+            streaming: true,
+            timestamp: new Date()
+          }])
+        },
+        onToken: (text) => updateBot(message => ({ content: message.content + text })),
+      })
+      setMessages(prev => prev.some(message => message.id === botId)
+        ? prev
+        : [...prev, { id: botId, type: 'bot', sources: response.sources, timestamp: new Date() }])
+      updateBot(() => ({ content: response.response, streaming: false }))
     } catch (error) {
       console.error('Error querying RAG:', error)
       const errorMessage = {
-        id: Date.now() + 1,
+        id: botId,
         type: 'bot',
         content: 'Sorry, I encountered an error processing your query. Please try again.',
         error: true,
         timestamp: new Date()
       }
-      setMessages(prev => [...prev, errorMessage])
+      setMessages(prev => [...prev.filter(message => message.id !== botId), errorMessage])
     } finally {
       setLoading(false)
     }
@@ -13,7 +13,7 @@ function Message({ message }) {
       </div>
       <div className="message-content">
         <div className={`message-bubble ${message.error ? 'message-error' : ''}`}>
-          <p className="message-text">{message.content}</p>
+          <p className={`message-text ${message.streaming ? 'message-streaming' : ''}`}>{message.content}</p>
           {hasSources && (
             <div className="message-sources">
               <button
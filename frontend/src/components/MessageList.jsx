@@ -3,12 +3,15 @@ import LoadingIndicator from './LoadingIndicator'
 import './MessageList.css'
 
 function MessageList({ messages, loading }) {
+  // Once the answer starts streaming, the message itself shows progress
+  const streaming = messages.some(message => message.streaming)
+
   return (
     <div className="message-list">
       {messages.map((message) => (
         <Message key={message.id} message={message} />
       ))}
-      {loading && <LoadingIndicator />}
+      {loading && !streaming && <LoadingIndicator />}
     </div>
   )
 }
@@ -1,14 +1,32 @@
 const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000'
 
 /**
- * Query the RAG system
+ * Parse one Server-Sent Events block into { event, data }
+ * @param {string} block - Raw event text without the trailing blank line
+ * @returns {{event: string, data: Object}}
+ */
+function parseEvent(block) {
+  let event = 'message'
+  const data = []
+  for (const line of block.split('\n')) {
+    if (line.startsWith('event:')) event = line.slice(6).trim()
+    else if (line.startsWith('data:')) data.push(line.slice(5).trimStart())
+  }
+  return { event, data: data.length ? JSON.parse(data.join('\n')) : {} }
+}
+
+/**
+ * Query the RAG system, streaming the answer as it is generated
  * @param {string} query - The user's question
  * @param {number} k - Number of documents to retrieve (default: 5)
- * @returns {Promise<Object>} Response with answer and sources
+ * @param {Object} handlers - Optional callbacks
+ * @param {Function} handlers.onSources - Called with { sources, num_sources, cached } before the answer starts
+ * @param {Function} handlers.onToken - Called with each new piece of the answer text
+ * @returns {Promise<Object>} Response with the full answer, sources and time_to_first_token_ms
  */
-export async function queryRAG(query, k = 5) {
+export async function queryRAG(query, k = 5, { onSources, onToken } = {}) {
   try {
-    const response = await fetch(`${API_BASE_URL}/api/query`, {
+    const response = await fetch(`${API_BASE_URL}/api/query/stream`, {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
@@ -21,7 +39,35 @@ export async function queryRAG(query, k = 5) {
       throw new Error(error.detail || `HTTP error! status: ${response.status}`)
     }
 
-    return await response.json()
+    const result = { query, response: '', sources: [], num_sources: 0, cached: false }
+    const reader = response.body.pipeThrough(new TextDecoderStream()).getReader()
+    let buffer = ''
+
+    while (true) {
+      const { value, done } = await reader.read()
+      if (done) break
+      buffer += value.replace(/\r\n/g, '\n')
+
+      let boundary
+      while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+        const { event, data } = parseEvent(buffer.slice(0, boundary))
+        buffer = buffer.slice(boundary + 2)
+
+        if (event === 'sources') {
+          Object.assign(result, data)
+          onSources?.(data)
+        } else if (event === 'token') {
+          result.response += data.text
+          onToken?.(data.text)
+        } else if (event === 'done') {
+          result.time_to_first_token_ms = data.time_to_first_token_ms
+        } else if (event === 'error') {
+          throw new Error(data.detail || 'Error processing query')
+        }
+      }
+    }
+
+    return result
   } catch (error) {
     console.error('Error querying RAG:', error)
     throw error
@@ -1,6 +1,6 @@
 import os
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterator
 
 # Try to load environment variables from .env file
 try:
@@ -75,20 +75,45 @@ class GroqLLMService:
             logger.error(f"Error generating response with Groq: {e}")
             raise
     
-    def generate_rag_response(self, query: str, context: str, max_tokens: int = 1024) -> str:
+    def generate_response_stream(self, prompt: str, max_tokens: int = 1024, temperature: float = 0.7) -> Iterator[str]:
         """
-        Generate a RAG response using retrieved context.
+        Stream a response from Groq LLM, yielding text deltas as they are generated.
         
         Args:
-            query: User query
-            context: Retrieved context from vector search
+            prompt: Input prompt for the LLM
             max_tokens: Maximum number of tokens to generate
+            temperature: Sampling temperature (0.0 to 1.0)
             
-        Returns:
-            Generated response based on context
+        Yields:
+            Pieces of the generated response text
         """
-        # Create a comprehensive prompt for RAG
-        prompt = f"""You are a helpful assistant for NIT Kurukshetra (National Institute of Technology Kurukshetra). 
+        try:
+            stream = self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {
+                        "role": "user",
+                        "content": prompt
+                    }
+                ],
+                max_tokens=max_tokens,
+                temperature=temperature,
+                top_p=1,
+                stream=True,
+                stop=None
+            )
+            
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+            
+        except Exception as e:
+            logger.error(f"Error streaming response with Groq: {e}")
+            raise
+    
+    def build_rag_prompt(self, query: str, context: str) -> str:
+        """Prompt asking the LLM to answer ``query`` from the retrieved ``context`` only."""
+        return f"""You are a helpful assistant for NIT Kurukshetra (National Institute of Technology Kurukshetra). 
 Your role is to answer questions about the institute based on the provided context from their official website.
 
 User Query: {query}
@@ -106,14 +131,45 @@ Instructions:
 8. If you cannot answer based on the context, suggest the user visit the official website for more details
 
 Response:"""
-
+    
+    def generate_rag_response(self, query: str, context: str, max_tokens: int = 1024, fallback: bool = True) -> str:
+        """
+        Generate a RAG response using retrieved context.
+        
+        Args:
+            query: User query
+            context: Retrieved context from vector search
+            max_tokens: Maximum number of tokens to generate
+            fallback: Return a canned apology if generation fails; if False, re-raise the error
+            
+        Returns:
+            Generated response based on context
+        """
+        prompt = self.build_rag_prompt(query, context)
+        
         try:
             return self.generate_response(prompt, max_tokens, temperature=0.3)  # Lower temperature for factual responses
         except Exception as e:
             logger.error(f"Error generating RAG response: {e}")
+            if not fallback:
+                raise
             # Fallback response
             return f"I apologize, but I'm experiencing technical difficulties. However, based on the retrieved information about NIT Kurukshetra, please visit their official website for detailed information about '{query}'."
     
+    def generate_rag_response_stream(self, query: str, context: str, max_tokens: int = 1024) -> Iterator[str]:
+        """
+        Stream a RAG response using retrieved context.
+        
+        Args:
+            query: User query
+            context: Retrieved context from vector search
+            max_tokens: Maximum number of tokens to generate
+            
+        Yields:
+            Pieces of the generated response text
+        """
+        return self.generate_response_stream(self.build_rag_prompt(query, context), max_tokens, temperature=0.3)
+    
     def test_connection(self) -> bool:
         """
         Test the connection to Groq API.
@@ -0,0 +1,187 @@
+import json
+import logging
+import math
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Compound tokens keep identifiers such as "cs-101", "2023/45" or "b.tech" intact; their parts are indexed too.
+_TOKEN_PATTERN = re.compile(r"\w+(?:[-/.]\w+)*")
+_PART_PATTERN = re.compile(r"[-/.]")
+
+LENGTH_DTYPE = np.dtype([("chunk_id", "<i8"), ("length", "<i4")])
+
+
+def tokenize(text: str) -> List[str]:
+    tokens: List[str] = []
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        tokens.append(token)
+        parts = _PART_PATTERN.split(token)
+        if len(parts) > 1:
+            tokens.extend(part for part in parts if part)
+    return tokens
+
+
+def _encode_varint(value: int, out: bytearray) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _decode_postings(blob: bytes) -> Iterable[Tuple[int, int]]:
+    """Yield (chunk_id, term_frequency) pairs from delta + varint encoded postings."""
+    chunk_id = 0
+    values: List[int] = []
+    value = shift = 0
+    for byte in blob:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        values.append(value)
+        value = shift = 0
+        if len(values) == 2:
+            chunk_id += values[0]
+            yield chunk_id, values[1]
+            values = []
+
+
+class BM25Index:
+    """Inverted index over chunk text with varint/delta-compressed postings and BM25 scoring.
+
+    Chunk ids are assigned in increasing order, so postings are append-only. Deleted chunks are
+    masked until ``compact`` rewrites the postings without them.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, bytearray] = {}
+        self.last_ids: Dict[str, int] = {}
+        self.lengths: Dict[int, int] = {}
+        self.deleted: Set[int] = set()
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def add(self, chunk_id: int, text: str) -> None:
+        terms = Counter(tokenize(text))
+        for term, tf in terms.items():
+            last = self.last_ids.get(term, 0)
+            if chunk_id < last:
+                raise ValueError("Chunks must be added in increasing chunk_id order.")
+            postings = self.postings.setdefault(term, bytearray())
+            _encode_varint(chunk_id - last, postings)
+            _encode_varint(tf, postings)
+            self.last_ids[term] = chunk_id
+
+        length = sum(terms.values())
+        self.lengths[chunk_id] = length
+        self.total_length += length
+
+    def remove(self, chunk_ids: Iterable[int]) -> None:
+        for chunk_id in chunk_ids:
+            length = self.lengths.pop(chunk_id, None)
+            if length is not None:
+                self.total_length -= length
+                self.deleted.add(chunk_id)
+
+    def search(self, query: str, k: int = 10, allowed: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """Top-k (chunk_id, bm25_score) pairs for the query, limited to chunk ids set in the ``allowed`` bitmap."""
+        if not self.lengths:
+            return []
+
+        num_docs = len(self.lengths)
+        avg_length = self.total_length / num_docs
+        scores: Dict[int, float] = {}
+
+        for term in set(tokenize(query)):
+            blob = self.postings.get(term)
+            if not blob:
+                continue
+            matches = [(cid, tf) for cid, tf in _decode_postings(blob) if cid not in self.deleted]
+            if not matches:
+                continue
+
+            idf = math.log(1.0 + (num_docs - len(matches) + 0.5) / (len(matches) + 0.5))
+            for chunk_id, tf in matches:
+                norm = self.k1 * (1.0 - self.b + self.b * self.lengths[chunk_id] / avg_length)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.k1 + 1.0) / (tf + norm)
+
+        if allowed is not None:
+            scores = {
+                chunk_id: score
+                for chunk_id, score in scores.items()
+                if chunk_id >> 3 < len(allowed) and (allowed[chunk_id >> 3] >> (chunk_id & 7)) & 1
+            }
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def compact(self) -> None:
+        """Rewrite postings without deleted chunks."""
+        if not self.deleted:
+            return
+
+        for term in list(self.postings):
+            kept = bytearray()
+            last = 0
+            for chunk_id, tf in _decode_postings(self.postings[term]):
+                if chunk_id in self.deleted:
+                    continue
+                _encode_varint(chunk_id - last, kept)
+                _encode_varint(tf, kept)
+                last = chunk_id
+
+            if kept:
+                self.postings[term] = kept
+                self.last_ids[term] = last
+            else:
+                del self.postings[term]
+                del self.last_ids[term]
+
+        logger.info(f"Compacted lexical index, dropping {len(self.deleted)} deleted chunks.")
+        self.deleted = set()
+
+    def save(self, directory: Path, compact_ratio: float = 0.1) -> None:
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        if len(self.deleted) > compact_ratio * max(1, len(self.lengths)):
+            self.compact()
+
+        terms: Dict[str, List[int]] = {}
+        offset = 0
+        with open(directory / "postings.bin", "wb") as postings_file:
+            for term, blob in self.postings.items():
+                postings_file.write(blob)
+                terms[term] = [offset, len(blob), self.last_ids[term]]
+                offset += len(blob)
+
+        with open(directory / "terms.json", "w", encoding="utf-8") as terms_file:
+            json.dump({"k1": self.k1, "b": self.b, "terms": terms, "deleted": sorted(self.deleted)}, terms_file)
+
+        lengths = np.array(sorted(self.lengths.items()), dtype=LENGTH_DTYPE) if self.lengths else np.empty(0, LENGTH_DTYPE)
+        np.save(directory / "lengths.npy", lengths)
+
+    @classmethod
+    def load(cls, directory: Path) -> "BM25Index":
+        directory = Path(directory)
+        with open(directory / "terms.json", "r", encoding="utf-8") as terms_file:
+            header = json.load(terms_file)
+
+        index = cls(header.get("k1", 1.2), header.get("b", 0.75))
+        postings = (directory / "postings.bin").read_bytes()
+        for term, (offset, length, last_id) in header["terms"].items():
+            index.postings[term] = bytearray(postings[offset : offset + length])
+            index.last_ids[term] = last_id
+
+        lengths = np.load(directory / "lengths.npy")
+        index.lengths = dict(zip(lengths["chunk_id"].tolist(), lengths["length"].tolist()))
+        index.total_length = int(lengths["length"].sum())
+        index.deleted = set(header.get("deleted", []))
+        return index
@@ -7,6 +7,7 @@ from pathlib import Path
 from scraper import main as scraper_main
 from vector_embeddings import VectorEmbeddingSystem, main as embeddings_main
 from rag_system import main as rag_main
+from distributed_build import run_local_build
 
 
 def run_update(file_path: str) -> bool:
@@ -40,10 +41,36 @@ def run_update(file_path: str) -> bool:
         return False
 
 
+def run_sync(text_dir: str) -> bool:
+    """Handle the directory-level incremental sync command."""
+    print(f"🔄 Syncing vector store with: {text_dir}")
+
+    try:
+        system = VectorEmbeddingSystem()
+        if not system.load_vector_store():
+            print("❌ Error: Could not load existing vector store.")
+            print("   Run 'python main.py embed' first to create the index.")
+            return False
+
+        summary = system.sync_directory(text_dir)
+        print(
+            f"✅ Sync complete: {summary['added']} added, {summary['updated']} updated, "
+            f"{summary['deleted']} deleted, {summary['unchanged']} unchanged"
+        )
+        if summary["failed"]:
+            print(f"⚠️  {summary['failed']} files could not be processed. Check logs for details.")
+        print(f"   Total chunks now: {system.get_stats()['total_chunks']}")
+        return True
+
+    except Exception as exc:
+        print(f"❌ Unexpected error: {exc}")
+        return False
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(description="NIT Kurukshetra RAG System")
-    parser.add_argument("command", choices=["scrape", "embed", "rag", "full", "stats", "update"], help="Command to run")
-    parser.add_argument("file", nargs="?", help="File path for update command")
+    parser.add_argument("command", choices=["scrape", "embed", "rag", "full", "stats", "update", "sync", "convert", "compact", "build"], help="Command to run")
+    parser.add_argument("file", nargs="?", help="File path for update command (directory for sync and build)")
     args = parser.parse_args()
 
     if args.command == "scrape":
@@ -65,6 +92,32 @@ def main() -> int:
             return 1
         return 0 if run_update(args.file) else 1
 
+    if args.command == "sync":
+        return 0 if run_sync(args.file or "extracted_text") else 1
+
+    if args.command == "convert":
+        system = VectorEmbeddingSystem()
+        if system.convert_legacy_store():
+            print(f"✅ Vector store converted to segment format ({system.get_stats()['total_chunks']} chunks)")
+            return 0
+        print("❌ Conversion failed. Check logs for details.")
+        return 1
+
+    if args.command == "compact":
+        system = VectorEmbeddingSystem()
+        if not system.load_vector_store():
+            print("❌ Error: Could not load existing vector store.")
+            return 1
+        tombstones = len(system.tombstones)
+        system.save_vector_store(compact=True)
+        print(f"✅ Dropped {tombstones} deleted vectors; chunk ids renumbered 0..{system.next_chunk_id - 1}")
+        return 0
+
+    if args.command == "build":
+        total = run_local_build(args.file or "extracted_text")
+        print(f"✅ Built and published {total} chunks")
+        return 0
+
     if args.command == "full":
         scraper_main()
         embeddings_main()
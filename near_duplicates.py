@@ -0,0 +1,161 @@
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from segment_store import DOCUMENT_FIELDS
+
+logger = logging.getLogger(__name__)
+
+FINGERPRINT_BITS = 64
+SHINGLE_WORDS = 3
+# Shorter chunks (page footers, stray headings) carry too few shingles for a meaningful fingerprint.
+MIN_WORDS = 8
+
+FINGERPRINT_DTYPE = np.dtype([("chunk_id", "<i8"), ("fingerprint", "<u8")])
+
+_BIT_SHIFTS = np.arange(FINGERPRINT_BITS, dtype=np.uint64)
+
+
+def simhash(text: str) -> Optional[int]:
+    """64-bit SimHash over word shingles, or None for chunks too short to fingerprint."""
+    words = text.lower().split()
+    if len(words) < MIN_WORDS:
+        return None
+
+    shingles = {" ".join(words[i : i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little") for s in shingles),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+    bits = (hashes[:, None] >> _BIT_SHIFTS) & np.uint64(1)
+    # Each output bit is set when most shingle hashes have it set.
+    majority = bits.sum(axis=0) * 2 > len(hashes)
+    return int(np.packbits(majority, bitorder="little").view("<u8")[0])
+
+
+class DuplicateIndex:
+    """Near-duplicate detector over chunk SimHash fingerprints.
+
+    Every indexed (canonical) chunk has a fingerprint; a new chunk whose fingerprint is within
+    ``max_distance`` bits of one of them is recorded as a duplicate source of that chunk instead of
+    getting its own vector. Fingerprints are split into ``max_distance + 1`` blocks, so any match
+    shares at least one block exactly and candidates come from block lookups rather than a scan.
+    """
+
+    def __init__(self, max_distance: int = 3):
+        self.max_distance = max(0, min(max_distance, FINGERPRINT_BITS // 2 - 1))
+        num_blocks = self.max_distance + 1
+        bounds = [round(i * FINGERPRINT_BITS / num_blocks) for i in range(num_blocks + 1)]
+        self._blocks = [(start, (1 << (end - start)) - 1) for start, end in zip(bounds, bounds[1:])]
+        self._buckets: List[Dict[int, List[int]]] = [{} for _ in self._blocks]
+
+        self.fingerprints: Dict[int, int] = {}
+        # Canonical chunk id -> documents whose chunks were collapsed into it.
+        self.sources: Dict[int, List[Dict]] = {}
+        # Source file -> canonical chunk ids it contributed duplicates to (one entry per chunk).
+        self._by_file: Dict[str, List[int]] = {}
+        self.duplicate_count = 0
+
+    def find(self, fingerprint: int) -> Optional[int]:
+        """Lowest canonical chunk id within max_distance bits of the fingerprint, if any."""
+        best: Optional[int] = None
+        for (shift, mask), buckets in zip(self._blocks, self._buckets):
+            for chunk_id in buckets.get((fingerprint >> shift) & mask, ()):
+                if (best is None or chunk_id < best) and bin(self.fingerprints[chunk_id] ^ fingerprint).count("1") <= self.max_distance:
+                    best = chunk_id
+        return best
+
+    def add(self, chunk_id: int, fingerprint: int) -> None:
+        self.fingerprints[chunk_id] = fingerprint
+        for (shift, mask), buckets in zip(self._blocks, self._buckets):
+            buckets.setdefault((fingerprint >> shift) & mask, []).append(chunk_id)
+
+    def add_duplicate(self, canonical_id: int, document: Dict) -> None:
+        source = {field: document.get(field, "Unknown") for field in DOCUMENT_FIELDS}
+        self.sources.setdefault(canonical_id, []).append(source)
+        self._by_file.setdefault(source["source_file"], []).append(canonical_id)
+        self.duplicate_count += 1
+
+    def remove(self, chunk_id: int) -> List[Dict]:
+        """Forget a canonical chunk and return the duplicate sources that pointed at it."""
+        fingerprint = self.fingerprints.pop(chunk_id, None)
+        if fingerprint is not None:
+            for (shift, mask), buckets in zip(self._blocks, self._buckets):
+                key = (fingerprint >> shift) & mask
+                bucket = buckets[key]
+                bucket.remove(chunk_id)
+                if not bucket:
+                    del buckets[key]
+
+        orphans = self.sources.pop(chunk_id, [])
+        for source in orphans:
+            canonical_ids = self._by_file[source["source_file"]]
+            canonical_ids.remove(chunk_id)
+            if not canonical_ids:
+                del self._by_file[source["source_file"]]
+        self.duplicate_count -= len(orphans)
+        return orphans
+
+    def remove_source(self, source_file: str) -> int:
+        """Drop every duplicate a document contributed; returns how many were dropped."""
+        canonical_ids = self._by_file.pop(source_file, [])
+        for canonical_id in set(canonical_ids):
+            remaining = [s for s in self.sources[canonical_id] if s["source_file"] != source_file]
+            if remaining:
+                self.sources[canonical_id] = remaining
+            else:
+                del self.sources[canonical_id]
+        self.duplicate_count -= len(canonical_ids)
+        return len(canonical_ids)
+
+    def duplicates_of(self, source_file: str) -> List[int]:
+        """Canonical chunk ids a document's collapsed chunks map to, in the order they were added."""
+        return list(self._by_file.get(source_file, []))
+
+    def source_urls(self, chunk_id: int, url: str) -> List[str]:
+        """The chunk's own URL followed by the distinct URLs of pages that repeat it."""
+        urls = [url]
+        for source in self.sources.get(chunk_id, ()):
+            if source["url"] not in urls:
+                urls.append(source["url"])
+        return urls
+
+    def remapped(self, id_map: Dict[int, int]) -> "DuplicateIndex":
+        """Copy with canonical chunk ids renumbered (see save_vector_store compaction)."""
+        remapped = DuplicateIndex(self.max_distance)
+        for chunk_id, fingerprint in sorted(self.fingerprints.items()):
+            if chunk_id in id_map:
+                remapped.add(id_map[chunk_id], fingerprint)
+        for chunk_id, sources in self.sources.items():
+            if chunk_id in id_map:
+                for source in sources:
+                    remapped.add_duplicate(id_map[chunk_id], source)
+        return remapped
+
+    def save(self, directory: Path) -> None:
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        fingerprints = np.array(sorted(self.fingerprints.items()), dtype=FINGERPRINT_DTYPE) if self.fingerprints else np.empty(0, FINGERPRINT_DTYPE)
+        np.save(directory / "fingerprints.npy", fingerprints)
+        with open(directory / "sources.json", "w", encoding="utf-8") as sources_file:
+            json.dump({"max_distance": self.max_distance, "sources": self.sources}, sources_file)
+
+    @classmethod
+    def load(cls, directory: Path, max_distance: Optional[int] = None) -> "DuplicateIndex":
+        directory = Path(directory)
+        with open(directory / "sources.json", "r", encoding="utf-8") as sources_file:
+            header = json.load(sources_file)
+
+        index = cls(header.get("max_distance", 3) if max_distance is None else max_distance)
+        fingerprints = np.load(directory / "fingerprints.npy")
+        for chunk_id, fingerprint in zip(fingerprints["chunk_id"].tolist(), fingerprints["fingerprint"].tolist()):
+            index.add(chunk_id, fingerprint)
+        for chunk_id, sources in header["sources"].items():
+            for source in sources:
+                index.add_duplicate(int(chunk_id), source)
+        return index
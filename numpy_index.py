@@ -0,0 +1,161 @@
+import logging
+from typing import Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Same values as faiss.METRIC_INNER_PRODUCT / faiss.METRIC_L2 so callers can compare either engine's metric_type.
+METRIC_INNER_PRODUCT = 0
+METRIC_L2 = 1
+
+
+class NumpyFlatIndex:
+    """Exact top-k search over a (possibly memory-mapped) embedding matrix using blocked matmuls.
+
+    Implements the subset of the FAISS IndexIDMap API the vector store uses, so it can stand in
+    when FAISS is not installed. The base matrix is never copied; added vectors live in a small
+    in-memory tail and removals are masked.
+    """
+
+    def __init__(
+        self,
+        dimension: int,
+        metric_type: int = METRIC_L2,
+        base_vectors: Optional[np.ndarray] = None,
+        base_ids: Optional[np.ndarray] = None,
+        block_rows: int = 65536,
+    ):
+        self.d = dimension
+        self.metric_type = metric_type
+        self.is_trained = True
+        self.block_rows = block_rows
+
+        self._base = base_vectors if base_vectors is not None else np.empty((0, dimension), dtype="float32")
+        self._base_ids = np.asarray(base_ids if base_ids is not None else np.empty(0), dtype=np.int64)
+        self._base_alive = np.ones(len(self._base_ids), dtype=bool)
+        # Segment rows are sorted by chunk id, which lets restricted searches find rows by binary search.
+        self._base_sorted = bool(np.all(np.diff(self._base_ids) > 0))
+        self._base_sq_norms: Optional[np.ndarray] = None
+
+        self._tail = np.empty((0, dimension), dtype="float32")
+        self._tail_ids = np.empty(0, dtype=np.int64)
+
+    @classmethod
+    def from_segment(cls, segment, metric_type: int = METRIC_L2, block_rows: int = 65536) -> "NumpyFlatIndex":
+        """Search a segment's memory-mapped embeddings in place."""
+        return cls(segment.embeddings.shape[1], metric_type, segment.embeddings, segment.chunk_ids, block_rows)
+
+    @property
+    def ntotal(self) -> int:
+        return int(self._base_alive.sum()) + len(self._tail_ids)
+
+    def reset(self) -> None:
+        self.__init__(self.d, self.metric_type, block_rows=self.block_rows)
+
+    def add_with_ids(self, vectors: np.ndarray, ids: np.ndarray) -> None:
+        vectors = np.asarray(vectors, dtype="float32").reshape(-1, self.d)
+        self._tail = np.vstack([self._tail, vectors])
+        self._tail_ids = np.concatenate([self._tail_ids, np.asarray(ids, dtype=np.int64)])
+
+    def remove_ids(self, ids: np.ndarray) -> int:
+        ids = np.asarray(ids, dtype=np.int64)
+        base_hits = np.isin(self._base_ids, ids) & self._base_alive
+        self._base_alive &= ~base_hits
+
+        tail_keep = ~np.isin(self._tail_ids, ids)
+        removed = int(base_hits.sum()) + int((~tail_keep).sum())
+        self._tail = self._tail[tail_keep]
+        self._tail_ids = self._tail_ids[tail_keep]
+        return removed
+
+    def _scores(self, block: np.ndarray, queries: np.ndarray, sq_norms: Optional[np.ndarray]) -> np.ndarray:
+        """Block-by-query score matrix where larger is always better."""
+        dots = block @ queries.T
+        if self.metric_type == METRIC_INNER_PRODUCT:
+            return dots
+        # -||x - q||^2 without the constant ||q||^2 term, which does not change the ranking.
+        return 2.0 * dots - sq_norms[:, None]
+
+    def _base_norms(self) -> np.ndarray:
+        if self._base_sq_norms is None:
+            norms = np.empty(len(self._base), dtype="float32")
+            for i in range(0, len(self._base), self.block_rows):
+                block = np.asarray(self._base[i : i + self.block_rows], dtype="float32")
+                norms[i : i + len(block)] = np.einsum("ij,ij->i", block, block)
+            self._base_sq_norms = norms
+        return self._base_sq_norms
+
+    def _subset(self, included: np.ndarray) -> "NumpyFlatIndex":
+        """Small in-memory index over just the included ids that are still present."""
+        included = np.asarray(included, dtype=np.int64)
+        if self._base_sorted and len(self._base_ids):
+            positions = np.minimum(np.searchsorted(self._base_ids, included), len(self._base_ids) - 1)
+            rows = positions[(self._base_ids[positions] == included) & self._base_alive[positions]]
+        else:
+            rows = np.flatnonzero(np.isin(self._base_ids, included) & self._base_alive)
+        tail_rows = np.flatnonzero(np.isin(self._tail_ids, included))
+
+        vectors = np.vstack([np.asarray(self._base[rows], dtype="float32"), self._tail[tail_rows]])
+        ids = np.concatenate([self._base_ids[rows], self._tail_ids[tail_rows]])
+        return NumpyFlatIndex(self.d, self.metric_type, vectors, ids, self.block_rows)
+
+    def search(
+        self,
+        queries: np.ndarray,
+        k: int,
+        excluded: Optional[np.ndarray] = None,
+        included: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (scores, ids) shaped (n_queries, k) in FAISS conventions; missing slots have id -1.
+
+        ``excluded`` ids (tombstones) are skipped, like a FAISS IDSelectorNot search parameter.
+        With ``included``, only those ids are scored, like a FAISS IDSelectorBatch parameter.
+        """
+        if included is not None:
+            return self._subset(included).search(queries, k, excluded)
+
+        queries = np.asarray(queries, dtype="float32").reshape(-1, self.d)
+        nq = len(queries)
+        best_scores = np.full((nq, k), -np.inf, dtype="float32")
+        best_ids = np.full((nq, k), -1, dtype=np.int64)
+
+        blocks = [
+            (self._base[i : i + self.block_rows], self._base_ids[i : i + self.block_rows],
+             self._base_alive[i : i + self.block_rows], i)
+            for i in range(0, len(self._base), self.block_rows)
+        ]
+        if len(self._tail_ids):
+            blocks.append((self._tail, self._tail_ids, None, None))
+
+        for block, block_ids, alive, offset in blocks:
+            if self.metric_type == METRIC_L2:
+                if offset is None:
+                    sq_norms = np.einsum("ij,ij->i", block, block)
+                else:
+                    sq_norms = self._base_norms()[offset : offset + len(block)]
+            else:
+                sq_norms = None
+
+            scores = self._scores(np.asarray(block, dtype="float32"), queries, sq_norms).T  # (nq, rows)
+            if alive is not None and not alive.all():
+                scores[:, ~alive] = -np.inf
+            if excluded is not None and len(excluded):
+                scores[:, np.isin(block_ids, excluded)] = -np.inf
+
+            take = min(k, scores.shape[1])
+            top = np.argpartition(-scores, take - 1, axis=1)[:, :take]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+
+            merged_scores = np.concatenate([best_scores, top_scores], axis=1)
+            merged_ids = np.concatenate([best_ids, block_ids[top]], axis=1)
+            order = np.argsort(-merged_scores, axis=1)[:, :k]
+            best_scores = np.take_along_axis(merged_scores, order, axis=1)
+            best_ids = np.take_along_axis(merged_ids, order, axis=1)
+
+        best_ids[~np.isfinite(best_scores)] = -1
+        if self.metric_type == METRIC_L2:
+            # Report squared L2 distances like IndexFlatL2.
+            q_norms = np.einsum("ij,ij->i", queries, queries)[:, None]
+            best_scores = np.maximum(q_norms - best_scores, 0.0)
+        return best_scores, best_ids
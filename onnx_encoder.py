@@ -0,0 +1,281 @@
+"""ONNX Runtime backend for the sentence embedding model.
+
+``python onnx_encoder.py export`` converts the SentenceTransformer model to ONNX once (this step
+needs PyTorch), writes an int8 dynamic-quantized copy next to it and checks both against the
+PyTorch embeddings. Serving then only needs ``onnxruntime`` and ``tokenizers``.
+"""
+
+import argparse
+import inspect
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+try:
+    import onnxruntime as ort  # type: ignore
+    from tokenizers import Tokenizer  # type: ignore
+
+    ONNX_AVAILABLE = True
+except (ImportError, ModuleNotFoundError):
+    ort = None  # type: ignore
+    Tokenizer = None  # type: ignore
+    ONNX_AVAILABLE = False
+
+EMBEDDING_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+MODEL_FILES = {"onnx": "model.onnx", "onnx-int8": "model-int8.onnx"}
+
+# Sentences the exported models are checked against; short and long, plain and numeric.
+PARITY_SENTENCES = [
+    "What is the fee structure for B.Tech students?",
+    "hostel allotment",
+    "Admission notice for M.Tech 2024-25 through CCMT counselling, reporting on 12 August at the academic section.",
+    "The Department of Computer Engineering offers undergraduate, postgraduate and doctoral programmes.",
+    "End semester examination date sheet",
+    "Contact the Training and Placement cell for internship and placement related queries.",
+]
+
+
+def export_dir(model_name: str) -> Path:
+    return Path(Config.ONNX_MODEL_DIR) / model_name.replace("/", "__")
+
+
+def export_transformer(transformer, sample: Dict, path: Path, output_name: str = "last_hidden_state") -> List[str]:
+    """Export a Hugging Face model's first output to ONNX with dynamic batch and sequence axes.
+
+    ``sample`` is a tokenizer output (``return_tensors="pt"``) to trace with; returns the input names.
+    """
+    import torch  # type: ignore
+
+    class _FirstOutput(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *inputs):
+            return self.model(*inputs, return_dict=False)[0]
+
+    # BERT-style encoders take (input_ids, attention_mask, token_type_ids) positionally in this order.
+    names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    axes = {name: {0: "batch", 1: "sequence"} for name in names}
+    axes[output_name] = {0: "batch"} if output_name == "logits" else {0: "batch", 1: "sequence"}
+
+    # Newer PyTorch defaults to the dynamo exporter, which needs onnxscript; the TorchScript one does not.
+    legacy = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+    transformer.eval()
+    with torch.no_grad():
+        torch.onnx.export(
+            _FirstOutput(transformer),
+            tuple(sample[name] for name in names),
+            str(path),
+            input_names=names,
+            output_names=[output_name],
+            dynamic_axes=axes,
+            opset_version=14,
+            **legacy,
+        )
+    return names
+
+
+def save_tokenizer(tokenizer, path: Path) -> None:
+    """Write the fast (Rust) tokenizer behind a Hugging Face tokenizer as tokenizer.json."""
+    if not getattr(tokenizer, "is_fast", False):
+        from transformers import AutoTokenizer  # type: ignore
+
+        tokenizer = AutoTokenizer.from_pretrained(tokenizer.name_or_path, use_fast=True)
+    tokenizer.backend_tokenizer.save(str(path))
+
+
+def create_session(path: Path, num_threads: int = 0):
+    """ONNX Runtime CPU session with full graph optimization."""
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if num_threads:
+        options.intra_op_num_threads = num_threads
+    return ort.InferenceSession(str(path), options, providers=["CPUExecutionProvider"])
+
+
+def encoding_feeds(encodings, input_names: Sequence[str]) -> Dict[str, np.ndarray]:
+    """Model inputs for a batch of padded ``tokenizers`` encodings."""
+    feeds = {
+        "input_ids": lambda: [e.ids for e in encodings],
+        "attention_mask": lambda: [e.attention_mask for e in encodings],
+        "token_type_ids": lambda: [e.type_ids for e in encodings],
+    }
+    return {name: np.array(feeds[name](), dtype=np.int64) for name in input_names}
+
+
+def quantize_int8(source: Path, target: Path) -> None:
+    """Dynamic int8 quantization: weights stored as int8, activations quantized per batch at run time."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic  # type: ignore
+
+    quantize_dynamic(str(source), str(target), weight_type=QuantType.QInt8)
+
+
+def export_sentence_transformer(model, directory: Path, quantize: bool = True) -> Dict:
+    """Write ``model.onnx`` (and ``model-int8.onnx``), ``tokenizer.json`` and ``encoder.json`` for a loaded model."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    tokenizer = model.tokenizer
+    sample = tokenizer(["an example sentence", "a second, somewhat longer example sentence"], padding=True, return_tensors="pt")
+    names = export_transformer(model[0].auto_model, sample, directory / MODEL_FILES["onnx"])
+    save_tokenizer(tokenizer, directory / "tokenizer.json")
+
+    pooling = next((module for module in model if type(module).__name__ == "Pooling"), None)
+    # sentence-transformers 2.x exposes get_pooling_mode_str(); later releases a pooling_mode attribute.
+    mode = "mean" if pooling is None else (pooling.get_pooling_mode_str() if hasattr(pooling, "get_pooling_mode_str") else pooling.pooling_mode)
+    if mode not in ("mean", "cls"):
+        raise ValueError(f"Pooling mode '{mode}' is not supported by the ONNX encoder.")
+    info = {
+        "dimension": model.get_sentence_embedding_dimension(),
+        "max_seq_length": model.max_seq_length,
+        "pooling": mode,
+        "normalize": any(type(module).__name__ == "Normalize" for module in model),
+        "inputs": names,
+        "pad_token": tokenizer.pad_token,
+        "pad_token_id": tokenizer.pad_token_id,
+    }
+    with open(directory / "encoder.json", "w", encoding="utf-8") as info_file:
+        json.dump(info, info_file, indent=2)
+
+    if quantize:
+        quantize_int8(directory / MODEL_FILES["onnx"], directory / MODEL_FILES["onnx-int8"])
+    return info
+
+
+class OnnxSentenceEncoder:
+    """Sentence embeddings from an exported model, with the ``encode`` signature of SentenceTransformer."""
+
+    def __init__(self, directory: Path, backend: str = "onnx-int8", num_threads: int = 0):
+        if not ONNX_AVAILABLE:
+            raise ImportError("onnxruntime and tokenizers are required for the ONNX embedding backend.")
+
+        self.directory = Path(directory)
+        self.backend = backend
+        with open(self.directory / "encoder.json", "r", encoding="utf-8") as info_file:
+            self.info = json.load(info_file)
+
+        self.tokenizer = Tokenizer.from_file(str(self.directory / "tokenizer.json"))
+        self.tokenizer.enable_truncation(self.info["max_seq_length"])
+        self.tokenizer.enable_padding(pad_id=self.info["pad_token_id"], pad_token=self.info["pad_token"])
+
+        self.session = create_session(self.directory / MODEL_FILES[backend], num_threads)
+        self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return int(self.info["dimension"])
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        (hidden,) = self.session.run(None, encoding_feeds(encodings, self.input_names))
+
+        if self.info["pooling"] == "cls":
+            pooled = hidden[:, 0]
+        else:
+            mask = np.array([e.attention_mask for e in encodings], dtype=np.float32)[:, :, None]
+            pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        if self.info["normalize"]:
+            pooled = pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+        return pooled.astype("float32")
+
+    def encode(self, sentences: Union[str, Sequence[str]], batch_size: int = 32, **_) -> np.ndarray:
+        """Embed one sentence (1-D result) or a list of them (2-D); other SentenceTransformer options are ignored."""
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        embeddings = np.empty((len(texts), self.get_sentence_embedding_dimension()), dtype="float32")
+
+        # Batching similar lengths together keeps padding, and so wasted compute, low.
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        for start in range(0, len(texts), batch_size):
+            rows = order[start : start + batch_size]
+            embeddings[rows] = self._encode_batch([texts[row] for row in rows])
+        return embeddings[0] if single else embeddings
+
+
+def load_encoder(model_name: str, backend: str) -> Optional[OnnxSentenceEncoder]:
+    """The exported ONNX encoder for ``model_name``, or None if it has not been exported or cannot load."""
+    directory = export_dir(model_name)
+    if not (directory / MODEL_FILES[backend]).exists():
+        logger.warning(f"No {backend} export in {directory}. Run 'python onnx_encoder.py export' first.")
+        return None
+    try:
+        return OnnxSentenceEncoder(directory, backend, Config.ONNX_NUM_THREADS)
+    except Exception as exc:
+        logger.warning(f"Could not load the {backend} encoder: {exc}")
+        return None
+
+
+def check_parity(reference, candidate, sentences: Sequence[str] = PARITY_SENTENCES) -> Dict:
+    """Compare two encoders on the same sentences: worst-case cosine similarity and absolute difference."""
+    expected = np.asarray(reference.encode(list(sentences), convert_to_numpy=True, show_progress_bar=False), dtype="float32")
+    actual = np.asarray(candidate.encode(list(sentences)), dtype="float32")
+    cosine = np.einsum("ij,ij->i", expected, actual) / np.maximum(
+        np.linalg.norm(expected, axis=1) * np.linalg.norm(actual, axis=1), 1e-12
+    )
+    min_cosine = float(cosine.min())
+    return {
+        "min_cosine": min_cosine,
+        "max_abs_diff": float(np.abs(expected - actual).max()),
+        "passed": min_cosine >= Config.ONNX_PARITY_MIN_COSINE,
+    }
+
+
+def time_encoder(encoder, sentences: Sequence[str], batch_size: int = 64, repeats: int = 3) -> Dict[str, float]:
+    """Single-query latency and batched throughput of an encoder."""
+    encode = lambda texts, size: encoder.encode(texts, batch_size=size, show_progress_bar=False)
+    encode(list(sentences[:batch_size]), batch_size)  # warm up
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for sentence in sentences[:20]:
+            encode([sentence], 1)
+    latency_ms = 1000.0 * (time.perf_counter() - start) / (repeats * min(20, len(sentences)))
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        encode(list(sentences), batch_size)
+    elapsed = time.perf_counter() - start
+    return {"query_latency_ms": latency_ms, "sentences_per_sec": repeats * len(sentences) / elapsed}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export the embedding model to ONNX Runtime")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export_parser = sub.add_parser("export", help="Export to ONNX, quantize to int8 and check parity with PyTorch")
+    export_parser.add_argument("--model", default=Config.EMBEDDING_MODEL)
+    export_parser.add_argument("--no-quantize", action="store_true")
+    args = parser.parse_args()
+
+    from sentence_transformers import SentenceTransformer  # type: ignore
+
+    model = SentenceTransformer(args.model, device="cpu")
+    directory = export_dir(args.model)
+    export_sentence_transformer(model, directory, quantize=not args.no_quantize)
+    logger.info(f"Exported {args.model} to {directory}")
+
+    failed = False
+    for backend in ("onnx", "onnx-int8"):
+        if not (directory / MODEL_FILES[backend]).exists():
+            continue
+        parity = check_parity(model, OnnxSentenceEncoder(directory, backend))
+        logger.info(
+            f"{backend}: min cosine {parity['min_cosine']:.5f}, max abs diff {parity['max_abs_diff']:.5f} "
+            f"({'ok' if parity['passed'] else 'FAILED'})"
+        )
+        failed = failed or not parity["passed"]
+    if failed:
+        raise SystemExit(f"Parity below ONNX_PARITY_MIN_COSINE={Config.ONNX_PARITY_MIN_COSINE}; keep EMBEDDING_BACKEND=torch.")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    main()
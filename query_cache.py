@@ -0,0 +1,143 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query: str) -> str:
+    """Cache key for a query: lowercased with runs of whitespace collapsed.
+
+    MiniLM's tokenizer and the hashing encoder both lowercase their input, so queries that
+    normalize to the same key also encode to the same vector.
+    """
+    return " ".join(query.lower().split())
+
+
+class QueryEmbeddingCache:
+    """In-memory LRU of query embeddings with a time-to-live, plus a persisted query frequency log.
+
+    The frequency log (query -> times searched) survives restarts, so ``frequent`` can name the
+    queries worth pre-encoding before the first request arrives.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 2048,
+        ttl_seconds: float = 3600.0,
+        history_path: Optional[str] = None,
+        history_max_entries: int = 10_000,
+        history_flush_every: int = 50,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.history_path = history_path
+        self.history_max_entries = history_max_entries
+        self.history_flush_every = history_flush_every
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.encode_calls = 0
+        self.encoded_queries = 0
+        self.encode_seconds = 0.0
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, np.ndarray]]" = OrderedDict()
+        self._history: Counter = Counter()
+        self._unsaved = 0
+        if history_path and os.path.exists(history_path):
+            try:
+                with open(history_path, "r", encoding="utf-8") as history_file:
+                    self._history.update(json.load(history_file))
+            except (OSError, ValueError) as exc:
+                logger.warning(f"Ignoring unreadable query history {history_path}: {exc}")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_many(self, keys: Sequence[str]) -> Dict[int, np.ndarray]:
+        """Cached vectors keyed by position in ``keys``; expired entries count as misses."""
+        now = time.monotonic()
+        found: Dict[int, np.ndarray] = {}
+        with self._lock:
+            for position, key in enumerate(keys):
+                entry = self._entries.get(key)
+                if entry is not None and now - entry[0] > self.ttl_seconds:
+                    del self._entries[key]
+                    self.expired += 1
+                    entry = None
+                if entry is None:
+                    self.misses += 1
+                    continue
+                self._entries.move_to_end(key)
+                found[position] = entry[1]
+                self.hits += 1
+        return found
+
+    def put_many(self, keys: Sequence[str], vectors: np.ndarray) -> None:
+        now = time.monotonic()
+        with self._lock:
+            for key, vector in zip(keys, vectors):
+                self._entries[key] = (now, np.array(vector, dtype="float32"))
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def record_encode(self, count: int, seconds: float) -> None:
+        """Account one model forward pass over ``count`` queries."""
+        with self._lock:
+            self.encode_calls += 1
+            self.encoded_queries += count
+            self.encode_seconds += seconds
+
+    def record_queries(self, keys: Sequence[str]) -> None:
+        """Count searched queries; the log is written every ``history_flush_every`` new records."""
+        with self._lock:
+            self._history.update(keys)
+            self._unsaved += len(keys)
+            flush = self.history_path is not None and self._unsaved >= self.history_flush_every
+        if flush:
+            self.save_history()
+
+    def frequent(self, limit: int) -> List[str]:
+        """The ``limit`` most searched queries, most frequent first."""
+        with self._lock:
+            return [key for key, _ in self._history.most_common(limit)]
+
+    def save_history(self) -> None:
+        if self.history_path is None:
+            return
+
+        with self._lock:
+            # Keep the log bounded: one-off queries fall out once it is full.
+            kept = dict(self._history.most_common(self.history_max_entries))
+            self._history = Counter(kept)
+            self._unsaved = 0
+
+        tmp_path = f"{self.history_path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as history_file:
+                json.dump(kept, history_file)
+            os.replace(tmp_path, self.history_path)
+        except OSError as exc:
+            logger.warning(f"Could not save query history: {exc}")
+
+    def get_stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "query_cache_hits": self.hits,
+            "query_cache_misses": self.misses,
+            "query_cache_expired": self.expired,
+            "query_cache_hit_rate": self.hits / lookups if lookups else 0.0,
+            "query_cache_entries": len(self),
+            "query_encode_calls": self.encode_calls,
+            "query_encode_avg_ms": 1000.0 * self.encode_seconds / self.encode_calls if self.encode_calls else 0.0,
+            "query_encode_ms_per_query": 1000.0 * self.encode_seconds / self.encoded_queries if self.encoded_queries else 0.0,
+        }
@@ -1,21 +1,19 @@
 import os
 import json
-from typing import List, Dict, Optional
+import time
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Iterator, List, Dict, Optional, Tuple
 import logging
 from vector_embeddings import VectorEmbeddingSystem
+from answer_cache import SemanticAnswerCache
+from reranker import Reranker, load_cross_encoder
 from groq_llm import GroqLLMService, create_groq_service
 from config import Config
 import warnings
 
-# --- NEW IMPORT ---
-# Try to import the CrossEncoder for reranking
-try:
-    from sentence_transformers import CrossEncoder  # type: ignore
-    RERANKER_AVAILABLE = True
-except (ImportError, ModuleNotFoundError):
-    RERANKER_AVAILABLE = False
-# --- END NEW IMPORT ---
-
 # Suppress warnings for cleaner output
 warnings.filterwarnings("ignore")
 
@@ -43,7 +41,28 @@ class RAGSystem:
         if not self.embedding_system.load_vector_store():
             logger.error("Failed to load vector store. Please generate embeddings first.")
             raise FileNotFoundError("Vector store not found. Run vector_embeddings.py first.")
-        
+        self.embedding_system.warm_query_cache()
+
+        # Answers reused for paraphrases of recent questions until the vector store changes.
+        self.answer_cache = None
+        if Config.ANSWER_CACHE_SIZE > 0:
+            self.answer_cache = SemanticAnswerCache(
+                self.embedding_system.dimension,
+                max_entries=Config.ANSWER_CACHE_SIZE,
+                ttl_seconds=Config.ANSWER_CACHE_TTL,
+                threshold=Config.ANSWER_CACHE_THRESHOLD,
+            )
+
+        # Model and index work for answer_query_async; LLM calls wait on the network in their own pool.
+        self._cpu_executor = ThreadPoolExecutor(
+            max_workers=Config.RAG_CPU_WORKERS or os.cpu_count() or 1, thread_name_prefix="rag-cpu"
+        )
+        self._io_executor = ThreadPoolExecutor(max_workers=Config.RAG_IO_WORKERS, thread_name_prefix="rag-io")
+
+        # Time to first token of recent answer_query_stream requests, in milliseconds.
+        self.stream_requests = 0
+        self._first_token_ms: deque = deque(maxlen=1000)
+
         # Initialize Groq LLM service if requested
         if self.use_groq:
             try:
@@ -59,16 +78,17 @@ class RAGSystem:
                 self.use_groq = False
         
         # --- NEW: Initialize Reranker ---
-        if RERANKER_AVAILABLE:
-            try:
-                # This is a lightweight but effective reranker
-                self.reranker = CrossEncoder('cross-encoder/ms-marco-MiniLM-L-6-v2')
-                logger.info("Loaded Cross-Encoder reranker model successfully.")
-            except Exception as e:
-                logger.warning(f"Could not load reranker model: {e}. Reranking will be disabled.")
-                self.reranker = None
-        else:
-            logger.warning("sentence-transformers not installed. Reranking will be disabled.")
+        # This is a lightweight but effective reranker, run on PyTorch or an ONNX export (RERANKER_BACKEND)
+        model = load_cross_encoder(Config.RERANKER_MODEL, Config.RERANKER_BACKEND.lower())
+        if model is not None:
+            self.reranker = Reranker(
+                model,
+                max_candidates=Config.RERANK_MAX_CANDIDATES,
+                batch_size=Config.RERANK_BATCH_SIZE,
+                early_exit_margin=Config.RERANK_EARLY_EXIT_MARGIN,
+                cache_size=Config.RERANK_SCORE_CACHE_SIZE,
+            )
+            logger.info(f"Loaded Cross-Encoder reranker model successfully ({type(model).__name__}).")
         # --- END NEW: Reranker ---
             
         logger.info("RAG system initialized successfully")
@@ -104,53 +124,32 @@ User Question: {query}"""
             logger.warning(f"Query expansion failed: {e}. Using original query.")
             return [query]
     
-    def retrieve_relevant_documents(self, query: str, k: int = 5) -> List[Dict]:
+    def retrieve_relevant_documents(self, query: str, k: int = 5, filters: Optional[Dict] = None) -> List[Dict]:
         """
         Retrieve and rerank relevant documents for a given query using
         multi-query expansion (pre-retrieval) and optional reranking (post-retrieval).
+        ``filters`` scopes retrieval to matching pages (see VectorEmbeddingSystem.search_many).
         """
         logger.info(f"Searching for: '{query}'")
 
         queries = self.generate_query_variations(query)
         initial_k = max(20, k * 2)
-        aggregated: Dict[int, Dict] = {}
-
-        for expanded_query in queries:
-            results = self.embedding_system.search(expanded_query, k=initial_k)
-            for result in results:
-                chunk_id = result.get('id')
-                if chunk_id is None:
-                    # Fall back to using hash of chunk text if ID missing
-                    chunk_id = hash(result.get('chunk_text', expanded_query))
-                    result['id'] = chunk_id
 
-                existing = aggregated.get(chunk_id)
-                current_score = result.get('similarity_score', 0.0)
-
-                if not existing or current_score > existing.get('similarity_score', 0.0):
-                    result['matched_query'] = expanded_query
-                    aggregated[chunk_id] = result
-
-        results = list(aggregated.values())
+        # One batched encode and one index search for the original query and all its variations
+        results = self.embedding_system.search_many(queries, k=initial_k, filters=filters)["fused"]
 
         if not results:
             logger.info("Found 0 chunks.")
             return []
-            
+        return self._rerank(query, results, k)
+    
+    def _rerank(self, query: str, results: List[Dict], k: int) -> List[Dict]:
+        """Top k of the fused candidates, reranked by the cross-encoder when one is loaded."""
         if self.reranker:
-            logger.info(f"Reranking {len(results)} candidates...")
-            
-            pairs = [(query, result['chunk_text']) for result in results]
-            
             try:
-                scores = self.reranker.predict(pairs)
-                
-                for i, result in enumerate(results):
-                    result['rerank_score'] = scores[i]
-                    
-                results.sort(key=lambda x: x['rerank_score'], reverse=True)
-                
-                final_results = results[:k]
+                final_results = self.reranker.rerank(query, results, k)
+                if final_results is None:
+                    return results[:k]
                 logger.info(f"Found {len(final_results)} reranked results.")
                 
                 for res in final_results:
@@ -165,6 +164,42 @@ User Question: {query}"""
         logger.info(f"Found {len(results)} results (no reranking).")
         return results[:k]
     
+    @staticmethod
+    def _merge_hits(*hit_lists: List[Dict]) -> List[Dict]:
+        """Fuse hit lists by chunk id, keeping each chunk's best score (as search_many does)."""
+        best: Dict[int, Dict] = {}
+        for hits in hit_lists:
+            for hit in hits:
+                current = best.get(hit["id"])
+                if current is None or hit["similarity_score"] > current["similarity_score"]:
+                    best[hit["id"]] = hit
+        return sorted(best.values(), key=lambda hit: hit["similarity_score"], reverse=True)
+    
+    async def _retrieve_async(self, query: str, k: int, filters: Optional[Dict]) -> List[Dict]:
+        """retrieve_relevant_documents with the expansion LLM call overlapped with the original query's search."""
+        loop = asyncio.get_running_loop()
+        initial_k = max(20, k * 2)
+        search = lambda queries: self.embedding_system.search_many(queries, k=initial_k, filters=filters)["fused"]
+        
+        start = time.perf_counter()
+        expansion = loop.run_in_executor(self._io_executor, self.generate_query_variations, query)
+        results = await loop.run_in_executor(self._cpu_executor, search, [query])
+        searched = time.perf_counter() - start
+        
+        variations = [variation for variation in await expansion if variation != query]
+        expanded = time.perf_counter() - start
+        if variations:
+            results = self._merge_hits(results, await loop.run_in_executor(self._cpu_executor, search, variations))
+        logger.info(
+            f"Original query searched in {searched * 1000:.0f} ms while expansion took {expanded * 1000:.0f} ms; "
+            f"{len(variations)} variations merged."
+        )
+        
+        if not results:
+            logger.info("Found 0 chunks.")
+            return []
+        return await loop.run_in_executor(self._cpu_executor, self._rerank, query, results, k)
+    
     def format_context(self, results: List[Dict]) -> str:
         """
         Format retrieved documents into a context string.
@@ -211,17 +246,28 @@ User Question: {query}"""
         Returns:
             Generated response
         """
+        return self._generate_response(query, context)[0]
+    
+    def _generate_response(self, query: str, context: str) -> Tuple[str, bool]:
+        """Generate a response, and whether it is a fallback standing in for a failed Groq call."""
         if "No relevant information found" in context:
-            return f"I couldn't find specific information about '{query}' in the NIT Kurukshetra website. Please try rephrasing your question or ask about different topics like academics, admissions, departments, or facilities."
+            return f"I couldn't find specific information about '{query}' in the NIT Kurukshetra website. Please try rephrasing your question or ask about different topics like academics, admissions, departments, or facilities.", False
         
         # Use Groq LLM if available
+        fell_back = False
         if self.use_groq and self.groq_service:
             try:
-                return self.groq_service.generate_rag_response(query, context, max_tokens=Config.MAX_RESPONSE_TOKENS)
+                return self.groq_service.generate_rag_response(
+                    query, context, max_tokens=Config.MAX_RESPONSE_TOKENS, fallback=False
+                ), False
             except Exception as e:
                 logger.warning(f"Groq LLM generation failed: {e}. Falling back to template-based response.")
+                fell_back = True
         
-        # Fallback to template-based response
+        return self._template_response(query, context), fell_back
+    
+    def _template_response(self, query: str, context: str) -> str:
+        """Answer built from the retrieved context alone, used when Groq is off or failing."""
         response = f"Based on the information from NIT Kurukshetra's website, here's what I found regarding '{query}':\n\n"
         
         # Extract key information from context
@@ -247,13 +293,95 @@ User Question: {query}"""
         
         return response
     
-    def answer_query(self, query: str, k: int = 10) -> Dict:
+    def generate_response_stream(self, query: str, context: str) -> Iterator[str]:
+        """
+        generate_response, yielding the answer in pieces as the LLM produces them.
+        
+        Template-based and fallback answers arrive as a single piece. A Groq failure before the
+        first piece falls back to the template answer; one mid-answer is raised to the caller.
+        """
+        for piece, _ in self._generate_response_stream(query, context):
+            yield piece
+    
+    def _generate_response_stream(self, query: str, context: str) -> Iterator[Tuple[str, bool]]:
+        """generate_response_stream pieces, each with whether it is a fallback standing in for a failed Groq call."""
+        if not (self.use_groq and self.groq_service) or "No relevant information found" in context:
+            yield self._generate_response(query, context)
+            return
+        
+        streamed = False
+        try:
+            for piece in self.groq_service.generate_rag_response_stream(query, context, max_tokens=Config.MAX_RESPONSE_TOKENS):
+                streamed = True
+                yield piece, False
+            return
+        except Exception as e:
+            if streamed:
+                raise
+            logger.warning(f"Groq LLM streaming failed: {e}. Falling back to template-based response.")
+        yield self._template_response(query, context), True
+    
+    @staticmethod
+    def _not_loaded_answer(query: str) -> Dict:
+        return {
+            "query": query,
+            "response": "Vector store is not loaded. Please ensure embeddings have been generated first.",
+            "sources": [],
+            "num_sources": 0
+        }
+    
+    @staticmethod
+    def _error_answer(query: str, e: Exception) -> Dict:
+        error_msg = str(e) if str(e).strip() else f"Error of type {type(e).__name__}"
+        logger.error(f"Error processing query '{query}': {error_msg}")
+        
+        return {
+            "query": query,
+            "response": f"Sorry, I encountered an error while processing your query: {error_msg}. Please try a different question or check if the vector store is properly set up.",
+            "sources": [],
+            "num_sources": 0
+        }
+    
+    @staticmethod
+    def format_sources(results: List[Dict]) -> List[Dict]:
+        """Source citations for the API and UI."""
+        return [
+            {
+                "title": r.get('title', 'Unknown'),
+                "url": r.get('url', 'Unknown'),
+                # Other pages repeating this chunk, collapsed into it at index time
+                "source_urls": r.get('source_urls', [r.get('url', 'Unknown')]),
+                # Use rerank_score if available, else similarity_score
+                "score": r.get('rerank_score', r.get('similarity_score', 0)),
+                "score_type": "rerank" if 'rerank_score' in r else "similarity",
+                "content_preview": r.get('chunk_text', '')[:200] + "..." if len(r.get('chunk_text', '')) > 200 else r.get('chunk_text', '')
+            }
+            for r in results
+        ]
+    
+    def _cached_answer(self, query: str, query_vector, scope: str, version: int) -> Optional[Dict]:
+        cached = self.answer_cache.get(query_vector, scope, version)
+        if cached is not None:
+            logger.info(f"Answered from cache (similarity {cached['cache_similarity']:.3f}).")
+            cached.update({"query": query, "cached": True})
+        return cached
+    
+    def _remember_answer(
+        self, query_vector, scope: str, version: int, result: Dict, results: List[Dict], fell_back: bool, start: float
+    ) -> None:
+        # Fallbacks for a failed Groq call, and answers computed while the store was changing, are not cached.
+        cacheable = results and not fell_back and version == self.embedding_system.content_version
+        if self.answer_cache is not None and cacheable:
+            self.answer_cache.put(query_vector, scope, version, result, time.perf_counter() - start)
+    
+    def answer_query(self, query: str, k: int = 10, filters: Optional[Dict] = None) -> Dict:
         """
         Answer a user query using the RAG system.
         
         Args:
             query: User query
             k: Number of documents to retrieve
+            filters: Optional page filters, e.g. {"url_prefix": "nitkkr.ac.in/cse", "content_type": "pdf"}
             
         Returns:
             Dictionary containing the answer and metadata
@@ -263,16 +391,21 @@ User Question: {query}"""
             
             # Check if vector store is loaded
             if not self.embedding_system.metadata:
-                return {
-                    "query": query,
-                    "response": "Vector store is not loaded. Please ensure embeddings have been generated first.",
-                    "sources": [],
-                    "num_sources": 0
-                }
+                return self._not_loaded_answer(query)
+            
+            start = time.perf_counter()
+            version = self.embedding_system.content_version
+            scope = SemanticAnswerCache.scope(k, filters)
+            query_vector = None
+            if self.answer_cache is not None:
+                query_vector = self.embedding_system.encode_query(query)
+                cached = self._cached_answer(query, query_vector, scope, version)
+                if cached is not None:
+                    return cached
             
             # Retrieve relevant documents (now with reranking)
             logger.info("Retrieving relevant documents...")
-            results = self.retrieve_relevant_documents(query, k)
+            results = self.retrieve_relevant_documents(query, k, filters)
             
             # Format context
             logger.info("Formatting context...")
@@ -280,35 +413,147 @@ User Question: {query}"""
             
             # Generate response
             logger.info("Generating response...")
-            response = self.generate_response(query, context)
+            response, fell_back = self._generate_response(query, context)
             
-            return {
+            result = {
                 "query": query,
                 "response": response,
-                "sources": [
-                    {
-                        "title": r.get('title', 'Unknown'),
-                        "url": r.get('url', 'Unknown'),
-                        # Use rerank_score if available, else similarity_score
-                        "score": r.get('rerank_score', r.get('similarity_score', 0)),
-                        "score_type": "rerank" if 'rerank_score' in r else "similarity",
-                        "content_preview": r.get('chunk_text', '')[:200] + "..." if len(r.get('chunk_text', '')) > 200 else r.get('chunk_text', '')
-                    }
-                    for r in results
-                ],
-                "num_sources": len(results)
+                "sources": self.format_sources(results),
+                "num_sources": len(results),
+                "cached": False
             }
+            self._remember_answer(query_vector, scope, version, result, results, fell_back, start)
+            return result
             
         except Exception as e:
-            error_msg = str(e) if str(e).strip() else f"Error of type {type(e).__name__}"
-            logger.error(f"Error processing query '{query}': {error_msg}")
+            return self._error_answer(query, e)
+    
+    async def answer_query_async(self, query: str, k: int = 10, filters: Optional[Dict] = None) -> Dict:
+        """
+        Non-blocking answer_query for async callers such as the FastAPI handlers.
+        
+        The dense search for the original query starts while the query-expansion LLM call is
+        in flight, and the expanded queries' hits are merged in once it returns. Encoding, search
+        and reranking run on a CPU thread pool and LLM calls on an I/O pool, so the event loop
+        keeps serving other requests meanwhile.
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            logger.info(f"Starting query processing for: '{query}'")
+            if not self.embedding_system.metadata:
+                return self._not_loaded_answer(query)
+            
+            start = time.perf_counter()
+            version = self.embedding_system.content_version
+            scope = SemanticAnswerCache.scope(k, filters)
+            query_vector = None
+            if self.answer_cache is not None:
+                query_vector = await loop.run_in_executor(self._cpu_executor, self.embedding_system.encode_query, query)
+                cached = self._cached_answer(query, query_vector, scope, version)
+                if cached is not None:
+                    return cached
             
-            return {
+            results = await self._retrieve_async(query, k, filters)
+            context = self.format_context(results)
+            response, fell_back = await loop.run_in_executor(self._io_executor, self._generate_response, query, context)
+            
+            result = {
                 "query": query,
-                "response": f"Sorry, I encountered an error while processing your query: {error_msg}. Please try a different question or check if the vector store is properly set up.",
-                "sources": [],
-                "num_sources": 0
+                "response": response,
+                "sources": self.format_sources(results),
+                "num_sources": len(results),
+                "cached": False
             }
+            self._remember_answer(query_vector, scope, version, result, results, fell_back, start)
+            return result
+            
+        except Exception as e:
+            return self._error_answer(query, e)
+    
+    async def answer_query_stream(self, query: str, k: int = 10, filters: Optional[Dict] = None) -> AsyncIterator[Dict]:
+        """
+        Streaming answer_query_async for the SSE endpoint.
+        
+        Yields a ``sources`` event (sources, num_sources, cached) as soon as retrieval finishes, then
+        ``token`` events (text) as the LLM generates them, then a ``done`` event with the time to
+        first token and total time in milliseconds. Failures end the stream with an ``error`` event.
+        """
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        stop = threading.Event()
+        try:
+            logger.info(f"Starting streamed query processing for: '{query}'")
+            if not self.embedding_system.metadata:
+                answer = self._not_loaded_answer(query)
+                yield {"event": "error", "detail": answer["response"]}
+                return
+            
+            version = self.embedding_system.content_version
+            scope = SemanticAnswerCache.scope(k, filters)
+            query_vector = None
+            cached = None
+            if self.answer_cache is not None:
+                query_vector = await loop.run_in_executor(self._cpu_executor, self.embedding_system.encode_query, query)
+                cached = self._cached_answer(query, query_vector, scope, version)
+            
+            if cached is not None:
+                yield {"event": "sources", "sources": cached["sources"], "num_sources": cached["num_sources"], "cached": True}
+                pieces = [cached["response"]]
+                first_token = time.perf_counter()
+                yield {"event": "token", "text": cached["response"]}
+            else:
+                results = await self._retrieve_async(query, k, filters)
+                sources = self.format_sources(results)
+                yield {"event": "sources", "sources": sources, "num_sources": len(results), "cached": False}
+                
+                # The LLM stream is a blocking iterator, so it is drained on the I/O pool into a queue.
+                context = self.format_context(results)
+                queue: asyncio.Queue = asyncio.Queue()
+                
+                def produce() -> bool:
+                    fell_back = False
+                    try:
+                        for piece, fallback in self._generate_response_stream(query, context):
+                            if stop.is_set():
+                                break
+                            fell_back = fell_back or fallback
+                            loop.call_soon_threadsafe(queue.put_nowait, piece)
+                    finally:
+                        loop.call_soon_threadsafe(queue.put_nowait, None)
+                    return fell_back
+                
+                producer = loop.run_in_executor(self._io_executor, produce)
+                pieces = []
+                first_token = None
+                while (piece := await queue.get()) is not None:
+                    if first_token is None:
+                        first_token = time.perf_counter()
+                    pieces.append(piece)
+                    yield {"event": "token", "text": piece}
+                fell_back = await producer
+                first_token = first_token or time.perf_counter()
+                
+                result = {
+                    "query": query,
+                    "response": "".join(pieces),
+                    "sources": sources,
+                    "num_sources": len(results),
+                    "cached": False
+                }
+                self._remember_answer(query_vector, scope, version, result, results, fell_back, start)
+            
+            first_token_ms = (first_token - start) * 1000
+            total_ms = (time.perf_counter() - start) * 1000
+            self.stream_requests += 1
+            self._first_token_ms.append(first_token_ms)
+            logger.info(f"Streamed answer: first token after {first_token_ms:.0f} ms, done after {total_ms:.0f} ms.")
+            yield {"event": "done", "time_to_first_token_ms": first_token_ms, "total_ms": total_ms}
+            
+        except Exception as e:
+            yield {"event": "error", "detail": self._error_answer(query, e)["response"]}
+        finally:
+            # Stops the producer early if the client went away mid-answer.
+            stop.set()
     
     def get_system_stats(self) -> Dict:
         """Get statistics about the RAG system."""
@@ -321,6 +566,17 @@ User Question: {query}"""
             "groq_available": self.groq_service is not None,
             "reranker_enabled": self.reranker is not None  # --- NEW STAT ---
         })
+        if self.answer_cache is not None:
+            stats.update(self.answer_cache.get_stats())
+        if self.reranker is not None:
+            stats.update(self.reranker.get_stats())
+        if self._first_token_ms:
+            first_token_ms = sorted(self._first_token_ms)
+            stats.update({
+                "stream_requests": self.stream_requests,
+                "stream_first_token_p50_ms": first_token_ms[len(first_token_ms) // 2],
+                "stream_first_token_p95_ms": first_token_ms[min(len(first_token_ms) - 1, int(len(first_token_ms) * 0.95))],
+            })
         
         return stats
     
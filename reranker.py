@@ -0,0 +1,308 @@
+"""Cross-encoder reranking: the per-request budget and the PyTorch / ONNX Runtime model backends.
+
+``python reranker.py export`` converts the cross-encoder to ONNX once (this step needs PyTorch),
+writes an int8 dynamic-quantized copy and checks that both rank passages like PyTorch does.
+"""
+
+import argparse
+import json
+import logging
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import Config
+from onnx_encoder import (
+    MODEL_FILES,
+    ONNX_AVAILABLE,
+    PARITY_SENTENCES,
+    Tokenizer,
+    create_session,
+    encoding_feeds,
+    export_dir,
+    export_transformer,
+    quantize_int8,
+    save_tokenizer,
+)
+from query_cache import normalize_query
+
+logger = logging.getLogger(__name__)
+
+try:
+    from sentence_transformers import CrossEncoder  # type: ignore
+
+    CROSS_ENCODER_AVAILABLE = True
+except (ImportError, ModuleNotFoundError):
+    CrossEncoder = None  # type: ignore
+    CROSS_ENCODER_AVAILABLE = False
+
+RERANKER_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+class Reranker:
+    """Cross-encoder reranking under a per-request budget.
+
+    Only the ``max_candidates`` best candidates by dense score are scored, in batches of
+    ``batch_size``. Scores are cached per (normalized query, chunk id); an entry also records a
+    checksum of the chunk text, so it never outlives a renumbering of chunk ids. When the top k
+    candidates already lead the rest by ``early_exit_margin`` in dense similarity, the cross-encoder
+    would not change which chunks reach the context, and reranking is skipped.
+    """
+
+    def __init__(
+        self,
+        model,
+        max_candidates: int = 40,
+        batch_size: int = 32,
+        early_exit_margin: float = 0.0,
+        cache_size: int = 20_000,
+    ):
+        self.model = model
+        self.max_candidates = max_candidates
+        self.batch_size = batch_size
+        self.early_exit_margin = early_exit_margin
+        self.cache_size = cache_size
+
+        self.requests = 0
+        self.early_exits = 0
+        self.pairs_scored = 0
+        self.pairs_cached = 0
+        self.seconds = 0.0
+
+        self._lock = threading.Lock()
+        self._scores: "OrderedDict[Tuple[str, int], Tuple[int, float]]" = OrderedDict()
+
+    def _decisive(self, results: List[Dict], k: int) -> bool:
+        if self.early_exit_margin <= 0 or len(results) <= k:
+            return False
+        return results[k - 1]["similarity_score"] - results[k]["similarity_score"] >= self.early_exit_margin
+
+    def rerank(self, query: str, results: List[Dict], k: int) -> Optional[List[Dict]]:
+        """Top k of ``results`` (sorted by dense score) with ``rerank_score`` set, or None on early exit."""
+        start = time.perf_counter()
+        self.requests += 1
+        if self._decisive(results, k):
+            self.early_exits += 1
+            logger.info(f"Skipped reranking: the top {k} candidates lead by at least {self.early_exit_margin} dense similarity.")
+            return None
+
+        candidates = results[: self.max_candidates]
+        key = normalize_query(query)
+        checksums = [zlib.crc32(result["chunk_text"].encode("utf-8")) for result in candidates]
+        scores = np.empty(len(candidates), dtype="float32")
+        missing: List[int] = []
+        with self._lock:
+            for i, (result, checksum) in enumerate(zip(candidates, checksums)):
+                entry = self._scores.get((key, result["id"]))
+                if entry is not None and entry[0] == checksum:
+                    self._scores.move_to_end((key, result["id"]))
+                    scores[i] = entry[1]
+                else:
+                    missing.append(i)
+
+        if missing:
+            pairs = [(query, candidates[i]["chunk_text"]) for i in missing]
+            predicted = self.model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False)
+            scores[missing] = np.asarray(predicted, dtype="float32").reshape(-1)
+            with self._lock:
+                for i in missing:
+                    self._scores[(key, candidates[i]["id"])] = (checksums[i], float(scores[i]))
+                while len(self._scores) > self.cache_size:
+                    self._scores.popitem(last=False)
+
+        for result, score in zip(candidates, scores):
+            result["rerank_score"] = float(score)
+        ranked = sorted(candidates, key=lambda result: result["rerank_score"], reverse=True)[:k]
+
+        elapsed = time.perf_counter() - start
+        self.pairs_scored += len(missing)
+        self.pairs_cached += len(candidates) - len(missing)
+        self.seconds += elapsed
+        logger.info(
+            f"Reranked {len(candidates)} of {len(results)} candidates in {elapsed * 1000:.1f} ms "
+            f"({len(missing)} pairs scored, {len(candidates) - len(missing)} cached)."
+        )
+        return ranked
+
+    def get_stats(self) -> Dict:
+        reranked = self.requests - self.early_exits
+        pairs = self.pairs_scored + self.pairs_cached
+        return {
+            "rerank_requests": self.requests,
+            "rerank_early_exits": self.early_exits,
+            "rerank_pairs_scored": self.pairs_scored,
+            "rerank_pairs_cached": self.pairs_cached,
+            "rerank_cache_hit_rate": self.pairs_cached / pairs if pairs else 0.0,
+            "rerank_pairs_per_request": self.pairs_scored / reranked if reranked else 0.0,
+            "rerank_avg_ms": 1000.0 * self.seconds / reranked if reranked else 0.0,
+        }
+
+
+def export_cross_encoder(model, directory: Path, quantize: bool = True) -> Dict:
+    """Write ``model.onnx`` (and ``model-int8.onnx``), ``tokenizer.json`` and ``reranker.json`` for a CrossEncoder."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    tokenizer = model.tokenizer
+    sample = tokenizer(
+        ["what is the fee", "hostel"],
+        ["The fee for the first semester is payable online.", "Hostels are allotted by merit."],
+        padding=True,
+        truncation=True,
+        return_tensors="pt",
+    )
+    names = export_transformer(model.model, sample, directory / MODEL_FILES["onnx"], output_name="logits")
+    save_tokenizer(tokenizer, directory / "tokenizer.json")
+
+    # sentence-transformers applies a sigmoid to single-label models unless told otherwise.
+    activation = getattr(model, "activation_fn", None) or getattr(model, "default_activation_function", None)
+    info = {
+        "max_length": model.max_length or min(tokenizer.model_max_length, 512),
+        "num_labels": model.model.config.num_labels,
+        "activation": "sigmoid" if type(activation).__name__ == "Sigmoid" else "identity",
+        "inputs": names,
+        "pad_token": tokenizer.pad_token,
+        "pad_token_id": tokenizer.pad_token_id,
+    }
+    with open(directory / "reranker.json", "w", encoding="utf-8") as info_file:
+        json.dump(info, info_file, indent=2)
+
+    if quantize:
+        quantize_int8(directory / MODEL_FILES["onnx"], directory / MODEL_FILES["onnx-int8"])
+    return info
+
+
+class OnnxCrossEncoder:
+    """Cross-encoder scores from an exported model, with the ``predict`` signature of CrossEncoder."""
+
+    def __init__(self, directory: Path, backend: str = "onnx-int8", num_threads: int = 0):
+        if not ONNX_AVAILABLE:
+            raise ImportError("onnxruntime and tokenizers are required for the ONNX reranker backend.")
+
+        self.directory = Path(directory)
+        self.backend = backend
+        with open(self.directory / "reranker.json", "r", encoding="utf-8") as info_file:
+            self.info = json.load(info_file)
+
+        self.tokenizer = Tokenizer.from_file(str(self.directory / "tokenizer.json"))
+        self.tokenizer.enable_truncation(self.info["max_length"], strategy="longest_first")
+        self.tokenizer.enable_padding(pad_id=self.info["pad_token_id"], pad_token=self.info["pad_token"])
+
+        self.session = create_session(self.directory / MODEL_FILES[backend], num_threads)
+        self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+
+    def _predict_batch(self, pairs: List[Tuple[str, str]]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(pairs)
+        (logits,) = self.session.run(None, encoding_feeds(encodings, self.input_names))
+        if self.info["activation"] == "sigmoid":
+            logits = 1.0 / (1.0 + np.exp(-logits))
+        return logits[:, 0] if self.info["num_labels"] == 1 else logits
+
+    def predict(self, pairs: Sequence[Tuple[str, str]], batch_size: int = 32, **_) -> np.ndarray:
+        """Score (query, passage) pairs; other CrossEncoder options are ignored."""
+        pairs = [tuple(pair) for pair in pairs]
+        scores: Optional[np.ndarray] = None
+        # Batching similar lengths together keeps padding, and so wasted compute, low.
+        order = np.argsort([-(len(query) + len(passage)) for query, passage in pairs], kind="stable")
+        for start in range(0, len(pairs), batch_size):
+            rows = order[start : start + batch_size]
+            batch = self._predict_batch([pairs[row] for row in rows]).astype("float32")
+            if scores is None:
+                scores = np.empty((len(pairs),) + batch.shape[1:], dtype="float32")
+            scores[rows] = batch
+        return scores if scores is not None else np.empty(0, dtype="float32")
+
+
+def load_cross_encoder(model_name: str, backend: str):
+    """A model with CrossEncoder's ``predict`` for the configured backend, or None if none can be loaded.
+
+    An ONNX backend whose export is missing falls back to PyTorch.
+    """
+    if backend != "torch":
+        directory = export_dir(model_name)
+        if (directory / MODEL_FILES[backend]).exists():
+            try:
+                return OnnxCrossEncoder(directory, backend, Config.ONNX_NUM_THREADS)
+            except Exception as exc:
+                logger.warning(f"Could not load the {backend} reranker: {exc}")
+        else:
+            logger.warning(f"No {backend} export in {directory}. Run 'python reranker.py export' first.")
+        logger.warning(f"Falling back to the PyTorch reranker instead of {backend}.")
+
+    if not CROSS_ENCODER_AVAILABLE:
+        logger.warning("sentence-transformers not installed. Reranking will be disabled.")
+        return None
+    try:
+        return CrossEncoder(model_name)
+    except Exception as exc:
+        logger.warning(f"Could not load reranker model: {exc}. Reranking will be disabled.")
+        return None
+
+
+def ranking_overlap(reference, candidate, queries: Sequence[str], passages: Sequence[Sequence[str]], k: int = 5) -> Dict:
+    """Top-k overlap between two cross-encoders ranking the same passages for each query."""
+    overlaps: List[float] = []
+    for query, candidates in zip(queries, passages):
+        pairs = [(query, passage) for passage in candidates]
+        expected = np.asarray(reference.predict(pairs, show_progress_bar=False), dtype="float32").reshape(len(pairs), -1)[:, 0]
+        actual = np.asarray(candidate.predict(pairs, show_progress_bar=False), dtype="float32").reshape(len(pairs), -1)[:, 0]
+        top = min(k, len(pairs))
+        overlaps.append(len(set(np.argsort(-expected)[:top]) & set(np.argsort(-actual)[:top])) / top)
+    mean_overlap = float(np.mean(overlaps)) if overlaps else 1.0
+    return {
+        "mean_overlap": mean_overlap,
+        "min_overlap": float(np.min(overlaps)) if overlaps else 1.0,
+        "passed": mean_overlap >= Config.RERANK_PARITY_MIN_OVERLAP,
+    }
+
+
+def time_cross_encoder(model, pairs: Sequence[Tuple[str, str]], batch_size: int = 32, repeats: int = 3) -> Dict[str, float]:
+    """Scoring throughput of a cross-encoder, in (query, passage) pairs per second."""
+    model.predict(list(pairs[:batch_size]), batch_size=batch_size, show_progress_bar=False)  # warm up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        model.predict(list(pairs), batch_size=batch_size, show_progress_bar=False)
+    elapsed = time.perf_counter() - start
+    # A typical request reranks RERANK_MAX_CANDIDATES pairs.
+    per_request = 1000.0 * Config.RERANK_MAX_CANDIDATES * elapsed / (repeats * len(pairs))
+    return {"pairs_per_sec": repeats * len(pairs) / elapsed, "ms_per_request": per_request}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export the reranker cross-encoder to ONNX Runtime")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export_parser = sub.add_parser("export", help="Export to ONNX, quantize to int8 and check ranking parity with PyTorch")
+    export_parser.add_argument("--model", default=Config.RERANKER_MODEL)
+    export_parser.add_argument("--no-quantize", action="store_true")
+    args = parser.parse_args()
+
+    model = CrossEncoder(args.model)
+    directory = export_dir(args.model)
+    export_cross_encoder(model, directory, quantize=not args.no_quantize)
+    logger.info(f"Exported {args.model} to {directory}")
+
+    # Every parity sentence is ranked as a passage for each of them as a query.
+    queries = list(PARITY_SENTENCES)
+    passages = [list(PARITY_SENTENCES)] * len(queries)
+    failed = False
+    for backend in ("onnx", "onnx-int8"):
+        if not (directory / MODEL_FILES[backend]).exists():
+            continue
+        parity = ranking_overlap(model, OnnxCrossEncoder(directory, backend), queries, passages, k=3)
+        logger.info(
+            f"{backend}: top-3 overlap mean {parity['mean_overlap']:.3f}, min {parity['min_overlap']:.3f} "
+            f"({'ok' if parity['passed'] else 'FAILED'})"
+        )
+        failed = failed or not parity["passed"]
+    if failed:
+        raise SystemExit(f"Ranking parity below RERANK_PARITY_MIN_OVERLAP={Config.RERANK_PARITY_MIN_OVERLAP}; keep RERANKER_BACKEND=torch.")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    main()
@@ -3,6 +3,7 @@ from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
 import os
 import time
+from datetime import datetime
 import logging
 from typing import Set, List
 import json
@@ -153,6 +154,8 @@ class NITKKRScraper:
             f.write(f"Title: {text_data['title']}\n")
             f.write(f"Description: {text_data['description']}\n")
             f.write(f"Word Count: {text_data['word_count']}\n")
+            f.write(f"Content-Type: {text_data.get('content_type', 'html')}\n")
+            f.write(f"Crawled: {datetime.now().isoformat(timespec='seconds')}\n")
             f.write("-" * 50 + "\n")
             f.write(text_data['text'])
         
@@ -194,12 +197,14 @@ class NITKKRScraper:
                 }
                 html_file = self.save_page(url, html, metadata)
                 text_data = self.extract_text_from_html(html, url)
+                text_data["content_type"] = "html"
                 
             elif "application/pdf" in content_type:
                 # 2. Handle PDF
                 logger.info(f"📄 Found PDF: {url}")
                 pdf_bytes = response.content
                 text_data = self.extract_text_from_pdf(pdf_bytes, url)
+                text_data["content_type"] = "pdf"
                 # We don't save the PDF HTML, so html_file remains None
             
             else:
@@ -0,0 +1,182 @@
+import json
+import logging
+import mmap
+import os
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_FORMAT_VERSION = 1
+
+# One fixed-width record per chunk, sorted by chunk_id so lookups are a binary search.
+CHUNK_RECORD_DTYPE = np.dtype(
+    [
+        ("chunk_id", "<i8"),
+        ("doc_ref", "<i4"),
+        ("word_count", "<i4"),
+        ("text_offset", "<i8"),
+        ("text_length", "<i4"),
+    ]
+)
+
+DOCUMENT_FIELDS = ("url", "title", "source_file")
+
+
+def compress_text(text: str) -> bytes:
+    return zlib.compress(text.encode("utf-8"), 6)
+
+
+def decompress_text(blob: bytes) -> str:
+    return zlib.decompress(blob).decode("utf-8")
+
+
+class SegmentWriter:
+    """Write a segment directory: embeddings.npy, chunks.npy, texts.bin, documents.json, header.json."""
+
+    def __init__(self, directory: Path, dimension: int, num_chunks: int):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.dimension = dimension
+        self.num_chunks = num_chunks
+
+        # Both arrays are preallocated on disk, so writing a segment needs no memory proportional to its size.
+        if num_chunks:
+            self.embeddings = np.lib.format.open_memmap(
+                str(self.directory / "embeddings.npy"), mode="w+", dtype="float32", shape=(num_chunks, dimension)
+            )
+            self.records = np.lib.format.open_memmap(
+                str(self.directory / "chunks.npy"), mode="w+", dtype=CHUNK_RECORD_DTYPE, shape=(num_chunks,)
+            )
+        else:
+            self.embeddings = np.empty((0, dimension), dtype="float32")
+            self.records = np.zeros(0, dtype=CHUNK_RECORD_DTYPE)
+
+        self._texts = open(self.directory / "texts.bin", "wb")
+        self._offset = 0
+        self._row = 0
+        self._doc_refs: Dict[str, int] = {}
+        self._documents: List[Dict] = []
+
+    def _doc_ref(self, document: Dict) -> int:
+        source_file = document["source_file"]
+        ref = self._doc_refs.get(source_file)
+        if ref is None:
+            ref = len(self._documents)
+            self._doc_refs[source_file] = ref
+            self._documents.append({field: document.get(field, "Unknown") for field in DOCUMENT_FIELDS})
+        return ref
+
+    def add(
+        self,
+        chunk_id: int,
+        document: Dict,
+        vector: np.ndarray,
+        text: Optional[str] = None,
+        compressed: Optional[bytes] = None,
+        word_count: Optional[int] = None,
+    ) -> None:
+        """Append one chunk; pass ``compressed`` to copy text from another segment without re-encoding it."""
+        if self._row >= self.num_chunks:
+            raise ValueError(f"Segment was sized for {self.num_chunks} chunks.")
+        if self._row and chunk_id <= self.records[self._row - 1]["chunk_id"]:
+            raise ValueError("Chunks must be added in increasing chunk_id order.")
+
+        if compressed is None:
+            compressed = compress_text(text or "")
+        if word_count is None:
+            word_count = len((text if text is not None else decompress_text(compressed)).split())
+
+        self._texts.write(compressed)
+        self.embeddings[self._row] = vector
+        self.records[self._row] = (chunk_id, self._doc_ref(document), word_count, self._offset, len(compressed))
+        self._offset += len(compressed)
+        self._row += 1
+
+    def close(self) -> None:
+        if self._row != self.num_chunks:
+            raise ValueError(f"Segment expected {self.num_chunks} chunks but received {self._row}.")
+
+        self._texts.close()
+        for name, array in (("embeddings.npy", self.embeddings), ("chunks.npy", self.records)):
+            if isinstance(array, np.memmap):
+                array.flush()
+            else:
+                np.save(self.directory / name, array)
+        self.embeddings = None
+        self.records = None
+
+        with open(self.directory / "documents.json", "w", encoding="utf-8") as doc_file:
+            json.dump(self._documents, doc_file)
+
+        header = {
+            "format_version": SEGMENT_FORMAT_VERSION,
+            "dimension": self.dimension,
+            "num_chunks": self.num_chunks,
+            "num_documents": len(self._documents),
+        }
+        with open(self.directory / "header.json", "w", encoding="utf-8") as header_file:
+            json.dump(header, header_file, indent=2)
+
+
+class Segment:
+    """Read-only, memory-mapped view of a segment directory; chunk text is decompressed on demand."""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        with open(self.directory / "header.json", "r", encoding="utf-8") as header_file:
+            self.header = json.load(header_file)
+
+        if self.header.get("format_version") != SEGMENT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported segment format: {self.header.get('format_version')}")
+
+        mmap_mode = "r" if self.header["num_chunks"] else None
+        self.embeddings = np.load(self.directory / "embeddings.npy", mmap_mode=mmap_mode)
+        self.records = np.load(self.directory / "chunks.npy", mmap_mode=mmap_mode)
+        self.chunk_ids = self.records["chunk_id"]
+
+        with open(self.directory / "documents.json", "r", encoding="utf-8") as doc_file:
+            self.documents: List[Dict] = json.load(doc_file)
+
+        self._text_file = open(self.directory / "texts.bin", "rb")
+        size = os.fstat(self._text_file.fileno()).st_size
+        self._texts = mmap.mmap(self._text_file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __len__(self) -> int:
+        return int(self.header["num_chunks"])
+
+    def row_of(self, chunk_id: int) -> int:
+        """Row index of ``chunk_id`` or -1 if the segment does not hold it."""
+        row = int(np.searchsorted(self.chunk_ids, chunk_id))
+        if row < len(self) and int(self.chunk_ids[row]) == chunk_id:
+            return row
+        return -1
+
+    def compressed_text(self, row: int) -> bytes:
+        record = self.records[row]
+        offset = int(record["text_offset"])
+        return bytes(self._texts[offset : offset + int(record["text_length"])])
+
+    def text(self, row: int) -> str:
+        return decompress_text(self.compressed_text(row))
+
+    def document(self, row: int) -> Dict:
+        return self.documents[int(self.records[row]["doc_ref"])]
+
+    def metadata(self, row: int) -> Dict:
+        item = dict(self.document(row))
+        item["id"] = int(self.chunk_ids[row])
+        item["chunk_text"] = self.text(row)
+        return item
+
+    def close(self) -> None:
+        """Release the memory maps so the directory can be replaced."""
+        if isinstance(self._texts, mmap.mmap):
+            self._texts.close()
+        self._text_file.close()
+        self.embeddings = None
+        self.records = None
+        self.chunk_ids = None
@@ -0,0 +1,290 @@
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import numpy as np
+
+# Worker processes import this module; keep it to FAISS and NumPy so they start without loading the encoder.
+from faiss_index import (
+    FAISS_AVAILABLE,
+    apply_search_params,
+    bitmap_search_params,
+    build_faiss_index,
+    faiss,
+    filter_search_params,
+)
+from numpy_index import METRIC_INNER_PRODUCT, METRIC_L2, NumpyFlatIndex
+from segment_store import Segment
+
+logger = logging.getLogger(__name__)
+
+SHARD_KEYS = ("document", "site")
+
+
+def shard_for(document: Dict, num_shards: int, key: str = "document") -> int:
+    """Stable shard number for a document, hashed by source file or by website host."""
+    if key == "site":
+        value = urlparse(document.get("url", "")).netloc or document.get("source_file", "")
+    else:
+        value = document.get("source_file", "")
+    return zlib.crc32(value.encode("utf-8")) % num_shards
+
+
+def _shard_rows(segment, shard: int, num_shards: int, key: str) -> np.ndarray:
+    doc_shards = np.array([shard_for(doc, num_shards, key) for doc in segment.documents], dtype=np.int64)
+    if not len(segment):
+        return np.empty(0, dtype=np.int64)
+    return np.flatnonzero(doc_shards[np.asarray(segment.records["doc_ref"])] == shard)
+
+
+def _load_shard_index(shard: int, num_shards: int, snapshot_dir: Path, options: Dict):
+    """Load this shard's cached FAISS index from the snapshot, or build it from the snapshot's segment."""
+    use_faiss = FAISS_AVAILABLE and options["use_faiss"]
+    cache_path = snapshot_dir / "shards" / f"shard-{shard:03d}-of-{num_shards:03d}.faiss"
+    if use_faiss and cache_path.exists():
+        index = faiss.read_index(str(cache_path))
+        apply_search_params(index)
+        return index
+
+    segment_dir = snapshot_dir / "segment"
+    segment = Segment(segment_dir) if (segment_dir / "header.json").exists() else None
+    if segment is not None:
+        rows = _shard_rows(segment, shard, num_shards, options["shard_key"])
+        vectors = np.asarray(segment.embeddings[rows], dtype="float32")
+        ids = np.asarray(segment.chunk_ids[rows], dtype=np.int64)
+        segment.close()
+    else:
+        vectors = np.empty((0, options["dimension"]), dtype="float32")
+        ids = np.empty(0, dtype=np.int64)
+
+    if not use_faiss:
+        metric_type = METRIC_INNER_PRODUCT if options["metric"] == "cosine" else METRIC_L2
+        return NumpyFlatIndex(options["dimension"], metric_type, vectors, ids, options["block_rows"])
+
+    index = build_faiss_index(
+        options["dimension"], options["index_type"] if len(vectors) else "flat",
+        vectors if len(vectors) else None, options["metric"], options["storage"],
+    )
+    if len(vectors):
+        index.add_with_ids(vectors, ids)
+    if segment is not None:
+        # Snapshots never change once published, so later workers can load the shard directly.
+        cache_path.parent.mkdir(exist_ok=True)
+        tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        faiss.write_index(index, str(tmp_path))
+        os.replace(tmp_path, cache_path)
+    return index
+
+
+def _shard_worker(conn, shard: int, num_shards: int, snapshot_dir: str, options: Dict) -> None:
+    """Serve one shard: answer search/add/exclude requests arriving on the pipe until told to close."""
+    try:
+        if FAISS_AVAILABLE:
+            faiss.omp_set_num_threads(max(1, (os.cpu_count() or 1) // num_shards))
+        index = _load_shard_index(shard, num_shards, Path(snapshot_dir), options)
+        is_faiss = not isinstance(index, NumpyFlatIndex)
+    except Exception as exc:
+        conn.send(("error", f"shard {shard} failed to start: {exc}"))
+        return
+
+    conn.send(("ready", index.ntotal))
+    excluded: Optional[np.ndarray] = None
+    params = None
+
+    while True:
+        try:
+            op, payload = conn.recv()
+        except EOFError:
+            return
+        try:
+            if op == "search":
+                queries, k, allowed = payload
+                start = time.perf_counter()
+                if allowed is not None:
+                    # Filter bitmaps only hold live chunks, so they replace the tombstone exclusion.
+                    if is_faiss:
+                        scores, ids = index.search(queries, k, params=bitmap_search_params(index, allowed))
+                    else:
+                        included = np.flatnonzero(np.unpackbits(allowed, bitorder="little"))
+                        scores, ids = index.search(queries, k, included=included)
+                elif excluded is None or not len(excluded):
+                    scores, ids = index.search(queries, k)
+                elif is_faiss:
+                    scores, ids = index.search(queries, k, params=params)
+                else:
+                    scores, ids = index.search(queries, k, excluded=excluded)
+                conn.send(("ok", (scores, ids, time.perf_counter() - start)))
+            elif op == "add":
+                vectors, ids = payload
+                index.add_with_ids(vectors, ids)
+                conn.send(("ok", index.ntotal))
+            elif op == "exclude":
+                excluded = payload
+                params = filter_search_params(index, excluded) if is_faiss and len(excluded) else None
+                conn.send(("ok", index.ntotal))
+            elif op == "close":
+                conn.send(("ok", None))
+                return
+            else:
+                conn.send(("error", f"unknown operation {op}"))
+        except Exception as exc:
+            conn.send(("error", str(exc)))
+
+
+class ShardedIndex:
+    """Vector index partitioned over worker processes, searched by scatter-gather.
+
+    Each shard owns the chunks of the documents that hash to it (see ``shard_for``) and serves them
+    from its own process over a pipe. Implements the index API the vector store uses (``ntotal``,
+    ``add_with_ids``, ``search``), so it stands in for a single FAISS or NumPy index. A worker could
+    equally sit behind a socket on another machine that mounts the same snapshot directory.
+    """
+
+    def __init__(
+        self,
+        num_shards: int,
+        snapshot_dir: Path,
+        options: Dict,
+        router: Callable[[int], int],
+    ):
+        self.num_shards = num_shards
+        self.router = router
+        self.metric_type = METRIC_INNER_PRODUCT if options["metric"] == "cosine" else METRIC_L2
+        self.d = options["dimension"]
+        # Each pipe carries one request/reply at a time, so a whole scatter-gather holds the lock.
+        self._lock = threading.Lock()
+
+        context = multiprocessing.get_context("spawn")
+        self._conns = []
+        self._processes = []
+        for shard in range(num_shards):
+            parent_conn, child_conn = context.Pipe()
+            process = context.Process(
+                target=_shard_worker,
+                args=(child_conn, shard, num_shards, str(snapshot_dir), options),
+                name=f"vector-shard-{shard}",
+                daemon=True,
+            )
+            process.start()
+            child_conn.close()
+            self._conns.append(parent_conn)
+            self._processes.append(process)
+
+        try:
+            self._counts = [self._receive(shard) for shard in range(num_shards)]
+        except Exception:
+            self._close()
+            raise
+        self._excluded: Optional[np.ndarray] = None
+        self.last_latencies: List[Dict] = []
+        self._queries = [0] * num_shards
+        self._search_seconds = [0.0] * num_shards
+        logger.info(f"Started {num_shards} index shards holding {self._counts} vectors.")
+
+    def _receive(self, shard: int):
+        status, payload = self._conns[shard].recv()
+        if status != "ok" and status != "ready":
+            raise RuntimeError(payload)
+        return payload
+
+    def _request(self, shard: int, op: str, payload=None):
+        self._conns[shard].send((op, payload))
+        return self._receive(shard)
+
+    @property
+    def ntotal(self) -> int:
+        return int(sum(self._counts))
+
+    def add_with_ids(self, vectors: np.ndarray, ids: np.ndarray) -> None:
+        vectors = np.asarray(vectors, dtype="float32").reshape(-1, self.d)
+        ids = np.asarray(ids, dtype=np.int64)
+        shards = np.array([self.router(int(chunk_id)) for chunk_id in ids], dtype=np.int64)
+        with self._lock:
+            for shard in np.unique(shards).tolist():
+                mask = shards == shard
+                self._counts[shard] = self._request(shard, "add", (vectors[mask], ids[mask]))
+
+    def search(
+        self,
+        queries: np.ndarray,
+        k: int,
+        excluded: Optional[np.ndarray] = None,
+        allowed: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Send the queries to every shard, then merge the per-shard top-k into a global top-k.
+
+        ``allowed`` is a chunk-id bitmap (see FacetIndex) restricting every shard's search.
+        """
+        queries = np.asarray(queries, dtype="float32").reshape(-1, self.d)
+        with self._lock:
+            if allowed is None and excluded is not self._excluded:
+                empty = np.empty(0, dtype=np.int64)
+                for shard in range(self.num_shards):
+                    self._request(shard, "exclude", excluded if excluded is not None else empty)
+                self._excluded = excluded
+
+            start = time.perf_counter()
+            for conn in self._conns:
+                conn.send(("search", (queries, k, allowed)))
+
+            all_scores, all_ids, latencies = [], [], []
+            for shard in range(self.num_shards):
+                scores, ids, search_seconds = self._receive(shard)
+                all_scores.append(scores)
+                all_ids.append(ids)
+                latencies.append({
+                    "shard": shard,
+                    "search_ms": search_seconds * 1000.0,
+                    "round_trip_ms": (time.perf_counter() - start) * 1000.0,
+                })
+                self._queries[shard] += len(queries)
+                self._search_seconds[shard] += search_seconds
+            self.last_latencies = latencies
+
+        scores = np.concatenate(all_scores, axis=1).astype("float32")
+        ids = np.concatenate(all_ids, axis=1)
+        # Rank on a "smaller is better" key: L2 distances as-is, inner products negated.
+        keys = scores if self.metric_type == METRIC_L2 else -scores
+        keys = np.where(ids == -1, np.inf, keys)
+        order = np.argsort(keys, axis=1, kind="stable")[:, :k]
+        return np.take_along_axis(scores, order, axis=1), np.take_along_axis(ids, order, axis=1)
+
+    def get_stats(self) -> List[Dict]:
+        with self._lock:
+            return self._shard_stats()
+
+    def _shard_stats(self) -> List[Dict]:
+        last = {item["shard"]: item for item in self.last_latencies}
+        return [
+            {
+                "shard": shard,
+                "vectors": self._counts[shard],
+                "queries": self._queries[shard],
+                "mean_search_ms": 1000.0 * self._search_seconds[shard] / self._queries[shard] if self._queries[shard] else 0.0,
+                "last_round_trip_ms": last.get(shard, {}).get("round_trip_ms", 0.0),
+            }
+            for shard in range(self.num_shards)
+        ]
+
+    def close(self) -> None:
+        with self._lock:
+            self._close()
+
+    def _close(self) -> None:
+        for shard, (conn, process) in enumerate(zip(self._conns, self._processes)):
+            try:
+                self._request(shard, "close")
+            except (EOFError, OSError, RuntimeError):
+                pass
+            conn.close()
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._conns = []
+        self._processes = []
@@ -0,0 +1,175 @@
+import base64
+import json
+import logging
+import os
+import shutil
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CURRENT_FILE = "CURRENT"
+SNAPSHOTS_DIR = "snapshots"
+
+# Files of the pre-snapshot layout, written directly into the vector store root.
+FLAT_LAYOUT_ENTRIES = ("nitkkr_index.faiss", "segment", "lexical", "manifest.json", "file_state.json", "model_info.json")
+
+
+def _fsync_dir(directory: Path) -> None:
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class SnapshotStore:
+    """Versioned snapshot directories under ``root/snapshots``, published by atomically replacing ``root/CURRENT``.
+
+    A snapshot is staged in ``<version>.tmp`` and renamed once complete, so readers following
+    CURRENT only ever see finished snapshots. The newest ``retain`` snapshots are kept so a reader
+    that resolved CURRENT just before a publish can still open the files it expects.
+    """
+
+    def __init__(self, root: Path, retain: int = 2):
+        self.root = Path(root)
+        self.snapshots_dir = self.root / SNAPSHOTS_DIR
+        self.retain = max(1, retain)
+
+    @staticmethod
+    def _name(version: int) -> str:
+        return f"{version:06d}"
+
+    def current_version(self) -> Optional[int]:
+        try:
+            return int((self.root / CURRENT_FILE).read_text(encoding="utf-8").strip())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def current_dir(self) -> Path:
+        """Directory holding the published snapshot; stores without CURRENT use the flat root layout."""
+        version = self.current_version()
+        return self.root if version is None else self.snapshots_dir / self._name(version)
+
+    def wal_path(self, version: int) -> Path:
+        return self.root / f"wal-{self._name(version)}.log"
+
+    def _versions(self) -> List[int]:
+        if not self.snapshots_dir.exists():
+            return []
+        return sorted(int(path.name) for path in self.snapshots_dir.iterdir() if path.is_dir() and path.name.isdigit())
+
+    def begin(self) -> Tuple[int, Path]:
+        """Reserve the next version and return (version, empty staging directory)."""
+        versions = self._versions()
+        version = max(versions[-1] if versions else 0, self.current_version() or 0) + 1
+        staging = self.snapshots_dir / f"{self._name(version)}.tmp"
+        if staging.exists():
+            shutil.rmtree(staging)
+        staging.mkdir(parents=True)
+        return version, staging
+
+    def publish(self, version: int, staging: Path) -> Path:
+        """Move a staged snapshot into place and point CURRENT at it."""
+        previous = self.current_version()
+        final = self.snapshots_dir / self._name(version)
+        staging.rename(final)
+        _fsync_dir(self.snapshots_dir)
+
+        pointer_tmp = self.root / f"{CURRENT_FILE}.tmp"
+        with open(pointer_tmp, "w", encoding="utf-8") as pointer_file:
+            pointer_file.write(self._name(version))
+            pointer_file.flush()
+            os.fsync(pointer_file.fileno())
+        os.replace(pointer_tmp, self.root / CURRENT_FILE)
+        _fsync_dir(self.root)
+
+        if previous is None:
+            self._remove_flat_layout()
+        self._prune(version)
+        return final
+
+    def _remove_flat_layout(self) -> None:
+        for name in FLAT_LAYOUT_ENTRIES:
+            path = self.root / name
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+            elif path.exists():
+                path.unlink()
+
+    def _prune(self, current: int) -> None:
+        for version in self._versions():
+            if version <= current - self.retain:
+                # Unlinking files another process still has memory-mapped is safe on POSIX; elsewhere retry next time.
+                shutil.rmtree(self.snapshots_dir / self._name(version), ignore_errors=True)
+            if version < current:
+                wal = self.wal_path(version)
+                if wal.exists():
+                    wal.unlink()
+        for staging in self.snapshots_dir.glob("*.tmp"):
+            shutil.rmtree(staging, ignore_errors=True)
+
+
+def encode_vectors(vectors: np.ndarray) -> str:
+    return base64.b64encode(np.ascontiguousarray(vectors, dtype="<f4").tobytes()).decode("ascii")
+
+
+def decode_vectors(blob: str, count: int) -> np.ndarray:
+    vectors = np.frombuffer(base64.b64decode(blob), dtype="<f4")
+    return vectors.reshape(count, -1) if count else vectors.reshape(0, 0)
+
+
+class UpdateLog:
+    """Append-only write-ahead log of document updates made since a snapshot.
+
+    Each line is ``<crc32> <json>``; appends are fsynced before returning. A torn or corrupt tail
+    (from a crash mid-write) ends replay and is truncated before the next append.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.records = 0
+        self._valid_bytes: Optional[int] = None
+
+    def read(self) -> List[Dict]:
+        records: List[Dict] = []
+        valid = 0
+        if self.path.exists():
+            with open(self.path, "rb") as log_file:
+                for line in log_file:
+                    if not line.endswith(b"\n"):
+                        break
+                    crc, _, payload = line.rstrip(b"\n").partition(b" ")
+                    try:
+                        if int(crc) != zlib.crc32(payload):
+                            break
+                        records.append(json.loads(payload))
+                    except ValueError:
+                        break
+                    valid += len(line)
+            if valid < self.path.stat().st_size:
+                logger.warning(f"Ignoring a torn record at the end of {self.path}.")
+        self.records = len(records)
+        self._valid_bytes = valid
+        return records
+
+    def append(self, record: Dict) -> None:
+        if self._valid_bytes is None:
+            self.read()
+        payload = json.dumps(record, separators=(",", ":")).encode("utf-8")
+        with open(self.path, "ab") as log_file:
+            if log_file.tell() != self._valid_bytes:
+                log_file.truncate(self._valid_bytes)
+            log_file.write(str(zlib.crc32(payload)).encode("ascii") + b" " + payload + b"\n")
+            log_file.flush()
+            os.fsync(log_file.fileno())
+            self._valid_bytes = log_file.tell()
+        self.records += 1
+
+    def size_bytes(self) -> int:
+        return self._valid_bytes or 0
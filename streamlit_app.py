@@ -60,9 +60,11 @@ def initialize_rag_system():
     try:
         from rag_system import RAGSystem
         from config import Config
+        from snapshot_store import SnapshotStore
         
         # Check if vector store exists
-        if not Path("vector_store/nitkkr_index.faiss").exists():
+        store_dir = SnapshotStore(Path(Config.VECTOR_STORE_PATH)).current_dir()
+        if not (store_dir / "segment").exists() and not (store_dir / "nitkkr_index.faiss").exists():
             return None, "Vector store not found. Please run 'python main.py embed' first to generate embeddings."
         
         # Check Groq configuration
@@ -0,0 +1,73 @@
+import re
+import sys
+import zlib
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# The modules live at the repository root rather than in a package.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import vector_embeddings  # noqa: E402
+
+PAGES = {
+    "exams": ("https://nitkkr.ac.in/academics/exams", "Examinations", "End semester exam schedule and hall tickets."),
+    "hostel": ("https://nitkkr.ac.in/hostel/fees", "Hostel Fees", "Hostel fee payment deadlines and mess charges."),
+    "library": ("https://nitkkr.ac.in/library", "Library", "Central library timings and book issue rules."),
+    "cse": ("https://nitkkr.ac.in/departments/cse", "Computer Engineering", "CSE department faculty and laboratories."),
+}
+
+
+class FakeSentenceTransformer:
+    """Deterministic bag-of-words encoder standing in for a downloaded sentence-transformers model."""
+
+    dimension = 64
+
+    def __init__(self, model_name: str = "fake", **kwargs):
+        self.model_name = model_name
+        self.calls = []
+        self.pools = []
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def encode(self, sentences, batch_size: int = 32, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        self.calls.append((len(texts), batch_size))
+        vectors = np.zeros((len(texts), self.dimension), dtype="float32")
+        for row, text in enumerate(texts):
+            for word in re.findall(r"\w+", text.lower()):
+                vectors[row, zlib.crc32(word.encode("utf-8")) % self.dimension] += 1.0
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return vectors[0] if single else vectors
+
+    def start_multi_process_pool(self, target_devices):
+        self.pools.append(len(target_devices))
+        return object()
+
+    def encode_multi_process(self, sentences, pool, batch_size: int = 32, **kwargs):
+        return self.encode(sentences, batch_size=batch_size)
+
+    def stop_multi_process_pool(self, pool) -> None:
+        pass
+
+
+def write_page(directory: Path, name: str, url: str, title: str, text: str) -> Path:
+    path = directory / f"{name}.txt"
+    path.write_text(f"URL: {url}\nTitle: {title}\n{'-' * 50}\n{text}\n", encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def store_dir(tmp_path, monkeypatch):
+    """A working directory holding extracted_text/ pages, encoded by FakeSentenceTransformer."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(vector_embeddings, "SentenceTransformer", FakeSentenceTransformer)
+    monkeypatch.setattr(vector_embeddings, "SENTENCE_TRANSFORMERS_AVAILABLE", True)
+    text_dir = tmp_path / "extracted_text"
+    text_dir.mkdir()
+    for name, (url, title, text) in PAGES.items():
+        write_page(text_dir, name, url, title, text)
+    return tmp_path
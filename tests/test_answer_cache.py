@@ -0,0 +1,146 @@
+import numpy as np
+import pytest
+
+import answer_cache
+import rag_system
+from answer_cache import SemanticAnswerCache
+from config import Config
+from groq_llm import GroqLLMService
+from test_vector_embeddings import _built_store
+
+
+class FailingCompletions:
+    def create(self, **kwargs):
+        raise ConnectionError("groq is down")
+
+
+class EchoCompletions:
+    """Answers every prompt with its first line, so each call is recognisable."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def create(self, messages, **kwargs):
+        self.calls += 1
+        content = f"answer {self.calls}: " + messages[0]["content"].splitlines()[0]
+        message = type("Message", (), {"content": content})()
+        choice = type("Choice", (), {"message": message})()
+        return type("Completion", (), {"choices": [choice]})()
+
+
+def _groq_service(completions) -> GroqLLMService:
+    """A GroqLLMService whose client calls ``completions`` instead of the Groq API."""
+    service = GroqLLMService.__new__(GroqLLMService)
+    service.model = "fake"
+    service.client = type("Client", (), {"chat": type("Chat", (), {"completions": completions})()})()
+    return service
+
+
+def _rag(monkeypatch, groq_service=None) -> rag_system.RAGSystem:
+    """A RAGSystem over the store in the working directory, without a reranker or the Groq API."""
+    monkeypatch.setattr(rag_system, "load_cross_encoder", lambda model_name, backend: None)
+    rag = rag_system.RAGSystem(use_groq=False)
+    if groq_service is not None:
+        rag.use_groq = True
+        rag.groq_service = groq_service
+    return rag
+
+
+def _unit(*values) -> np.ndarray:
+    vector = np.zeros(4, dtype="float32")
+    vector[: len(values)] = values
+    return vector
+
+
+def test_close_queries_in_the_same_scope_share_an_answer():
+    cache = SemanticAnswerCache(4, threshold=0.95)
+    scope = SemanticAnswerCache.scope(5, {"host": "nitkkr.ac.in"})
+    cache.put(_unit(1.0), scope, 0, {"response": "hostel"}, 2.0)
+
+    hit = cache.get(_unit(1.0, 0.1), scope, 0)
+    assert hit["response"] == "hostel" and hit["cache_similarity"] >= 0.95
+    assert cache.get(_unit(1.0, 1.0), scope, 0) is None
+    assert cache.get(_unit(1.0), SemanticAnswerCache.scope(5, None), 0) is None
+    assert cache.get_stats()["answer_cache_seconds_saved"] == 2.0
+
+
+def test_entries_are_dropped_when_the_store_changes_or_they_expire(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(answer_cache.time, "monotonic", lambda: now[0])
+    cache = SemanticAnswerCache(4, max_entries=2, ttl_seconds=10)
+    scope = SemanticAnswerCache.scope(5, None)
+
+    cache.put(_unit(1.0), scope, 1, {"response": "a"}, 1.0)
+    assert cache.get(_unit(1.0), scope, 2) is None
+    assert len(cache) == 0 and cache.invalidations == 1
+
+    # An answer computed against the old version is not stored.
+    cache.put(_unit(1.0), scope, 1, {"response": "stale"}, 1.0)
+    assert len(cache) == 0
+
+    cache.put(_unit(1.0), scope, 2, {"response": "a"}, 1.0)
+    cache.put(_unit(0.0, 1.0), scope, 2, {"response": "b"}, 1.0)
+    cache.put(_unit(0.0, 0.0, 1.0), scope, 2, {"response": "c"}, 1.0)
+    assert cache.get(_unit(1.0), scope, 2) is None
+    now[0] += 11
+    assert cache.get(_unit(0.0, 0.0, 1.0), scope, 2) is None and len(cache) == 0
+
+
+def test_repeated_questions_are_answered_from_cache_until_the_store_changes(store_dir, monkeypatch):
+    _built_store()
+    rag = _rag(monkeypatch)
+
+    first = rag.answer_query("hostel fee deadlines", k=2)
+    again = rag.answer_query("Hostel fee   deadlines", k=2)
+    assert not first["cached"] and again["cached"]
+    assert again["response"] == first["response"] and again["sources"] == first["sources"]
+    assert not rag.answer_query("hostel fee deadlines", k=3)["cached"]
+
+    (store_dir / "extracted_text" / "hostel.txt").write_text(
+        "URL: https://nitkkr.ac.in/hostel/fees\nTitle: Hostel Fees\n" + "-" * 50 + "\nHostel fee deadlines moved to July.\n",
+        encoding="utf-8",
+    )
+    rag.embedding_system.update_document(str(store_dir / "extracted_text" / "hostel.txt"))
+    refreshed = rag.answer_query("hostel fee deadlines", k=2)
+    assert not refreshed["cached"] and "July" in refreshed["response"]
+
+
+def test_answers_from_groq_are_cached(store_dir, monkeypatch):
+    _built_store()
+    completions = EchoCompletions()
+    rag = _rag(monkeypatch, _groq_service(completions))
+
+    first = rag.answer_query("library timings", k=2)
+    calls = completions.calls
+    again = rag.answer_query("library timings", k=2)
+    assert again.pop("cache_similarity") > 0.99
+    assert again == dict(first, cached=True)
+    assert completions.calls == calls
+
+
+def test_fallback_answers_for_a_failed_groq_call_are_not_cached(store_dir, monkeypatch):
+    _built_store()
+    rag = _rag(monkeypatch, _groq_service(FailingCompletions()))
+
+    answer = rag.answer_query("library timings", k=2)
+    assert "technical difficulties" not in answer["response"]
+    assert "library" in answer["response"].lower()
+    assert not rag.answer_query("library timings", k=2)["cached"]
+    assert len(rag.answer_cache) == 0
+
+
+def test_groq_rag_response_keeps_its_canned_apology_by_default():
+    service = _groq_service(FailingCompletions())
+    assert "technical difficulties" in service.generate_rag_response("library", "context")
+    with pytest.raises(ConnectionError):
+        service.generate_rag_response("library", "context", fallback=False)
+
+
+def test_disabled_cache_answers_every_query(store_dir, monkeypatch):
+    _built_store()
+    monkeypatch.setattr(Config, "ANSWER_CACHE_SIZE", 0)
+    rag = _rag(monkeypatch)
+
+    assert rag.answer_cache is None
+    rag.answer_query("library timings", k=2)
+    assert not rag.answer_query("library timings", k=2)["cached"]
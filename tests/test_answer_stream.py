@@ -0,0 +1,92 @@
+import asyncio
+
+from test_answer_cache import _groq_service, _rag
+from test_vector_embeddings import _built_store
+
+
+def _chunk(text):
+    delta = type("Delta", (), {"content": text})()
+    return type("Chunk", (), {"choices": [type("Choice", (), {"delta": delta})()]})()
+
+
+class StreamingCompletions:
+    """Streams ``pieces``, raising after ``fail_after`` of them when it is set."""
+
+    def __init__(self, pieces, fail_after=None):
+        self.pieces = pieces
+        self.fail_after = fail_after
+        self.calls = 0
+
+    def create(self, messages, stream=False, **kwargs):
+        self.calls += 1
+        if not stream:
+            raise AssertionError("expected a streaming request")
+        return self._stream()
+
+    def _stream(self):
+        for i, piece in enumerate(self.pieces):
+            if i == self.fail_after:
+                raise ConnectionError("groq is down")
+            yield _chunk(piece)
+
+
+def _events(rag, query, **kwargs):
+    async def collect():
+        return [event async for event in rag.answer_query_stream(query, **kwargs)]
+
+    return asyncio.run(collect())
+
+
+def _text(events):
+    return "".join(event["text"] for event in events if event["event"] == "token")
+
+
+def test_answer_streams_sources_then_tokens_then_done(store_dir, monkeypatch):
+    _built_store()
+    completions = StreamingCompletions(["The library ", "opens ", "at nine."])
+    rag = _rag(monkeypatch)
+    rag.use_groq, rag.groq_service = True, _groq_service(completions)
+    # Query expansion is not streamed; keep it out of the way.
+    monkeypatch.setattr(rag, "generate_query_variations", lambda query: [query])
+
+    events = _events(rag, "library timings", k=2)
+    assert [event["event"] for event in events] == ["sources", "token", "token", "token", "done"]
+    assert events[0]["sources"][0]["url"] == "https://nitkkr.ac.in/library" and not events[0]["cached"]
+    assert _text(events) == "The library opens at nine."
+    assert events[-1]["total_ms"] >= events[-1]["time_to_first_token_ms"] >= 0
+
+    again = _events(rag, "library timings", k=2)
+    assert [event["event"] for event in again] == ["sources", "token", "done"]
+    assert again[0]["cached"] and _text(again) == "The library opens at nine."
+    assert completions.calls == 1
+    assert rag.get_system_stats()["stream_requests"] == 2
+
+
+def test_groq_failure_before_the_first_token_streams_an_uncached_fallback(store_dir, monkeypatch):
+    _built_store()
+    rag = _rag(monkeypatch, _groq_service(StreamingCompletions(["never sent"], fail_after=0)))
+    monkeypatch.setattr(rag, "generate_query_variations", lambda query: [query])
+
+    events = _events(rag, "library timings", k=2)
+    assert [event["event"] for event in events] == ["sources", "token", "done"]
+    assert "library" in _text(events).lower()
+    assert not _events(rag, "library timings", k=2)[0]["cached"]
+    assert len(rag.answer_cache) == 0
+
+
+def test_groq_failure_mid_answer_ends_the_stream_with_an_error(store_dir, monkeypatch):
+    _built_store()
+    rag = _rag(monkeypatch, _groq_service(StreamingCompletions(["The library ", "opens"], fail_after=1)))
+    monkeypatch.setattr(rag, "generate_query_variations", lambda query: [query])
+
+    events = _events(rag, "library timings", k=2)
+    assert [event["event"] for event in events] == ["sources", "token", "error"]
+    assert "groq is down" in events[-1]["detail"]
+    assert len(rag.answer_cache) == 0
+
+
+def test_template_answers_stream_as_one_piece(store_dir, monkeypatch):
+    _built_store()
+    rag = _rag(monkeypatch)
+    context = rag.format_context(rag.retrieve_relevant_documents("library timings", k=2))
+    assert list(rag.generate_response_stream("library timings", context)) == [rag.generate_response("library timings", context)]
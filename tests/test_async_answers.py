@@ -0,0 +1,64 @@
+import asyncio
+import threading
+
+from config import Config
+from test_answer_cache import EchoCompletions, FailingCompletions, _groq_service, _rag
+from test_vector_embeddings import _built_store
+
+
+class WaitingCompletions(EchoCompletions):
+    """Answers only once ``started`` is set, recording whether it was set before the timeout."""
+
+    def __init__(self, started: threading.Event):
+        super().__init__()
+        self.started = started
+        self.overlapped = []
+
+    def create(self, messages, **kwargs):
+        self.overlapped.append(self.started.wait(timeout=5))
+        return super().create(messages, **kwargs)
+
+
+def test_async_answers_match_sync_answers(store_dir, monkeypatch):
+    _built_store()
+    monkeypatch.setattr(Config, "ANSWER_CACHE_SIZE", 0)
+    rag = _rag(monkeypatch, _groq_service(EchoCompletions()))
+
+    for query, filters in [("hostel fee deadlines", None), ("library timings", {"url_prefix": "nitkkr.ac.in/library"})]:
+        expected = rag.answer_query(query, k=3, filters=filters)
+        answer = asyncio.run(rag.answer_query_async(query, k=3, filters=filters))
+        assert answer["sources"] == expected["sources"]
+        assert answer["num_sources"] == expected["num_sources"] > 0 and not answer["cached"]
+
+
+def test_original_query_is_searched_while_expansion_is_in_flight(store_dir, monkeypatch):
+    _built_store()
+    rag = _rag(monkeypatch)
+    started = threading.Event()
+    completions = WaitingCompletions(started)
+    rag.use_groq, rag.groq_service = True, _groq_service(completions)
+
+    search_many = rag.embedding_system.search_many
+
+    def searching(queries, **kwargs):
+        if queries == ["library timings"]:
+            started.set()
+        return search_many(queries, **kwargs)
+
+    monkeypatch.setattr(rag.embedding_system, "search_many", searching)
+    answer = asyncio.run(rag.answer_query_async("library timings", k=2))
+    assert completions.overlapped[0] is True
+    assert answer["sources"][0]["url"] == "https://nitkkr.ac.in/library"
+
+
+def test_async_path_caches_answers_but_not_fallbacks(store_dir, monkeypatch):
+    _built_store()
+    rag = _rag(monkeypatch)
+    first = asyncio.run(rag.answer_query_async("library timings", k=2))
+    assert asyncio.run(rag.answer_query_async("library timings", k=2))["cached"]
+    assert rag.answer_query("library timings", k=2)["response"] == first["response"]
+
+    failing = _rag(monkeypatch, _groq_service(FailingCompletions()))
+    asyncio.run(failing.answer_query_async("library timings", k=2))
+    assert not asyncio.run(failing.answer_query_async("library timings", k=2))["cached"]
+    assert len(failing.answer_cache) == 0
@@ -0,0 +1,53 @@
+import json
+
+import numpy as np
+
+from chunk_store import ChunkStore
+from segment_store import Segment, SegmentWriter
+from test_vector_embeddings import _built_store
+
+HOSTEL = {"url": "https://nitkkr.ac.in/hostel", "title": "Hostel", "source_file": "hostel.txt"}
+LIBRARY = {"url": "https://nitkkr.ac.in/library", "title": "Library", "source_file": "library.txt"}
+
+
+def _segment(tmp_path) -> Segment:
+    writer = SegmentWriter(tmp_path / "segment", dimension=2, num_chunks=2)
+    writer.add(0, HOSTEL, np.zeros(2, dtype="float32"), text="hostel fee deadline")
+    writer.add(1, LIBRARY, np.ones(2, dtype="float32"), text="library timings")
+    writer.close()
+    return Segment(tmp_path / "segment")
+
+
+def test_segment_chunks_and_new_chunks_read_alike(tmp_path):
+    store = ChunkStore(_segment(tmp_path))
+    store.add(2, HOSTEL, "mess charges ₹ 3000")
+
+    assert sorted(store) == [0, 1, 2] and len(store) == 3
+    assert store.text(2) == "mess charges ₹ 3000" and store.document(2) == store.document(0)
+    assert dict(store[2]) == {"id": 2, "chunk_text": "mess charges ₹ 3000", **HOSTEL}
+    assert store.total_words == 9 and len(store.documents) == 2
+    store.close()
+
+
+def test_removed_chunks_disappear(tmp_path):
+    store = ChunkStore(_segment(tmp_path))
+    store.add(2, LIBRARY, "book issue rules")
+    store.pop(0)
+    store.pop(2)
+
+    assert sorted(store) == [1] and 0 not in store and store.get(2) is None
+    assert store.base_row(0) == -1 and store.base_row(1) == 1
+    assert store.total_words == 2
+    store.close()
+
+
+def test_search_results_are_plain_dicts_that_outlive_later_writes(store_dir):
+    store = _built_store(num_workers=1)
+    hits = store.search("hostel fee payment", 2)
+
+    assert all(type(hit) is dict for hit in hits)
+    (store_dir / "extracted_text" / "hostel.txt").unlink()
+    store.sync_directory()
+
+    assert hits[0]["chunk_text"].startswith("Hostel fee payment")
+    json.dumps(store.search_many(["library", "exams"], 2))
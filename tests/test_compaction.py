@@ -0,0 +1,67 @@
+import threading
+
+from conftest import PAGES
+from test_snapshot_store import _loaded_store
+from test_vector_embeddings import _built_store, _pages
+
+
+def test_updates_tombstone_old_vectors_until_compaction(store_dir):
+    store = _built_store(num_workers=1)
+    old_ids = list(store.manifest["extracted_text/hostel.txt"])
+    store.update_document("extracted_text/hostel.txt")
+
+    assert store.tombstones == set(old_ids) and store.index.ntotal == len(PAGES) + len(old_ids)
+    assert not set(old_ids) & {hit["id"] for hit in store.search("hostel fee payment", 4)}
+    assert _loaded_store().tombstones == set(old_ids)
+
+    store.save_vector_store(compact=True)
+    assert not store.tombstones and store.index.ntotal == len(PAGES)
+    assert sorted(cid for ids in store.manifest.values() for cid in ids) == list(range(len(PAGES)))
+    assert store.next_chunk_id == len(PAGES)
+    assert _pages(store.search("hostel fee payment", 1)) == ["hostel"]
+    assert _pages(_loaded_store().search("hostel fee payment", 1)) == ["hostel"]
+
+
+def test_tombstone_changes_invalidate_cached_search_params(store_dir):
+    store = _built_store(num_workers=1)
+    store.update_document("extracted_text/hostel.txt")
+    assert store.tombstones
+    exams_id = store.manifest["extracted_text/exams.txt"][0]
+    assert exams_id in {hit["id"] for hit in store.search("exam schedule", 4)}
+
+    # Same set object and size, different contents: the cached exclusion must not be reused.
+    tombstones = store.tombstones
+    tombstones.clear()
+    tombstones.add(exams_id)
+    store.tombstones = tombstones
+
+    assert exams_id not in {hit["id"] for hit in store.search("exam schedule", 4)}
+
+
+def test_searches_never_mix_generations_during_compaction(store_dir):
+    store = _built_store(num_workers=1)
+    queries = {"hostel fee payment": "hostel", "library timings": "library", "exam schedule hall tickets": "exams"}
+    errors, stop = [], threading.Event()
+
+    def searcher():
+        while not stop.is_set():
+            try:
+                for query, page in queries.items():
+                    hit = store.search(query, 1)[0]
+                    assert _pages([hit]) == [page]
+                    assert PAGES[page][2].split()[0] in hit["chunk_text"]
+            except Exception as exc:  # noqa: BLE001 - surfaced through the errors list
+                errors.append(exc)
+                return
+
+    threads = [threading.Thread(target=searcher) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for _ in range(5):
+        store.update_document("extracted_text/cse.txt")
+        store.save_vector_store(compact=True)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
@@ -0,0 +1,69 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from config import Config
+from distributed_build import _claim, merge_build, plan_build, run_worker
+from test_vector_embeddings import _built_store, _pages
+from vector_embeddings import VectorEmbeddingSystem
+
+
+def _write_claim(build_dir: Path, unit: int, owner: str, age: float = 0.0) -> Path:
+    claim_path = build_dir / f"unit-{unit:04d}.claim"
+    claim_path.write_text(owner, encoding="utf-8")
+    if age:
+        stamp = time.time() - age
+        os.utime(claim_path, (stamp, stamp))
+    return claim_path
+
+
+def test_distributed_build_matches_a_single_process_build(store_dir):
+    build_dir = Path(Config.VECTOR_STORE_PATH) / "build"
+    plan = plan_build("extracted_text", num_units=3, build_dir=build_dir)
+    assert sorted(sum(plan["units"], [])) == sorted(str(path) for path in Path("extracted_text").glob("*.txt"))
+
+    assert run_worker(build_dir) == 3
+    total = merge_build(build_dir)
+    assert not build_dir.exists()
+
+    built = VectorEmbeddingSystem()
+    assert built.load_vector_store()
+    reference = _built_store(num_workers=1)
+    assert total == len(built.metadata) == len(reference.metadata)
+    assert sorted(chunk_id for ids in built.manifest.values() for chunk_id in ids) == list(range(total))
+    for query in ("hostel fee payment", "library book issue", "exam schedule"):
+        assert _pages(built.search(query, 2)) == _pages(reference.search(query, 2))
+
+
+def test_claims_held_by_live_workers_are_respected(tmp_path):
+    _write_claim(tmp_path, 0, f"{socket.gethostname()}:{os.getpid()}")
+    _write_claim(tmp_path, 1, "other-host:1")
+    assert not _claim(tmp_path, 0)
+    assert not _claim(tmp_path, 1)
+
+
+def test_stale_claims_are_taken_over(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "BUILD_CLAIM_TIMEOUT", 60)
+    finished = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"], capture_output=True, text=True)
+    dead_pid = int(finished.stdout)
+
+    _write_claim(tmp_path, 0, f"{socket.gethostname()}:{dead_pid}")
+    _write_claim(tmp_path, 1, "other-host:1", age=120)
+    assert _claim(tmp_path, 0)
+    assert _claim(tmp_path, 1)
+    mine = f"{socket.gethostname()}:{os.getpid()}"
+    assert (tmp_path / "unit-0000.claim").read_text(encoding="utf-8") == mine
+    assert not _claim(tmp_path, 0)
+
+
+def test_workers_skip_units_claimed_by_a_live_worker(store_dir):
+    build_dir = Path(Config.VECTOR_STORE_PATH) / "build"
+    plan_build("extracted_text", num_units=2, build_dir=build_dir)
+    _write_claim(build_dir, 0, "other-host:1")
+
+    assert run_worker(build_dir) == 1
+    assert not (build_dir / "unit-0000").exists()
+    assert (build_dir / "unit-0001" / "unit.json").exists()
@@ -0,0 +1,32 @@
+import numpy as np
+
+from embedding_cache import EmbeddingCache
+from test_vector_embeddings import _built_store
+
+
+def test_cache_is_keyed_by_model_and_text(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = EmbeddingCache(path, model_name="a", dimension=4)
+    cache.put_many(["hello", "world"], np.eye(2, 4, dtype="float32"))
+
+    found = cache.get_many(["world", "unseen", "hello"])
+    assert sorted(found) == [0, 2]
+    np.testing.assert_array_equal(found[0], np.eye(2, 4, dtype="float32")[1])
+    assert EmbeddingCache(path, model_name="b", dimension=4).get_many(["hello"]) == {}
+    cache.close()
+
+
+def test_cache_evicts_beyond_max_entries(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"), model_name="a", dimension=2, max_entries=3)
+    cache.put_many([f"text {i}" for i in range(5)], np.ones((5, 2), dtype="float32"))
+
+    assert len(cache) == 3
+    cache.close()
+
+
+def test_rebuild_only_encodes_new_chunks(store_dir):
+    _built_store(num_workers=1)
+    store = _built_store(num_workers=1)
+
+    assert store.model.calls == []
+    assert store.get_stats()["embedding_cache_hits"] == store.index.ntotal
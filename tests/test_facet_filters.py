@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from config import Config
+from conftest import write_page
+from facet_index import FacetIndex, parse_filters
+from test_vector_embeddings import _built_store, _pages
+
+QUERY = "hostel fee payment mess charges"
+
+
+def _filtered(store, filters, mode: str, k: int = 4) -> list:
+    return [(hit["id"], _pages([hit])[0]) for hit in store.search(QUERY, k, mode=mode, filters=filters)]
+
+
+def test_parse_filters_normalizes_and_rejects_bad_input():
+    assert parse_filters({"url_prefix": "https://NITKKR.ac.in/hostel/"}) == {"host": "nitkkr.ac.in", "path_prefix": "/hostel"}
+    assert parse_filters({"crawled_after": 10}) == {"crawled_after": 10.0}
+    with pytest.raises(ValueError):
+        parse_filters({"site": "nitkkr.ac.in"})
+    with pytest.raises(ValueError):
+        parse_filters({"content_type": "docx"})
+
+
+def test_bitmaps_match_whole_path_segments():
+    facets = FacetIndex()
+    facets.set_document("a", "https://nitkkr.ac.in/hostel/fees", "html", 0.0, [0, 1])
+    facets.set_document("b", "https://nitkkr.ac.in/hostels", "html", 0.0, [2])
+    facets.set_document("c", "https://nitkkr.ac.in/hostel/rules.pdf", "pdf", 0.0, [9])
+
+    def ids(filters):
+        return np.flatnonzero(np.unpackbits(facets.bitmap(parse_filters(filters), 10), bitorder="little")).tolist()
+
+    assert ids({"path_prefix": "/hostel"}) == [0, 1, 9]
+    assert ids({"path_prefix": "/hostel", "content_type": "pdf"}) == [9]
+    facets.remove_document("c")
+    assert ids({"path_prefix": "/hostel"}) == [0, 1]
+
+
+@pytest.mark.parametrize("mode", ["dense", "hybrid"])
+def test_filters_apply_inside_the_search(store_dir, mode):
+    write_page(store_dir / "extracted_text", "hostel_rules", "https://nitkkr.ac.in/hostel/rules.pdf", "Rules", "Hostel rules.")
+    store = _built_store(num_workers=1)
+
+    assert {page for _, page in _filtered(store, {"path_prefix": "/hostel"}, mode)} == {"hostel", "hostel_rules"}
+    assert [page for _, page in _filtered(store, {"content_type": "pdf"}, mode)] == ["hostel_rules"]
+    assert _filtered(store, {"host": "example.com"}, mode) == []
+    assert _filtered(store, {"crawled_after": "2999-01-01"}, mode) == []
+
+
+@pytest.mark.parametrize("mode", ["dense", "hybrid"])
+def test_filtered_results_survive_compaction(store_dir, mode):
+    store = _built_store(num_workers=1)
+    filters = {"path_prefix": "/hostel"}
+    before = [page for _, page in _filtered(store, filters, mode)]
+    assert before == ["hostel"]
+
+    store.update_document("extracted_text/exams.txt")
+    store.save_vector_store(compact=True)
+    assert sorted(cid for ids in store.manifest.values() for cid in ids) == list(range(len(store.metadata)))
+    hits = _filtered(store, filters, mode)
+    assert [page for _, page in hits] == before
+    assert all(store.metadata.document(cid)["url"].startswith("https://nitkkr.ac.in/hostel") for cid, _ in hits)
+
+
+def test_sharded_stores_filter_in_every_shard(store_dir, monkeypatch):
+    monkeypatch.setattr(Config, "NUM_SHARDS", 2)
+    store = _built_store(num_workers=1)
+    try:
+        assert [page for _, page in _filtered(store, {"path_prefix": "/library"}, "dense")] == ["library"]
+    finally:
+        store.index.close()
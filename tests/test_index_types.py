@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from config import Config
+from vector_embeddings import build_faiss_index, faiss
+
+DIMENSION = 32
+
+
+def _clustered_vectors(count: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(20, DIMENSION))
+    vectors = centers[rng.integers(0, len(centers), count)] + 0.3 * rng.normal(size=(count, DIMENSION))
+    return vectors.astype("float32")
+
+
+def _recall(index_type: str, k: int = 10) -> float:
+    vectors = _clustered_vectors(3000)
+    queries = _clustered_vectors(50, seed=1)
+    ids = np.arange(len(vectors), dtype=np.int64)
+
+    flat = build_faiss_index(DIMENSION, "flat")
+    flat.add_with_ids(vectors, ids)
+    index = build_faiss_index(DIMENSION, index_type, vectors)
+    index.add_with_ids(vectors, ids)
+
+    _, expected = flat.search(queries, k)
+    _, found = index.search(queries, k)
+    return float(np.mean([len(set(e) & set(f)) / k for e, f in zip(expected, found)]))
+
+
+@pytest.mark.parametrize("index_type, threshold", [("ivf", 0.9), ("hnsw", 0.9), ("ivfpq", 0.5)])
+def test_ann_recall_against_flat(index_type, threshold, monkeypatch):
+    # Small codebooks keep PQ training quick on a test-sized corpus.
+    monkeypatch.setattr(Config, "PQ_M", 8)
+    monkeypatch.setattr(Config, "PQ_NBITS", 5)
+    assert _recall(index_type) >= threshold
+
+
+def test_too_little_training_data_falls_back_to_flat():
+    index = build_faiss_index(DIMENSION, "ivf", _clustered_vectors(10))
+    assert isinstance(faiss.downcast_index(index.index), faiss.IndexFlat)
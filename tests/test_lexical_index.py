@@ -0,0 +1,64 @@
+import math
+
+from conftest import write_page
+from lexical_index import BM25Index, tokenize
+from test_vector_embeddings import _built_store, _pages
+from vector_embeddings import VectorEmbeddingSystem
+
+TEXTS = {
+    1: "syllabus for cs-101 introduction to programming",
+    2: "hostel fee and mess fee deadlines",
+    3: "fee refund rules",
+    5: "library timings",
+}
+
+
+def _index() -> BM25Index:
+    index = BM25Index()
+    for chunk_id, text in TEXTS.items():
+        index.add(chunk_id, text)
+    return index
+
+
+def test_compound_tokens_keep_their_parts():
+    assert tokenize("CS-101 and B.Tech") == ["cs-101", "cs", "101", "and", "b.tech", "b", "tech"]
+
+
+def test_bm25_scores_match_the_formula():
+    index = _index()
+    avg_length = sum(len(tokenize(text)) for text in TEXTS.values()) / len(TEXTS)
+
+    def expected(chunk_id: int, tf: int, df: int) -> float:
+        idf = math.log(1.0 + (len(TEXTS) - df + 0.5) / (df + 0.5))
+        norm = 1.2 * (1.0 - 0.75 + 0.75 * len(tokenize(TEXTS[chunk_id])) / avg_length)
+        return idf * tf * 2.2 / (tf + norm)
+
+    hits = dict(index.search("fee", 10))
+    assert set(hits) == {2, 3}
+    assert math.isclose(hits[2], expected(2, 2, 2)) and math.isclose(hits[3], expected(3, 1, 2))
+    assert index.search("cs-101", 1)[0][0] == 1
+
+
+def test_removed_chunks_survive_save_and_compaction(tmp_path):
+    index = _index()
+    index.remove([2])
+    index.add(7, "late fee fine")
+    index.save(tmp_path, compact_ratio=0.0)
+
+    loaded = BM25Index.load(tmp_path)
+    assert not loaded.deleted
+    assert sorted(chunk_id for chunk_id, _ in loaded.search("fee", 10)) == [3, 7]
+    assert loaded.search("fee", 10) == index.search("fee", 10)
+
+
+def test_hybrid_search_finds_exact_identifiers(store_dir):
+    write_page(store_dir / "extracted_text", "notice", "https://nitkkr.ac.in/notice", "Notice", "Circular NITKKR/2023/45 on attendance.")
+    store = _built_store(num_workers=1)
+
+    hits = store.search("nitkkr/2023/45", 2, mode="hybrid")
+    assert _pages(hits)[0] == "notice"
+    assert "bm25_score" in hits[0] and 0.0 < hits[0]["similarity_score"] <= 1.0
+
+    reloaded = VectorEmbeddingSystem(num_workers=1)
+    assert reloaded.load_vector_store()
+    assert [hit["id"] for hit in reloaded.search("nitkkr/2023/45", 2, mode="hybrid")] == [hit["id"] for hit in hits]
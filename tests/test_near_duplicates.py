@@ -0,0 +1,64 @@
+from conftest import write_page
+from near_duplicates import DuplicateIndex, simhash
+from test_vector_embeddings import _built_store, _pages
+from vector_embeddings import VectorEmbeddingSystem
+
+NOTICE = (
+    "All students are informed that the institute library will remain closed on account of annual "
+    "stock verification from Monday to Friday next week and books may be returned after that"
+)
+FIRST_URL = "https://nitkkr.ac.in/notices/library-a"
+SECOND_URL = "https://nitkkr.ac.in/notices/library-b"
+
+
+def _distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def _write_notices(directory) -> None:
+    write_page(directory, "notice_a", FIRST_URL, "Library Notice", NOTICE)
+    write_page(directory, "notice_b", SECOND_URL, "Library Notice", NOTICE.upper().replace(" ", "  "))
+
+
+def test_simhash_ignores_case_and_spacing_but_not_content():
+    assert simhash("too short to fingerprint") is None
+    assert simhash(NOTICE) == simhash(NOTICE.upper().replace(" ", "\n"))
+    assert _distance(simhash(NOTICE), simhash("CSE department faculty and laboratories " * 3)) > 3
+
+
+def test_duplicate_index_finds_within_max_distance():
+    index = DuplicateIndex(max_distance=3)
+    fingerprint = simhash(NOTICE)
+    index.add(7, fingerprint)
+    assert index.find(fingerprint ^ 0b101) == 7
+    assert index.find(fingerprint ^ 0b1111) is None
+
+
+def test_repeated_chunks_share_one_vector_and_list_every_source(store_dir):
+    _write_notices(store_dir / "extracted_text")
+    store = _built_store(num_workers=1)
+
+    assert len(store.metadata) == 5
+    assert store.get_stats()["duplicate_chunks"] == 1
+    hit = store.search("annual stock verification notice", 1)[0]
+    assert hit["url"] == FIRST_URL
+    assert hit["source_urls"] == [FIRST_URL, SECOND_URL]
+
+    reloaded = VectorEmbeddingSystem()
+    assert reloaded.load_vector_store()
+    assert reloaded.search("annual stock verification notice", 1)[0]["source_urls"] == [FIRST_URL, SECOND_URL]
+
+
+def test_removing_the_owner_hands_the_chunk_to_a_repeating_page(store_dir):
+    _write_notices(store_dir / "extracted_text")
+    store = _built_store(num_workers=1)
+
+    (store_dir / "extracted_text" / "notice_a.txt").unlink()
+    store.sync_directory("extracted_text")
+    hit = store.search("annual stock verification notice", 1)[0]
+    assert _pages([hit]) == ["notice_b"]
+    assert hit["source_urls"] == [SECOND_URL]
+
+    store.save_vector_store(compact=True)
+    assert store.search("annual stock verification notice", 1)[0]["source_urls"] == [SECOND_URL]
+    assert store.get_stats()["duplicate_chunks"] == 0
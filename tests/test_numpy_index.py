@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+import vector_embeddings
+from config import Config
+from numpy_index import METRIC_INNER_PRODUCT, METRIC_L2, NumpyFlatIndex
+from test_vector_embeddings import _built_store, _pages
+
+
+def _brute_force(vectors, ids, queries, k, metric_type):
+    if metric_type == METRIC_INNER_PRODUCT:
+        scores = queries @ vectors.T
+        order = np.argsort(-scores, axis=1)[:, :k]
+    else:
+        scores = ((queries[:, None, :] - vectors[None, :, :]) ** 2).sum(axis=2)
+        order = np.argsort(scores, axis=1)[:, :k]
+    return np.take_along_axis(scores, order, axis=1), ids[order]
+
+
+@pytest.mark.parametrize("metric_type", [METRIC_L2, METRIC_INNER_PRODUCT])
+def test_blocked_search_matches_brute_force(metric_type):
+    rng = np.random.default_rng(0)
+    base = rng.normal(size=(500, 16)).astype("float32")
+    tail = rng.normal(size=(40, 16)).astype("float32")
+    queries = rng.normal(size=(7, 16)).astype("float32")
+    base_ids = np.arange(0, 1000, 2, dtype=np.int64)
+    tail_ids = np.arange(1001, 1081, 2, dtype=np.int64)
+
+    index = NumpyFlatIndex(16, metric_type, base, base_ids, block_rows=64)
+    index.add_with_ids(tail, tail_ids)
+    removed = np.concatenate([base_ids[:100:3], tail_ids[:5]])
+    assert index.remove_ids(removed) == len(removed)
+    assert index.ntotal == 540 - len(removed)
+
+    keep = ~np.isin(np.concatenate([base_ids, tail_ids]), removed)
+    vectors = np.vstack([base, tail])[keep]
+    ids = np.concatenate([base_ids, tail_ids])[keep]
+    expected_scores, expected_ids = _brute_force(vectors, ids, queries, 10, metric_type)
+
+    scores, found = index.search(queries, 10)
+    np.testing.assert_array_equal(found, expected_ids)
+    np.testing.assert_allclose(scores, expected_scores, rtol=1e-4, atol=1e-3)
+
+
+def test_missing_slots_are_minus_one():
+    index = NumpyFlatIndex(4, METRIC_L2, np.eye(4, dtype="float32"), np.arange(4))
+    _, found = index.search(np.ones((1, 4), dtype="float32"), 6)
+    assert list(found[0, 4:]) == [-1, -1]
+
+
+def test_numpy_engine_agrees_with_faiss(store_dir, monkeypatch):
+    expected = [hit["id"] for hit in _built_store(num_workers=1).search("hostel mess charges", 3)]
+
+    monkeypatch.setattr(Config, "SEARCH_ENGINE", "numpy")
+    store = vector_embeddings.VectorEmbeddingSystem(num_workers=1)
+    assert store.load_vector_store()
+    assert isinstance(store.index, NumpyFlatIndex)
+    assert [hit["id"] for hit in store.search("hostel mess charges", 3)] == expected
+
+
+def test_hashing_fallback_without_sentence_transformers(store_dir, monkeypatch):
+    monkeypatch.setattr(vector_embeddings, "SENTENCE_TRANSFORMERS_AVAILABLE", False)
+    store = _built_store(num_workers=1)
+
+    assert store.model is None and store.encoder_name == "hashing"
+    assert _pages(store.search("central library timings", 1)) == ["library"]
@@ -0,0 +1,80 @@
+import re
+
+import numpy as np
+import pytest
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("tokenizers")
+pytest.importorskip("sentence_transformers")
+torch = pytest.importorskip("torch")
+
+import vector_embeddings  # noqa: E402
+from config import Config  # noqa: E402
+from conftest import FakeSentenceTransformer  # noqa: E402
+from onnx_encoder import PARITY_SENTENCES, OnnxSentenceEncoder, check_parity, export_sentence_transformer  # noqa: E402
+
+QUERIES = ["hostel fee deadline", "examination date sheet", "placement cell internship"]
+
+
+@pytest.fixture(scope="module")
+def exported(tmp_path_factory):
+    """A small random BERT sentence encoder and its ONNX export, built locally so no download is needed."""
+    from sentence_transformers import SentenceTransformer, models
+    from transformers import BertConfig, BertModel, BertTokenizerFast
+
+    root = tmp_path_factory.mktemp("tiny_encoder")
+    words = sorted({word for text in PARITY_SENTENCES + QUERIES for word in re.findall(r"\w+", text.lower())})
+    (root / "vocab.txt").write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + words), encoding="utf-8")
+    tokenizer = BertTokenizerFast(str(root / "vocab.txt"))
+    torch.manual_seed(0)
+    config = BertConfig(vocab_size=len(tokenizer), hidden_size=64, num_hidden_layers=2, num_attention_heads=2, intermediate_size=128)
+    BertModel(config).save_pretrained(root / "bert")
+    tokenizer.save_pretrained(root / "bert")
+
+    model = SentenceTransformer(
+        modules=[models.Transformer(str(root / "bert"), max_seq_length=64), models.Pooling(64, "mean"), models.Normalize()]
+    )
+    export_sentence_transformer(model, root / "onnx" / "tiny")
+    return model, root / "onnx"
+
+
+def _ranking(encoder, queries, documents) -> list:
+    query_vectors = np.asarray(encoder.encode(queries), dtype="float32")
+    document_vectors = np.asarray(encoder.encode(documents), dtype="float32")
+    return np.argsort(-(query_vectors @ document_vectors.T), axis=1, kind="stable")[:, :3].tolist()
+
+
+# Dynamic int8 quantizes activations per batch, so its vectors shift slightly with the batch they are in.
+@pytest.mark.parametrize("backend, min_cosine, batch_atol", [("onnx", 0.9999, 1e-5), ("onnx-int8", 0.99, 1e-3)])
+def test_onnx_embeddings_match_pytorch(exported, backend, min_cosine, batch_atol):
+    model, directory = exported
+    encoder = OnnxSentenceEncoder(directory / "tiny", backend)
+
+    parity = check_parity(model, encoder, PARITY_SENTENCES + QUERIES)
+    assert parity["min_cosine"] >= min_cosine
+    assert encoder.encode(QUERIES[0]).shape == (64,)
+    batched = encoder.encode(PARITY_SENTENCES, batch_size=2)
+    np.testing.assert_allclose(batched, encoder.encode(PARITY_SENTENCES), atol=batch_atol)
+
+
+def test_onnx_encoder_ranks_documents_like_pytorch(exported):
+    model, directory = exported
+    encoder = OnnxSentenceEncoder(directory / "tiny", "onnx")
+    assert _ranking(encoder, QUERIES, PARITY_SENTENCES) == _ranking(model, QUERIES, PARITY_SENTENCES)
+
+
+def test_store_uses_the_export_and_falls_back_without_it(exported, tmp_path, monkeypatch):
+    _, directory = exported
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(Config, "EMBEDDING_BACKEND", "onnx-int8")
+    monkeypatch.setattr(Config, "ONNX_MODEL_DIR", str(directory))
+    monkeypatch.setattr(vector_embeddings, "SentenceTransformer", FakeSentenceTransformer)
+
+    store = vector_embeddings.VectorEmbeddingSystem(model_name="tiny")
+    assert store.backend == "onnx-int8"
+    assert isinstance(store.model, OnnxSentenceEncoder)
+    assert store.dimension == 64
+
+    missing = vector_embeddings.VectorEmbeddingSystem(model_name="not-exported")
+    assert missing.backend == "torch"
+    assert isinstance(missing.model, FakeSentenceTransformer)
@@ -0,0 +1,71 @@
+import re
+
+import numpy as np
+import pytest
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("tokenizers")
+pytest.importorskip("sentence_transformers")
+torch = pytest.importorskip("torch")
+
+import reranker  # noqa: E402
+from config import Config  # noqa: E402
+from onnx_encoder import PARITY_SENTENCES  # noqa: E402
+from reranker import OnnxCrossEncoder, export_cross_encoder, load_cross_encoder, ranking_overlap  # noqa: E402
+
+QUERIES = ["hostel fee deadline", "examination date sheet", "placement cell internship"]
+
+
+@pytest.fixture(scope="module")
+def exported(tmp_path_factory):
+    """A small random BERT cross-encoder and its ONNX export, built locally so no download is needed."""
+    from sentence_transformers import CrossEncoder
+    from transformers import BertConfig, BertForSequenceClassification, BertTokenizerFast
+
+    root = tmp_path_factory.mktemp("tiny_reranker")
+    words = sorted({word for text in PARITY_SENTENCES + QUERIES for word in re.findall(r"\w+", text.lower())})
+    (root / "vocab.txt").write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + words), encoding="utf-8")
+    tokenizer = BertTokenizerFast(str(root / "vocab.txt"))
+    torch.manual_seed(0)
+    config = BertConfig(
+        vocab_size=len(tokenizer), hidden_size=64, num_hidden_layers=2, num_attention_heads=2, intermediate_size=128, num_labels=1
+    )
+    BertForSequenceClassification(config).save_pretrained(root / "bert")
+    tokenizer.save_pretrained(root / "bert")
+
+    model = CrossEncoder(str(root / "bert"), max_length=64)
+    export_cross_encoder(model, root / "onnx" / "tiny")
+    return model, root / "onnx"
+
+
+def _pairs():
+    return [(query, passage) for query in QUERIES for passage in PARITY_SENTENCES]
+
+
+def test_onnx_scores_match_pytorch(exported):
+    model, directory = exported
+    expected = np.asarray(model.predict(_pairs(), show_progress_bar=False), dtype="float32")
+
+    onnx = OnnxCrossEncoder(directory / "tiny", "onnx")
+    np.testing.assert_allclose(onnx.predict(_pairs()), expected, atol=1e-4)
+    np.testing.assert_allclose(onnx.predict(_pairs(), batch_size=2), expected, atol=1e-4)
+
+
+@pytest.mark.parametrize("backend, min_overlap", [("onnx", 1.0), ("onnx-int8", 2 / 3)])
+def test_onnx_cross_encoder_ranks_passages_like_pytorch(exported, backend, min_overlap):
+    model, directory = exported
+    passages = [list(PARITY_SENTENCES)] * len(QUERIES)
+    parity = ranking_overlap(model, OnnxCrossEncoder(directory / "tiny", backend), QUERIES, passages, k=3)
+    assert parity["mean_overlap"] >= min_overlap
+
+
+def test_load_cross_encoder_uses_the_export_and_falls_back_without_it(exported, monkeypatch):
+    _, directory = exported
+    monkeypatch.setattr(Config, "ONNX_MODEL_DIR", str(directory))
+    loaded = load_cross_encoder("tiny", "onnx-int8")
+    assert isinstance(loaded, OnnxCrossEncoder)
+    assert loaded.backend == "onnx-int8"
+
+    fallback = object()
+    monkeypatch.setattr(reranker, "CrossEncoder", lambda model_name: fallback)
+    assert load_cross_encoder("not-exported", "onnx") is fallback
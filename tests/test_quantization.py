@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from benchmarks import benchmark_quantization
+from config import Config
+from test_index_types import _clustered_vectors
+from test_vector_embeddings import _built_store, _pages
+
+# Fixed corpus: 3000 clustered vectors, 50 held-out queries, recall@10 against exact cosine search.
+K = 10
+
+
+@pytest.fixture(scope="module")
+def flat_rows():
+    return {row["storage"]: row for row in benchmark_quantization(_clustered_vectors(3000), k=K, num_queries=50)}
+
+
+@pytest.mark.parametrize("storage, recall, rescored", [("float16", 0.99, 0.99), ("int8", 0.9, 0.98)])
+def test_scalar_quantization_recall(flat_rows, storage, recall, rescored):
+    row = flat_rows[storage]
+    assert row[f"recall@{K}"] >= recall
+    assert row[f"rescored@{K}"] >= rescored
+    assert row["index_mb"] < flat_rows["float32"]["index_mb"]
+
+
+def test_product_quantization_recall(monkeypatch):
+    monkeypatch.setattr(Config, "PQ_M", 8)
+    monkeypatch.setattr(Config, "PQ_NBITS", 5)
+    rows = benchmark_quantization(_clustered_vectors(3000), k=K, num_queries=50, rescore_factor=8, index_type="ivfpq")
+
+    # PQ8x5 codes are coarse; exact re-scoring of 8k candidates is what recovers the neighbours.
+    for row in rows:
+        assert row[f"recall@{K}"] >= 0.2
+        assert row[f"rescored@{K}"] >= 0.85
+
+
+def test_int8_store_rescores_against_the_segment(store_dir, monkeypatch):
+    monkeypatch.setattr(Config, "EXACT_RESCORE_FACTOR", 4)
+    store = _built_store(num_workers=1, metric="cosine", storage="int8")
+    query = "hostel fee payment deadlines"
+    hits = store.search(query, 2)
+
+    assert _pages(hits)[0] == "hostel"
+    expected = float(store.model.encode(query) @ store.model.encode(hits[0]["chunk_text"]))
+    assert hits[0]["similarity_score"] == pytest.approx(expected, abs=1e-5)
@@ -0,0 +1,68 @@
+import numpy as np
+
+import query_cache
+from query_cache import QueryEmbeddingCache, normalize_query
+from test_vector_embeddings import _built_store
+from vector_embeddings import VectorEmbeddingSystem
+
+
+def _vectors(count: int) -> np.ndarray:
+    return np.arange(count * 4, dtype="float32").reshape(count, 4)
+
+
+def test_normalize_query_collapses_case_and_whitespace():
+    assert normalize_query("  Hostel   FEE\tdeadline ") == "hostel fee deadline"
+
+
+def test_lru_evicts_least_recently_used_and_expires_old_entries(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(query_cache.time, "monotonic", lambda: now[0])
+    cache = QueryEmbeddingCache(max_entries=2, ttl_seconds=10)
+
+    cache.put_many(["a", "b"], _vectors(2))
+    assert list(cache.get_many(["a"])) == [0]
+    cache.put_many(["c"], _vectors(1))
+    assert sorted(cache.get_many(["a", "b", "c"])) == [0, 2]
+
+    now[0] += 11
+    assert cache.get_many(["a", "c"]) == {}
+    assert cache.expired == 2
+    assert cache.get_stats()["query_cache_hits"] == 3
+
+
+def test_history_is_flushed_and_ranked_across_restarts(tmp_path):
+    path = str(tmp_path / "query_history.json")
+    cache = QueryEmbeddingCache(history_path=path, history_max_entries=2, history_flush_every=3)
+    cache.record_queries(["exam", "hostel", "exam"])
+    cache.record_queries(["library"])
+
+    reloaded = QueryEmbeddingCache(history_path=path)
+    assert reloaded.frequent(5) == ["exam", "hostel"]
+
+
+def test_repeated_queries_skip_the_model(store_dir):
+    store = _built_store(num_workers=1)
+    store.model.calls.clear()
+
+    first = store.search("Hostel fee", 2)
+    second = store.search("  hostel   FEE ", 2)
+    assert [(hit["id"], hit["similarity_score"]) for hit in first] == [(hit["id"], hit["similarity_score"]) for hit in second]
+    assert len(store.model.calls) == 1
+    assert store.get_stats()["query_cache_hits"] == 1
+
+
+def test_frequent_queries_are_pre_encoded_on_startup(store_dir):
+    store = _built_store(num_workers=1)
+    for _ in range(3):
+        store.search("library timings", 1)
+    store.search("exam schedule", 1)
+    store.query_cache.save_history()
+
+    restarted = VectorEmbeddingSystem()
+    assert restarted.load_vector_store()
+    assert restarted.warm_query_cache(limit=1) == 1
+    restarted.model.calls.clear()
+    restarted.search("Library timings", 1)
+    assert restarted.model.calls == []
+    restarted.search("exam schedule", 1)
+    assert len(restarted.model.calls) == 1
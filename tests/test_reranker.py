@@ -0,0 +1,83 @@
+import re
+
+import numpy as np
+
+from reranker import Reranker
+from test_answer_cache import _rag
+from test_vector_embeddings import _built_store
+
+
+class FakeCrossEncoder:
+    """Scores a pair by the number of query words the passage repeats."""
+
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, pairs, batch_size: int = 32, **kwargs):
+        self.calls.append((len(pairs), batch_size))
+        return np.array(
+            [len(set(re.findall(r"\w+", query.lower())) & set(re.findall(r"\w+", text.lower()))) for query, text in pairs],
+            dtype="float32",
+        )
+
+
+def _candidates(*texts_and_scores):
+    return [
+        {"id": cid, "chunk_text": text, "similarity_score": score}
+        for cid, (text, score) in enumerate(texts_and_scores)
+    ]
+
+
+def test_only_the_best_dense_candidates_are_scored_in_batches():
+    model = FakeCrossEncoder()
+    reranker = Reranker(model, max_candidates=3, batch_size=2)
+    results = _candidates(("exam schedule", 0.9), ("hostel fee", 0.8), ("hostel fee deadline", 0.7), ("hostel fee deadline dates", 0.6))
+
+    ranked = reranker.rerank("hostel fee deadline dates", results, k=2)
+    assert model.calls == [(3, 2)]
+    assert [result["id"] for result in ranked] == [2, 1]
+    assert ranked[0]["rerank_score"] == 3.0
+
+
+def test_scores_are_cached_per_query_and_chunk_text():
+    model = FakeCrossEncoder()
+    reranker = Reranker(model, cache_size=3)
+
+    reranker.rerank("Hostel fee", _candidates(("hostel fee", 0.9), ("library", 0.8)), k=1)
+    reranker.rerank("hostel   FEE", _candidates(("hostel fee", 0.9), ("library", 0.8)), k=1)
+    assert model.calls == [(2, 32)]
+
+    # A chunk id now holding different text is scored again.
+    ranked = reranker.rerank("hostel fee", _candidates(("library", 0.9), ("hostel fee", 0.8)), k=1)
+    assert model.calls[-1] == (2, 32)
+    assert ranked[0]["chunk_text"] == "hostel fee"
+    assert len(reranker._scores) == 2
+
+    stats = reranker.get_stats()
+    assert stats["rerank_pairs_scored"] == 4 and stats["rerank_pairs_cached"] == 2
+
+    reranker.rerank("library", _candidates(("library", 0.9), ("hostel fee", 0.8)), k=1)
+    assert len(reranker._scores) == 3
+
+
+def test_reranking_is_skipped_when_the_dense_top_k_is_decisive():
+    model = FakeCrossEncoder()
+    reranker = Reranker(model, early_exit_margin=0.2)
+
+    assert reranker.rerank("hostel", _candidates(("exam", 0.9), ("hostel", 0.5)), k=1) is None
+    assert model.calls == []
+    assert reranker.rerank("hostel", _candidates(("exam", 0.9), ("hostel", 0.8)), k=1)[0]["chunk_text"] == "hostel"
+    assert reranker.get_stats()["rerank_early_exits"] == 1
+
+
+def test_rag_system_returns_reranked_results(store_dir, monkeypatch):
+    _built_store()
+    rag = _rag(monkeypatch)
+    model = FakeCrossEncoder()
+    rag.reranker = Reranker(model, max_candidates=3)
+
+    results = rag.retrieve_relevant_documents("library book issue rules", k=2)
+    assert model.calls == [(3, 32)]
+    assert results[0]["url"] == "https://nitkkr.ac.in/library"
+    assert results[0]["similarity_score"] == results[0]["rerank_score"] == 4.0
+    assert rag.get_system_stats()["rerank_requests"] == 1
@@ -0,0 +1,61 @@
+import json
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+from config import Config
+from segment_store import Segment, SegmentWriter
+from test_vector_embeddings import _built_store, _pages
+from vector_embeddings import VectorEmbeddingSystem
+
+
+def test_segment_roundtrip(tmp_path):
+    vectors = np.arange(12, dtype="float32").reshape(3, 4)
+    writer = SegmentWriter(tmp_path / "segment", dimension=4, num_chunks=3)
+    for chunk_id, vector in zip((2, 5, 9), vectors):
+        document = {"url": f"https://example.org/{chunk_id}", "title": "T", "source_file": f"doc{chunk_id % 2}.txt"}
+        writer.add(chunk_id, document, vector, text=f"chunk {chunk_id}")
+    writer.close()
+
+    segment = Segment(tmp_path / "segment")
+    assert segment.row_of(5) == 1 and segment.row_of(6) == -1
+    assert segment.metadata(2)["chunk_text"] == "chunk 9"
+    np.testing.assert_array_equal(segment.embeddings, vectors)
+    segment.close()
+
+
+def test_reload_reads_chunks_from_the_segment(store_dir):
+    built = _built_store(num_workers=1)
+    expected = built.search("hostel fee payment", 2)
+
+    store = VectorEmbeddingSystem(num_workers=1)
+    assert store.load_vector_store()
+    assert store.metadata.segment is not None
+    assert store.search("hostel fee payment", 2) == expected
+
+
+def test_convert_legacy_store(store_dir, monkeypatch):
+    monkeypatch.setattr(Config, "VECTOR_STORE_PATH", "custom_store")
+    built = _built_store(num_workers=1)
+    expected = _pages(built.search("library timings", 2))
+
+    # Recreate the pre-segment layout: flat files plus metadata.json directly under the store root.
+    root = Path("custom_store")
+    snapshot = built.snapshots.current_dir()
+    for name in ("nitkkr_index.faiss", "manifest.json", "model_info.json"):
+        shutil.copy(snapshot / name, root / name)
+    legacy = {chunk_id: dict(built.metadata[chunk_id]) for chunk_id in built.metadata}
+    (root / "metadata.json").write_text(json.dumps(legacy), encoding="utf-8")
+    built._release_segment()
+    shutil.rmtree(root / "snapshots")
+    for path in [root / "CURRENT", *root.glob("wal-*.log")]:
+        path.unlink()
+
+    store = VectorEmbeddingSystem(num_workers=1)
+    assert store.convert_legacy_store()
+
+    assert (root / "metadata.json.bak").exists() and not (root / "metadata.json").exists()
+    reloaded = VectorEmbeddingSystem(num_workers=1)
+    assert reloaded.load_vector_store() and reloaded.metadata.segment is not None
+    assert _pages(reloaded.search("library timings", 2)) == expected
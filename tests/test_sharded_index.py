@@ -0,0 +1,110 @@
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from config import Config
+from sharded_index import ShardedIndex
+from test_vector_embeddings import _built_store, _pages
+
+DIMENSION = 16
+NUM_SHARDS = 3
+
+
+def _index(tmp_path):
+    options = {
+        "dimension": DIMENSION,
+        "index_type": "flat",
+        "metric": "cosine",
+        "storage": "float32",
+        "use_faiss": False,
+        "shard_key": "document",
+        "block_rows": 1024,
+    }
+    return ShardedIndex(NUM_SHARDS, tmp_path, options, lambda chunk_id: chunk_id % NUM_SHARDS)
+
+
+def test_concurrent_searches_match_serial_results(tmp_path):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((300, DIMENSION)).astype("float32")
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = vectors[rng.choice(len(vectors), 64, replace=False)]
+
+    index = _index(tmp_path)
+    try:
+        index.add_with_ids(vectors, np.arange(len(vectors), dtype=np.int64))
+        excluded = np.arange(0, 300, 7, dtype=np.int64)
+        expected = [index.search(query[None], 5, excluded=excluded)[1] for query in queries]
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            futures = [pool.submit(index.search, query[None], 5, excluded) for query in queries]
+            found = [future.result(timeout=60)[1] for future in futures]
+
+        for want, got in zip(expected, found):
+            np.testing.assert_array_equal(want, got)
+        assert not np.isin(np.concatenate(found), excluded).any()
+        assert all(shard["queries"] == 2 * len(queries) for shard in index.get_stats())
+    finally:
+        index.close()
+
+
+def test_shard_workers_do_not_load_the_encoder():
+    code = "import sys, sharded_index; print(sorted({'vector_embeddings', 'sentence_transformers', 'torch'} & set(sys.modules)))"
+    root = Path(__file__).resolve().parent.parent
+    output = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "[]"
+
+
+def test_sharded_store_matches_single_index(store_dir, monkeypatch):
+    single = _built_store(num_workers=1)
+    queries = ("hostel fee", "library", "exam")
+    expected = {query: [(hit["id"], round(hit["similarity_score"], 5)) for hit in single.search(query, 4)] for query in queries}
+
+    monkeypatch.setattr(Config, "NUM_SHARDS", 2)
+    store = _built_store(num_workers=1)
+    try:
+        found = {query: [(hit["id"], round(hit["similarity_score"], 5)) for hit in store.search(query, 4)] for query in queries}
+        # Chunks with equal scores may come back in either order; compare them as sets.
+        assert {query: sorted(hits, key=lambda hit: (-hit[1], hit[0])) for query, hits in found.items()} == {
+            query: sorted(hits, key=lambda hit: (-hit[1], hit[0])) for query, hits in expected.items()
+        }
+        assert sum(shard["vectors"] for shard in store.get_stats()["shards"]) == len(single.metadata)
+    finally:
+        store.index.close()
+
+
+def test_searches_survive_shard_restarts(store_dir, monkeypatch):
+    monkeypatch.setattr(Config, "NUM_SHARDS", 2)
+    store = _built_store(num_workers=1)
+    queries = {"hostel fee payment": ("hostel", "Hostel fee"), "library book issue": ("library", "library")}
+    errors, found = [], []
+    done = threading.Event()
+
+    def search():
+        while not done.is_set():
+            try:
+                for query, (page, text) in queries.items():
+                    hits = store.search(query, 1)
+                    found.append(_pages(hits) == [page] and text in hits[0]["chunk_text"])
+            except Exception as exc:  # noqa: BLE001 - surfaced through the errors list
+                errors.append(exc)
+                return
+
+    threads = [threading.Thread(target=search) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    try:
+        for compact in (False, True, False):
+            store.update_document("extracted_text/cse.txt")
+            store.save_vector_store(compact=compact)
+    finally:
+        done.set()
+        for thread in threads:
+            thread.join()
+        store.index.close()
+
+    assert not errors
+    assert found and all(found)
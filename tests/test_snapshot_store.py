@@ -0,0 +1,116 @@
+import os
+import threading
+
+import pytest
+
+from config import Config
+from conftest import write_page
+from snapshot_store import UpdateLog
+from test_vector_embeddings import _built_store, _pages
+from vector_embeddings import VectorEmbeddingSystem
+
+
+def _loaded_store() -> VectorEmbeddingSystem:
+    store = VectorEmbeddingSystem(num_workers=1)
+    assert store.load_vector_store()
+    return store
+
+
+def test_publish_moves_current_and_prunes_old_snapshots(store_dir):
+    store = _built_store(num_workers=1)
+    store.save_vector_store()
+    store.save_vector_store()
+
+    snapshots = store_dir / "vector_store" / "snapshots"
+    assert (store_dir / "vector_store" / "CURRENT").read_text() == "000003"
+    assert sorted(path.name for path in snapshots.iterdir()) == ["000002", "000003"]
+    assert not (store_dir / "vector_store" / "segment").exists()
+
+
+def test_logged_updates_are_replayed_on_load(store_dir):
+    store = _built_store(num_workers=1)
+    write_page(store_dir / "extracted_text", "hostel", "https://nitkkr.ac.in/hostel/fees", "Hostel Fees", "Hostel gymnasium timings.")
+    assert store.update_document("extracted_text/hostel.txt")
+    assert store.snapshot_version == 1 and store.update_log.records == 1
+
+    reloaded = _loaded_store()
+    assert reloaded.manifest == store.manifest and reloaded.next_chunk_id == store.next_chunk_id
+    assert _pages(reloaded.search("gymnasium timings", 1)) == ["hostel"]
+    assert reloaded.search("gymnasium timings", 1)[0]["chunk_text"] == "Hostel gymnasium timings."
+
+
+def test_torn_log_tail_is_ignored_and_truncated(tmp_path):
+    log = UpdateLog(tmp_path / "wal.log")
+    log.append({"n": 1})
+    with open(tmp_path / "wal.log", "ab") as log_file:
+        log_file.write(b"123 {\"n\": 2")
+
+    reopened = UpdateLog(tmp_path / "wal.log")
+    assert reopened.read() == [{"n": 1}]
+    reopened.append({"n": 3})
+    assert UpdateLog(tmp_path / "wal.log").read() == [{"n": 1}, {"n": 3}]
+
+
+def test_large_logs_are_compacted_in_the_background(store_dir, monkeypatch):
+    monkeypatch.setattr(Config, "WAL_COMPACT_RECORDS", 2)
+    store = _built_store(num_workers=1)
+    store.update_document("extracted_text/exams.txt")
+    store.update_document("extracted_text/cse.txt")
+    store.wait_for_compaction()
+
+    assert store.snapshot_version == 2 and store.update_log.records == 0
+    assert _pages(_loaded_store().search("faculty laboratories", 1)) == ["cse"]
+
+
+def _open_files() -> int:
+    return len(os.listdir("/proc/self/fd"))
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="needs /proc to count open files")
+def test_repeated_saves_release_old_segments(store_dir):
+    store = _built_store(num_workers=1)
+    store.save_vector_store()
+    baseline = _open_files()
+
+    # Whatever still references a replaced chunk store must not keep its files open.
+    replaced = []
+    for _ in range(4):
+        replaced.append(store.metadata)
+        store.save_vector_store()
+    replaced.append(store.metadata)
+    store.update_document("extracted_text/hostel.txt")
+    store.save_vector_store()
+
+    assert _open_files() <= baseline
+    assert all(chunk_store.segment.embeddings is None for chunk_store in replaced)
+    assert len(store.search("hostel fee", 2)) == 2
+
+
+def test_search_results_stay_readable_across_updates_and_saves_on_another_thread(store_dir):
+    store = _built_store(num_workers=1)
+    expected = {query: _pages(store.search(query, 1)) for query in ("hostel fee", "library timings", "exam schedule")}
+    errors, stop = [], threading.Event()
+
+    def searcher():
+        while not stop.is_set():
+            try:
+                for query, pages in expected.items():
+                    hits = store.search(query, 1)
+                    assert _pages(hits) == pages and hits[0]["chunk_text"]
+            except Exception as exc:  # noqa: BLE001 - surfaced through the errors list
+                errors.append(exc)
+                return
+
+    threads = [threading.Thread(target=searcher) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    hits = store.search("hostel fee", 2)
+    for _ in range(5):
+        store.update_document("extracted_text/cse.txt")
+        store.save_vector_store()
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert hits[0]["chunk_text"] and dict(hits[0])["url"].startswith("https://nitkkr.ac.in/")
@@ -0,0 +1,84 @@
+import threading
+
+import numpy as np
+import pytest
+
+from config import Config
+from conftest import write_page
+from test_vector_embeddings import _pages
+from vector_embeddings import VectorEmbeddingSystem
+
+
+def _contents(store: VectorEmbeddingSystem) -> dict:
+    return {
+        chunk_id: (store.metadata.document(chunk_id)["source_file"], store.metadata.text(chunk_id))
+        for chunk_id in store.metadata
+    }
+
+
+def _long_page(directory, name: str, words: int) -> None:
+    text = " ".join(f"{name}{i % 17}" for i in range(words))
+    write_page(directory, name, f"https://nitkkr.ac.in/{name}", name.title(), text)
+
+
+def test_streamed_build_matches_a_list_build(store_dir, monkeypatch):
+    _long_page(store_dir / "extracted_text", "notices", 1200)
+    monkeypatch.setattr(Config, "EMBEDDING_STREAM_BATCH", 2)
+
+    listed = VectorEmbeddingSystem(num_workers=1)
+    listed.generate_embeddings(listed.load_scraped_data())
+    streamed = VectorEmbeddingSystem(num_workers=1)
+    streamed.generate_embeddings()
+
+    assert streamed.manifest == listed.manifest
+    assert streamed.file_state == listed.file_state
+    assert _contents(streamed) == _contents(listed)
+    np.testing.assert_allclose(streamed.metadata.segment.embeddings, listed.metadata.segment.embeddings, atol=1e-6)
+    assert streamed.lexical_index.postings == listed.lexical_index.postings
+    assert max(count for count, _ in listed.model.calls) <= 2
+
+    streamed.save_vector_store()
+    assert _pages(streamed.search("hostel fee payment", 1)) == ["hostel"]
+    assert not (store_dir / Config.VECTOR_STORE_PATH / "generate.tmp").exists()
+
+
+def test_files_changing_between_passes_abort_the_build(store_dir):
+    store = VectorEmbeddingSystem(num_workers=1)
+    passes = []
+
+    def documents():
+        passes.append(1)
+        docs = store.load_scraped_data()
+        if len(passes) > 1:
+            docs[0]["text"] += " " + "extra " * 600
+        return docs
+
+    with pytest.raises(RuntimeError, match="changed while embedding"):
+        store._stream_to_segment(documents, store_dir / "scratch")
+
+
+def test_searches_use_the_previous_store_while_rebuilding(store_dir):
+    store = VectorEmbeddingSystem(num_workers=1)
+    store.generate_embeddings()
+    store.save_vector_store()
+    errors, found, stop = [], [], threading.Event()
+
+    def searcher():
+        while not stop.is_set():
+            try:
+                found.append(_pages(store.search("library book issue", 1)))
+            except Exception as exc:  # noqa: BLE001 - surfaced through the errors list
+                errors.append(exc)
+                return
+
+    thread = threading.Thread(target=searcher)
+    thread.start()
+    try:
+        for _ in range(5):
+            store.generate_embeddings()
+    finally:
+        stop.set()
+        thread.join()
+
+    assert not errors
+    assert found and all(pages == ["library"] for pages in found)
@@ -0,0 +1,76 @@
+import numpy as np
+
+from benchmarks import benchmark_two_stage, held_out_mask, split_queries
+from config import Config
+from document_index import DocumentIndex
+from test_vector_embeddings import _built_store
+from vector_embeddings import VectorEmbeddingSystem
+
+DIMENSION = 32
+
+
+def _documents(num_documents: int = 100, chunks: int = 30, seed: int = 0):
+    """Chunks of each document scatter around the document's own topic vector."""
+    rng = np.random.default_rng(seed)
+    topics = rng.normal(size=(num_documents, DIMENSION))
+    doc_refs = np.repeat(np.arange(num_documents), chunks)
+    vectors = topics[doc_refs] + 0.5 * rng.normal(size=(len(doc_refs), DIMENSION))
+    return vectors.astype("float32"), doc_refs
+
+
+def test_held_out_queries_are_disjoint_from_the_database():
+    vectors, _ = _documents(10, 10)
+    mask = held_out_mask(len(vectors), 5)
+    database, queries = split_queries(vectors, 5)
+    assert (~mask).sum() == len(queries) == 5
+    np.testing.assert_array_equal(database, vectors[mask])
+    np.testing.assert_array_equal(queries, vectors[~mask])
+
+
+def test_two_stage_recall_against_flat_search():
+    vectors, doc_refs = _documents()
+    rows = {row["documents"]: row for row in benchmark_two_stage(vectors, doc_refs, k=10, num_queries=50, documents=(5, 100))}
+
+    assert rows[100]["recall@10"] == 1.0
+    assert rows[5]["recall@10"] >= 0.95
+    assert rows[5]["chunks_scored"] < rows["all"]["chunks_scored"] / 10
+
+
+def test_document_index_ranks_by_centroid_and_survives_a_reload(tmp_path):
+    vectors, doc_refs = _documents(3, 5)
+    index = DocumentIndex(DIMENSION)
+    for doc in range(3):
+        index.set(f"doc-{doc}", vectors[doc_refs == doc])
+    index.remove("doc-1")
+
+    query = vectors[doc_refs == 2].mean(axis=0, keepdims=True)
+    assert index.search(query, 2) == [["doc-2", "doc-0"]]
+    index.save(tmp_path / "documents")
+    assert DocumentIndex.load(tmp_path / "documents").search(query, 2) == [["doc-2", "doc-0"]]
+
+
+def _ranked(store: VectorEmbeddingSystem, queries, k: int) -> dict:
+    results = store.search_many(queries, k)["results"]
+    return {query: [(hit["id"], round(hit["similarity_score"], 5)) for hit in hits] for query, hits in zip(queries, results)}
+
+
+def test_two_stage_search_matches_flat_search_when_every_document_is_kept(store_dir, monkeypatch):
+    store = _built_store(num_workers=1)
+    queries = ["hostel fee payment", "library book issue", "exam hall tickets", "cse laboratories"]
+    expected = _ranked(store, queries, 2)
+
+    monkeypatch.setattr(Config, "TWO_STAGE_SEARCH", True)
+    monkeypatch.setattr(Config, "TWO_STAGE_DOCUMENTS", len(store.manifest))
+    assert _ranked(store, queries, 2) == expected
+
+    monkeypatch.setattr(Config, "TWO_STAGE_DOCUMENTS", 1)
+    assert {query: hits[:1] for query, hits in _ranked(store, queries, 1).items()} == {
+        query: hits[:1] for query, hits in expected.items()
+    }
+
+    store.update_document("extracted_text/hostel.txt")
+    store.save_vector_store(compact=True)
+    reloaded = VectorEmbeddingSystem()
+    assert reloaded.load_vector_store()
+    assert sorted(reloaded.document_index.source_files) == sorted(store.manifest)
+    assert _ranked(reloaded, queries, 1) == _ranked(store, queries, 1)
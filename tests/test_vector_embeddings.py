@@ -0,0 +1,71 @@
+from config import Config
+from conftest import PAGES, write_page
+from vector_embeddings import VectorEmbeddingSystem
+
+
+def _built_store(**kwargs) -> VectorEmbeddingSystem:
+    store = VectorEmbeddingSystem(**kwargs)
+    store.generate_embeddings(store.load_scraped_data())
+    store.save_vector_store()
+    return store
+
+
+def _pages(hits) -> list:
+    return [hit["source_file"].rsplit("/", 1)[-1][: -len(".txt")] for hit in hits]
+
+
+def test_generate_embeddings_encodes_chunks_in_one_batched_call(store_dir):
+    store = _built_store(batch_size=16, num_workers=1)
+
+    assert store.model.calls[0] == (len(PAGES), 16)
+    assert store.index.ntotal == len(PAGES)
+    assert _pages(store.search("hostel fee payment", 1)) == ["hostel"]
+
+
+def test_large_jobs_use_the_process_pool(store_dir, monkeypatch):
+    monkeypatch.setattr(Config, "EMBEDDING_POOL_MIN_CHUNKS", 2)
+    store = _built_store(num_workers=3)
+
+    assert store.model.pools == [3]
+    assert _pages(store.search("library timings", 1)) == ["library"]
+
+
+def test_sync_matches_documents_however_the_directory_is_spelled(store_dir):
+    store = _built_store(num_workers=1)
+    text_dir = store_dir / "extracted_text"
+
+    for spelling in (str(text_dir), "./extracted_text/", "extracted_text"):
+        summary = store.sync_directory(spelling)
+        assert summary["unchanged"] == len(PAGES) and summary["added"] == summary["deleted"] == 0
+
+    (text_dir / "library.txt").unlink()
+    write_page(text_dir, "hostel", "https://nitkkr.ac.in/hostel/fees", "Hostel Fees", "Revised hostel fee structure.")
+    write_page(text_dir, "sports", "https://nitkkr.ac.in/sports", "Sports", "Sports complex and gymnasium.")
+    summary = store.sync_directory(str(text_dir) + "/")
+
+    assert (summary["added"], summary["updated"], summary["deleted"]) == (1, 1, 1)
+    assert sorted(store.manifest) == sorted(f"extracted_text/{name}.txt" for name in ("cse", "exams", "hostel", "sports"))
+    assert _pages(store.search("gymnasium", 1)) == ["sports"]
+
+    assert store.update_document(str(text_dir / "cse.txt"))
+    assert sorted(store.manifest) == sorted(f"extracted_text/{name}.txt" for name in ("cse", "exams", "hostel", "sports"))
+
+
+def test_search_many_matches_single_searches_in_one_model_call(store_dir, monkeypatch):
+    # The single searches below would otherwise leave every query in the query cache.
+    monkeypatch.setattr(Config, "QUERY_CACHE_SIZE", 0)
+    store = _built_store(num_workers=1)
+    queries = ["exam schedule", "", "library book issue"]
+    expected = [store.search(query, 2) for query in queries]
+    store.model.calls.clear()
+
+    batched = store.search_many(queries, 2)
+
+    assert len(store.model.calls) == 1 and store.model.calls[0][0] == 2
+    assert [[hit["id"] for hit in hits] for hits in batched["results"]] == [[hit["id"] for hit in hits] for hits in expected]
+    best = {}
+    for hits in batched["results"]:
+        for hit in hits:
+            best[hit["id"]] = max(best.get(hit["id"], 0.0), hit["similarity_score"])
+    assert [hit["id"] for hit in batched["fused"]] == sorted(best, key=best.get, reverse=True)
+    assert [hit["similarity_score"] for hit in batched["fused"]] == sorted(best.values(), reverse=True)
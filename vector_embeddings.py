@@ -1,59 +1,216 @@
 import os
+import re
 import json
+import time
+import zlib
+import hashlib
+import shutil
+import resource
+import threading
 import numpy as np
 import logging
+from contextlib import contextmanager
+from datetime import datetime
 from pathlib import Path
-from typing import Dict, List
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from config import Config
+from chunk_store import ChunkStore
+from document_index import DocumentIndex
+from facet_index import FacetIndex, content_type_for, parse_filters
+from embedding_cache import EmbeddingCache
+from faiss_index import (
+    FAISS_AVAILABLE,
+    apply_search_params,
+    bitmap_search_params,
+    build_faiss_index,
+    faiss,
+    filter_search_params,
+    include_search_params,
+)
+from lexical_index import BM25Index
+from near_duplicates import DuplicateIndex, simhash
+from query_cache import QueryEmbeddingCache, normalize_query
+from onnx_encoder import load_encoder
+from numpy_index import METRIC_INNER_PRODUCT, METRIC_L2, NumpyFlatIndex
+from segment_store import Segment, SegmentWriter
+from sharded_index import ShardedIndex, shard_for
+from snapshot_store import SnapshotStore, UpdateLog, decode_vectors, encode_vectors
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
-try:
-    import faiss  # type: ignore
-
-    FAISS_AVAILABLE = True
-except (ImportError, ModuleNotFoundError):
-    logger.warning("FAISS not available. Incremental updates will be slower/limited.")
-    faiss = None  # type: ignore
-    FAISS_AVAILABLE = False
-
 try:
     from sentence_transformers import SentenceTransformer  # type: ignore
 
     SENTENCE_TRANSFORMERS_AVAILABLE = True
 except (ImportError, ModuleNotFoundError):
-    logger.warning("sentence-transformers not available. Using TF-IDF fallback.")
+    logger.warning("sentence-transformers not available. Using hashed bag-of-words embeddings.")
     SentenceTransformer = None  # type: ignore
     SENTENCE_TRANSFORMERS_AVAILABLE = False
 
 
+class PipelineProgress:
+    """Progress and throughput reporting for the streaming embedding pipeline."""
+
+    def __init__(self, total_chunks: int, log_every: float = 10.0):
+        self.total_chunks = total_chunks
+        self.log_every = log_every
+        self.documents = 0
+        self.chunks = 0
+        self.start = time.perf_counter()
+        self._last_log = self.start
+
+    def update(self, documents: int = 0, chunks: int = 0) -> None:
+        self.documents += documents
+        self.chunks += chunks
+        now = time.perf_counter()
+        if chunks and now - self._last_log >= self.log_every:
+            self._last_log = now
+            logger.info(self.summary("Embedding progress"))
+
+    def stats(self) -> Dict:
+        elapsed = time.perf_counter() - self.start
+        rate = self.chunks / elapsed if elapsed > 0 else 0.0
+        remaining = self.total_chunks - self.chunks
+        return {
+            "documents": self.documents,
+            "chunks": self.chunks,
+            "total_chunks": self.total_chunks,
+            "elapsed_seconds": elapsed,
+            "chunks_per_second": rate,
+            "eta_seconds": remaining / rate if rate else 0.0,
+            # ru_maxrss is KiB on Linux; good enough to confirm peak memory stays flat.
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0,
+        }
+
+    def summary(self, label: str) -> str:
+        stats = self.stats()
+        return (
+            f"{label}: {stats['chunks']}/{stats['total_chunks']} chunks from {stats['documents']} documents, "
+            f"{stats['chunks_per_second']:.1f} chunks/sec, ETA {stats['eta_seconds']:.0f}s, "
+            f"peak RSS {stats['peak_rss_mb']:.0f} MB"
+        )
+
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def hashing_embedding(texts: List[str], dimension: int) -> np.ndarray:
+    """Deterministic signed feature-hashing of unigrams and bigrams, L2-normalized.
+
+    Used when sentence-transformers is not installed so minimal installs still get lexically
+    meaningful vectors instead of random ones.
+    """
+    vectors = np.zeros((len(texts), dimension), dtype="float32")
+    for row, text in enumerate(texts):
+        tokens = _TOKEN_PATTERN.findall(text.lower())
+        for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+            h = zlib.crc32(feature.encode("utf-8"))
+            vectors[row, h % dimension] += 1.0 if h & 0x80000000 else -1.0
+
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
 class VectorEmbeddingSystem:
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2", chunk_size: int = 120, chunk_overlap: int = 15):
+    def __init__(
+        self,
+        model_name: str = "all-MiniLM-L6-v2",
+        chunk_size: int = 120,
+        chunk_overlap: int = 15,
+        batch_size: Optional[int] = None,
+        num_workers: Optional[int] = None,
+        index_type: Optional[str] = None,
+        metric: Optional[str] = None,
+        storage: Optional[str] = None,
+    ):
         """Initialize the vector embedding system with support for incremental updates."""
 
         self.model_name = model_name
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
-
-        if SENTENCE_TRANSFORMERS_AVAILABLE and SentenceTransformer is not None:
+        self.batch_size = batch_size or Config.EMBEDDING_BATCH_SIZE
+        self.num_workers = num_workers or Config.EMBEDDING_WORKERS or os.cpu_count() or 1
+        self.index_type = (index_type or Config.INDEX_TYPE).lower()
+        self.metric = (metric or Config.INDEX_METRIC).lower()
+        self.storage = (storage or Config.VECTOR_STORAGE).lower()
+
+        self.backend = Config.EMBEDDING_BACKEND.lower()
+        self.model = None
+        if self.backend != "torch":
+            # The export was parity-checked against PyTorch, so its vectors share the model's index.
+            self.model = load_encoder(model_name, self.backend)
+            if self.model is None:
+                logger.warning(f"Falling back to the PyTorch model instead of {self.backend}.")
+                self.backend = "torch"
+        if self.model is None and SENTENCE_TRANSFORMERS_AVAILABLE and SentenceTransformer is not None:
             logger.info(f"Loading sentence transformer model: {model_name}")
             self.model = SentenceTransformer(model_name)
-            self.dimension = self.model.get_sentence_embedding_dimension()
-        else:
-            self.model = None
-            self.dimension = 768
+        self.dimension = self.model.get_sentence_embedding_dimension() if self.model else 768
+        self.encoder_name = model_name if self.model else "hashing"
 
-        if FAISS_AVAILABLE:
-            base_index = faiss.IndexFlatL2(self.dimension)
-            self.index = faiss.IndexIDMap(base_index)
-        else:
-            self.index = None
+        self.use_faiss = FAISS_AVAILABLE and Config.SEARCH_ENGINE != "numpy"
+        self.num_shards = max(1, Config.NUM_SHARDS)
+        self.index = self._create_index()
 
-        self.metadata: Dict[int, Dict] = {}
+        self.metadata = ChunkStore()
+        self._new_vectors: Dict[int, np.ndarray] = {}
         self.manifest: Dict[str, List[int]] = {}
+        self.file_state: Dict[str, Dict] = {}
+        self.lexical_index = BM25Index()
         self.next_chunk_id = 0
+        # Bumped whenever indexed content changes, so caches of search results know they are stale.
+        self.content_version = 0
+        # Removed chunk ids whose vectors are still in the index; search skips them until compaction.
+        # tombstone_generation changes with every addition or replacement and keys the cached search params.
+        self.tombstone_generation = 0
+        self.tombstones = set()
+        self._tombstone_params: Optional[Tuple] = None
+        # Near-identical chunks share one indexed vector; the others are kept as its source list.
+        self.duplicates = DuplicateIndex(Config.NEAR_DUPLICATE_MAX_DISTANCE)
+        # Per-document centroids for two-stage search; kept current whatever TWO_STAGE_SEARCH says.
+        self.document_index = DocumentIndex(self.dimension, self.metric)
+        # Chunk-id bitmaps per host / content type / path prefix for filtered search.
+        self.facets = FacetIndex()
 
         os.makedirs("vector_store", exist_ok=True)
+        self.snapshots = SnapshotStore(Path(Config.VECTOR_STORE_PATH), Config.SNAPSHOT_RETAIN)
+        self.snapshot_version: Optional[int] = None
+        self.update_log: Optional[UpdateLog] = None
+        # Guards store mutations against the background compaction thread.
+        self._lock = threading.RLock()
+        self._compaction: Optional[threading.Thread] = None
+        # Searches in flight, and whether a new snapshot is being swapped in under them.
+        self._readers = 0
+        self._publishing = False
+        self._state_changed = threading.Condition()
+        # Segment written by generate_embeddings; removed once a snapshot holds a copy.
+        self._scratch_dir: Optional[Path] = None
+        self._encode_pool = None
+
+        self.embedding_cache: Optional[EmbeddingCache] = None
+        if Config.EMBEDDING_CACHE_ENABLED and self.model is not None:
+            try:
+                self.embedding_cache = EmbeddingCache(
+                    os.path.join(Config.VECTOR_STORE_PATH, "embedding_cache.sqlite"),
+                    # int8 vectors are close to, but not the same as, the full-precision ones.
+                    model_name=self.model_name if self.backend == "torch" else f"{self.model_name}@{self.backend}",
+                    dimension=self.dimension,
+                    max_entries=Config.EMBEDDING_CACHE_MAX_ENTRIES,
+                )
+            except Exception as exc:
+                logger.warning(f"Embedding cache unavailable: {exc}. Every chunk will be re-encoded.")
+
+        # Recent query embeddings, so recurring questions skip the model forward pass.
+        self.query_cache: Optional[QueryEmbeddingCache] = None
+        if Config.QUERY_CACHE_SIZE > 0:
+            self.query_cache = QueryEmbeddingCache(
+                max_entries=Config.QUERY_CACHE_SIZE,
+                ttl_seconds=Config.QUERY_CACHE_TTL,
+                history_path=os.path.join(Config.VECTOR_STORE_PATH, "query_history.json"),
+                history_max_entries=Config.QUERY_HISTORY_MAX_ENTRIES,
+            )
 
     def chunk_text(self, text: str) -> List[str]:
         """Split text into overlapping chunks."""
@@ -68,101 +225,540 @@ class VectorEmbeddingSystem:
 
         return chunks
 
+    @property
+    def tombstones(self) -> Set[int]:
+        return self._tombstones
+
+    @tombstones.setter
+    def tombstones(self, tombstones: Set[int]) -> None:
+        self._tombstones = tombstones
+        self.tombstone_generation += 1
+
     def _load_single_document(self, file_path: Path) -> Dict:
         """Helper to load and parse one text file."""
         with open(file_path, "r", encoding="utf-8") as f:
             content = f.read()
+        mtime = file_path.stat().st_mtime
 
         lines = content.split("\n")
         url = lines[0].replace("URL: ", "") if lines else "Unknown"
         title = lines[1].replace("Title: ", "") if len(lines) > 1 else "Unknown"
+        headers: Dict[str, str] = {}
 
         try:
             separator_idx = next(i for i, line in enumerate(lines) if line.startswith("-" * 10))
             text_content = "\n".join(lines[separator_idx + 1 :])
+            for line in lines[2:separator_idx]:
+                name, _, value = line.partition(": ")
+                headers[name] = value.strip()
         except StopIteration:
             text_content = content
 
+        # Pages scraped before the Content-Type / Crawled headers existed fall back to the URL and file time.
+        try:
+            crawled = datetime.fromisoformat(headers["Crawled"]).timestamp()
+        except (KeyError, ValueError):
+            crawled = mtime
+
         return {
             "url": url,
             "title": title,
             "text": text_content,
-            "source_file": str(file_path),
+            "source_file": self._source_key(file_path),
+            "mtime": mtime,
+            "content_hash": hashlib.sha1(content.encode("utf-8")).hexdigest(),
+            "content_type": headers.get("Content-Type") or content_type_for(url),
+            "crawled": crawled,
         }
 
-    def load_scraped_data(self) -> List[Dict]:
-        """Load all scraped text data from files."""
-        documents: List[Dict] = []
-        text_dir = Path("extracted_text")
+    @staticmethod
+    def _file_state_entry(doc: Dict) -> Dict:
+        """What is remembered about a source file: change detection plus the facets filters use."""
+        return {
+            "mtime": doc["mtime"],
+            "content_hash": doc["content_hash"],
+            "url": doc.get("url", ""),
+            "content_type": doc.get("content_type") or content_type_for(doc.get("url", "")),
+            "crawled": doc.get("crawled", doc["mtime"]),
+        }
 
-        if not text_dir.exists():
-            return documents
+    @staticmethod
+    def _source_key(file_path: Path) -> str:
+        """Manifest key for a text file: its path relative to the working directory, or absolute outside it."""
+        resolved = file_path.resolve()
+        try:
+            return str(resolved.relative_to(Path.cwd().resolve()))
+        except ValueError:
+            return str(resolved)
 
-        for file_path in text_dir.glob("*.txt"):
+    def _known_sources(self) -> Dict[Path, str]:
+        """Resolved path -> manifest key of every tracked document, however its path was spelled when added."""
+        return {Path(source_file).resolve(): source_file for source_file in {**self.file_state, **self.manifest}}
+
+    def iter_scraped_data(self, text_dir: str = "extracted_text") -> Iterator[Dict]:
+        """Yield scraped documents one file at a time."""
+        directory = Path(text_dir)
+        if not directory.exists():
+            return
+
+        for file_path in sorted(directory.glob("*.txt")):
             try:
-                documents.append(self._load_single_document(file_path))
+                yield self._load_single_document(file_path)
             except Exception as exc:
                 logger.error(f"Error loading {file_path}: {exc}")
 
-        return documents
+    def load_scraped_data(self) -> List[Dict]:
+        """Load all scraped text data from files."""
+        return list(self.iter_scraped_data())
+
+    def _create_index(self, training_vectors: Optional[np.ndarray] = None):
+        """Empty index for the active engine; trained FAISS types are only built once there is data to train on."""
+        if not self.use_faiss:
+            metric_type = METRIC_INNER_PRODUCT if self.metric == "cosine" else METRIC_L2
+            return NumpyFlatIndex(self.dimension, metric_type, block_rows=Config.NUMPY_SEARCH_BLOCK_ROWS)
+
+        index_type = self.index_type if training_vectors is not None else "flat"
+        return build_faiss_index(self.dimension, index_type, training_vectors, self.metric, self.storage)
 
     def _encode_text(self, text: str) -> np.ndarray:
         if self.model:
             embedding = self.model.encode(text)
         else:
-            embedding = np.random.rand(self.dimension)
+            embedding = hashing_embedding([text], self.dimension)[0]
         return np.array(embedding, dtype="float32")
 
-    def generate_embeddings(self, documents: List[Dict]) -> None:
-        """Generate embeddings for all documents from scratch (wipes existing data)."""
-        logger.info("Generating embeddings from scratch...")
-
-        if FAISS_AVAILABLE and self.index is not None:
-            self.index.reset()
+    def encode_query(self, query: str) -> np.ndarray:
+        """Embedding of one query as search would compute it, without counting it as a search."""
+        return self._encode_queries([query], record=False)[0]
+
+    def _encode_queries(self, queries: List[str], record: bool = True) -> np.ndarray:
+        """Encode search queries, serving repeated ones from the query cache."""
+        if self.query_cache is None:
+            return self._encode_query_batch(queries)
+
+        keys = [normalize_query(query) for query in queries]
+        if record:
+            self.query_cache.record_queries(keys)
+        cached = self.query_cache.get_many(keys)
+        embeddings = np.empty((len(keys), self.dimension), dtype="float32")
+        for i, vector in cached.items():
+            embeddings[i] = vector
+
+        missing = list(dict.fromkeys(key for i, key in enumerate(keys) if i not in cached))
+        if missing:
+            fresh = self._encode_query_batch(missing)
+            self.query_cache.put_many(missing, fresh)
+            rows = {key: row for row, key in enumerate(missing)}
+            for i, key in enumerate(keys):
+                if i not in cached:
+                    embeddings[i] = fresh[rows[key]]
+        return embeddings
+
+    def _encode_query_batch(self, queries: List[str]) -> np.ndarray:
+        start = time.perf_counter()
+        if not self.model:
+            embeddings = hashing_embedding(queries, self.dimension)
         else:
-            if FAISS_AVAILABLE:
-                base_index = faiss.IndexFlatL2(self.dimension)
-                self.index = faiss.IndexIDMap(base_index)
-
-        self.metadata = {}
-        self.manifest = {}
-        self.next_chunk_id = 0
+            embeddings = self.model.encode(queries, batch_size=self.batch_size, convert_to_numpy=True, show_progress_bar=False)
+        if self.query_cache is not None:
+            self.query_cache.record_encode(len(queries), time.perf_counter() - start)
+        return np.asarray(embeddings, dtype="float32").reshape(len(queries), self.dimension)
+
+    def warm_query_cache(self, limit: Optional[int] = None) -> int:
+        """Pre-encode the most frequently searched queries; returns how many were encoded."""
+        limit = Config.QUERY_CACHE_WARMUP if limit is None else limit
+        if self.query_cache is None or limit <= 0:
+            return 0
+
+        queries = self.query_cache.frequent(min(limit, self.query_cache.max_entries))
+        if not queries:
+            return 0
+
+        start = time.perf_counter()
+        self.query_cache.put_many(queries, self._encode_query_batch(queries))
+        logger.info(f"Pre-encoded {len(queries)} frequent queries in {time.perf_counter() - start:.2f}s")
+        return len(queries)
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        """Encode many chunks, reusing cached vectors for text seen in earlier runs."""
+        if not texts:
+            return np.empty((0, self.dimension), dtype="float32")
+
+        if self.embedding_cache is None:
+            return self._encode_uncached(texts)
+
+        cached = self.embedding_cache.get_many(texts)
+        missing = [i for i in range(len(texts)) if i not in cached]
+        logger.info(f"Embedding cache: {len(cached)} hits, {len(missing)} misses.")
+
+        embeddings = np.empty((len(texts), self.dimension), dtype="float32")
+        for i, vector in cached.items():
+            embeddings[i] = vector
+
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            fresh = self._encode_uncached(missing_texts)
+            embeddings[missing] = fresh
+            self.embedding_cache.put_many(missing_texts, fresh)
+
+        return embeddings
+
+    def _encode_uncached(self, texts: List[str]) -> np.ndarray:
+        """Encode chunks with the model, spreading large jobs over a CPU process pool."""
+        start = time.perf_counter()
+        if not self.model:
+            embeddings = hashing_embedding(texts, self.dimension)
+        elif self._encode_pool is not None:
+            embeddings = self.model.encode_multi_process(texts, self._encode_pool, batch_size=self.batch_size)
+        elif self.backend == "torch" and self.num_workers > 1 and len(texts) >= Config.EMBEDDING_POOL_MIN_CHUNKS:
+            logger.info(f"Encoding {len(texts)} chunks on {self.num_workers} worker processes...")
+            pool = self.model.start_multi_process_pool(target_devices=["cpu"] * self.num_workers)
+            try:
+                embeddings = self.model.encode_multi_process(texts, pool, batch_size=self.batch_size)
+            finally:
+                self.model.stop_multi_process_pool(pool)
+        else:
+            embeddings = self.model.encode(
+                texts,
+                batch_size=self.batch_size,
+                convert_to_numpy=True,
+                show_progress_bar=False,
+            )
+
+        elapsed = time.perf_counter() - start
+        rate = len(texts) / elapsed if elapsed > 0 else float("inf")
+        logger.info(f"Encoded {len(texts)} chunks in {elapsed:.1f}s ({rate:.1f} chunks/sec)")
+        return np.asarray(embeddings, dtype="float32").reshape(len(texts), self.dimension)
+
+    @contextmanager
+    def _encoding_pool(self, total_chunks: int):
+        """Keep one encoder process pool alive across all batches of a large streaming job."""
+        # ONNX Runtime already spreads one batch over every core, so it needs no process pool.
+        if self.model is None or self.backend != "torch" or self.num_workers <= 1 or total_chunks < Config.EMBEDDING_POOL_MIN_CHUNKS:
+            yield
+            return
+
+        logger.info(f"Encoding {total_chunks} chunks on {self.num_workers} worker processes...")
+        self._encode_pool = self.model.start_multi_process_pool(target_devices=["cpu"] * self.num_workers)
+        try:
+            yield
+        finally:
+            self.model.stop_multi_process_pool(self._encode_pool)
+            self._encode_pool = None
+
+    def _stream_to_segment(
+        self,
+        documents: Callable[[], Iterable[Dict]],
+        directory: Path,
+        index=None,
+        lexical_index: Optional[BM25Index] = None,
+        duplicates: Optional[DuplicateIndex] = None,
+    ) -> Tuple[Dict[str, List[int]], Dict[str, Dict], int]:
+        """Stream documents -> chunk_text -> batched encode into a preallocated segment with ids 0..n-1.
+
+        ``documents`` is called twice: once to count chunks (and, with ``duplicates``, to collapse
+        near-duplicates) so the segment's on-disk arrays can be preallocated, then to encode. Only
+        one batch of text and vectors is held in memory. Returns (manifest, file_state, num_chunks).
+        """
+        total, collapsed = self._plan_chunks(documents, duplicates)
+
+        writer = SegmentWriter(directory, self.dimension, total)
+        progress = PipelineProgress(total)
+        manifest: Dict[str, List[int]] = {}
+        file_state: Dict[str, Dict] = {}
+        batch: List[Tuple[int, Dict, str]] = []
+
+        def flush() -> None:
+            if not batch:
+                return
+            vectors = self._prepare_vectors(self._encode_batch([text for _, _, text in batch]))
+            for (chunk_id, doc, text), vector in zip(batch, vectors):
+                writer.add(chunk_id, doc, vector, text=text)
+            if index is not None:
+                index.add_with_ids(vectors, np.array([chunk_id for chunk_id, _, _ in batch], dtype=np.int64))
+            progress.update(chunks=len(batch))
+            batch.clear()
+
+        next_id = 0
+        position = 0
+        with self._encoding_pool(total):
+            for doc in documents():
+                chunks = self.chunk_text(doc["text"])
+                if collapsed is not None:
+                    if position + len(chunks) > len(collapsed):
+                        raise RuntimeError(f"{doc['source_file']} changed while embedding; run the build again.")
+                    flags = collapsed[position : position + len(chunks)]
+                    position += len(chunks)
+                    chunks = [chunk for chunk, is_duplicate in zip(chunks, flags) if not is_duplicate]
+                if next_id + len(chunks) > total:
+                    raise RuntimeError(f"{doc['source_file']} changed while embedding; run the build again.")
+
+                source_file = doc["source_file"]
+                manifest[source_file] = list(range(next_id, next_id + len(chunks)))
+                file_state[source_file] = self._file_state_entry(doc)
+                for chunk in chunks:
+                    batch.append((next_id, doc, chunk))
+                    if lexical_index is not None:
+                        lexical_index.add(next_id, chunk)
+                    next_id += 1
+                    if len(batch) >= Config.EMBEDDING_STREAM_BATCH:
+                        flush()
+                progress.update(documents=1)
+            flush()
+
+        if next_id != total or (collapsed is not None and position != len(collapsed)):
+            raise RuntimeError("Documents changed while embedding; run the build again.")
+        writer.close()
+        logger.info(progress.summary("Embedding pipeline finished"))
+        return manifest, file_state, total
+
+    def _plan_chunks(
+        self, documents: Callable[[], Iterable[Dict]], duplicates: Optional[DuplicateIndex]
+    ) -> Tuple[int, Optional[bytearray]]:
+        """First pipeline pass: count the chunks to encode and flag near-duplicates (one byte per chunk).
+
+        Canonical chunks are fingerprinted under the ids the second pass will assign, 0..n-1.
+        """
+        if duplicates is None or not Config.NEAR_DUPLICATE_DEDUP:
+            step = max(1, self.chunk_size - self.chunk_overlap)
+            return sum(len(range(0, len(doc["text"].split()), step)) for doc in documents()), None
+
+        total = 0
+        collapsed = bytearray()
+        for doc in documents():
+            for chunk in self.chunk_text(doc["text"]):
+                fingerprint = simhash(chunk)
+                canonical_id = duplicates.find(fingerprint) if fingerprint is not None else None
+                if canonical_id is not None:
+                    duplicates.add_duplicate(canonical_id, doc)
+                else:
+                    if fingerprint is not None:
+                        duplicates.add(total, fingerprint)
+                    total += 1
+                collapsed.append(canonical_id is not None)
+
+        if duplicates.duplicate_count:
+            logger.info(f"Collapsed {duplicates.duplicate_count} near-duplicate chunks into {len(duplicates.sources)}.")
+        return total, collapsed
+
+    def _fingerprint(self, text: str) -> Optional[int]:
+        return simhash(text) if Config.NEAR_DUPLICATE_DEDUP else None
+
+    def _add_chunks(self, doc: Dict, chunks: List[str], pending: List[str], pending_ids: List[int]) -> None:
+        """Register a document's chunks in metadata/manifest and queue their text for encoding.
+
+        Chunks that nearly duplicate an indexed chunk are only recorded as another source of it.
+        """
+        source_file = doc["source_file"]
+        self.manifest[source_file] = []
+        if "content_hash" in doc:
+            self.file_state[source_file] = self._file_state_entry(doc)
 
-        all_embeddings: List[np.ndarray] = []
-        all_ids: List[int] = []
+        for chunk in chunks:
+            if not chunk.strip():
+                continue
 
-        for doc in documents:
-            source_file = doc["source_file"]
-            self.manifest[source_file] = []
-            chunks = self.chunk_text(doc["text"])
+            fingerprint = self._fingerprint(chunk)
+            canonical_id = self.duplicates.find(fingerprint) if fingerprint is not None else None
+            if canonical_id is not None:
+                self.duplicates.add_duplicate(canonical_id, doc)
+                continue
+            if fingerprint is not None:
+                self.duplicates.add(self.next_chunk_id, fingerprint)
 
-            for chunk in chunks:
-                if not chunk.strip():
-                    continue
+            chunk_id = self.next_chunk_id
+            self.next_chunk_id += 1
 
-                embedding = self._encode_text(chunk)
-                chunk_id = self.next_chunk_id
-                self.next_chunk_id += 1
+            pending.append(chunk)
+            pending_ids.append(chunk_id)
 
-                all_embeddings.append(embedding)
-                all_ids.append(chunk_id)
+            self.metadata.add(chunk_id, doc, chunk)
+            self.manifest[source_file].append(chunk_id)
+            self.lexical_index.add(chunk_id, chunk)
 
-                self.metadata[chunk_id] = {
-                    "id": chunk_id,
-                    "url": doc["url"],
-                    "title": doc["title"],
-                    "chunk_text": chunk,
-                    "source_file": source_file,
-                }
-                self.manifest[source_file].append(chunk_id)
+    def generate_embeddings(self, documents: Optional[List[Dict]] = None, text_dir: str = "extracted_text") -> int:
+        """Generate embeddings for all documents from scratch (wipes existing data).
 
-        if all_embeddings and FAISS_AVAILABLE and self.index is not None:
-            self.index.add_with_ids(np.array(all_embeddings), np.array(all_ids, dtype=np.int64))
+        Without ``documents``, files are streamed from text_dir so peak memory does not grow with
+        the corpus. Returns the number of chunks generated.
+        """
+        logger.info("Generating embeddings from scratch...")
 
-        logger.info(f"Generated {len(all_ids)} chunks total.")
+        scratch_dir = Path(Config.VECTOR_STORE_PATH) / "generate.tmp"
+        if scratch_dir.exists():
+            shutil.rmtree(scratch_dir)
+
+        # Index types that need no training take vectors batch by batch; the rest are trained afterwards.
+        needs_training = self.index_type in ("ivf", "ivfpq") or self.storage == "int8"
+        stream_index = None
+        if self.use_faiss and not needs_training:
+            stream_index = build_faiss_index(self.dimension, self.index_type, None, self.metric, self.storage)
+
+        lexical_index = BM25Index()
+        duplicates = DuplicateIndex(Config.NEAR_DUPLICATE_MAX_DISTANCE)
+        source = (lambda: documents) if documents is not None else (lambda: self.iter_scraped_data(text_dir))
+        manifest, file_state, total = self._stream_to_segment(source, scratch_dir, stream_index, lexical_index, duplicates)
+        chunk_store = ChunkStore.open(scratch_dir)
+
+        if not self.use_faiss:
+            index = self._segment_index(chunk_store)
+        elif stream_index is not None:
+            index = stream_index
+        else:
+            index = self._index_from_segment(chunk_store.segment)
+
+        # Searches keep using the previous store until the new one is complete.
+        previous, previous_index = self.metadata, self.index
+        self._publish(
+            metadata=chunk_store,
+            _new_vectors={},
+            lexical_index=lexical_index,
+            tombstones=set(),
+            duplicates=duplicates,
+            document_index=self._document_index_for(manifest, chunk_store),
+            facets=self._facets_for(manifest, file_state, duplicates, chunk_store.document),
+            manifest=manifest,
+            file_state=file_state,
+            next_chunk_id=total,
+            index=index,
+        )
+        previous.close()
+        if isinstance(previous_index, ShardedIndex):
+            previous_index.close()
+        self._scratch_dir = scratch_dir
+        self.content_version += 1
+
+        logger.info(f"Generated {total} chunks total.")
+        return total
+
+    def _remove_document(self, source_file: str) -> int:
+        """Drop a document's chunks from metadata and manifest and tombstone their vectors."""
+        self.content_version += 1
+        old_ids = self.manifest.pop(source_file, [])
+        self.file_state.pop(source_file, None)
+        self.duplicates.remove_source(source_file)
+        self.document_index.remove(source_file)
+        self.facets.remove_document(source_file)
+        for cid in old_ids:
+            if cid in self.duplicates.sources:
+                self._promote_duplicate(cid)
+            else:
+                self.duplicates.remove(cid)
+        self.lexical_index.remove(old_ids)
+        for cid in old_ids:
+            self.metadata.pop(cid, None)
+            self._new_vectors.pop(cid, None)
+        # Removing ids from an IndexIDMap scans and shifts the whole index, so deletes are only recorded here.
+        self.tombstones.update(old_ids)
+        self.tombstone_generation += 1
+        return len(old_ids)
+
+    def _promote_duplicate(self, chunk_id: int) -> None:
+        """Re-home a removed chunk under the first other document that repeated it, reusing its vector."""
+        fingerprint = self.duplicates.fingerprints.get(chunk_id)
+        sources = self.duplicates.remove(chunk_id)
+        text = self.metadata.text(chunk_id)
+        vector = self._stored_vector(chunk_id)
+        if vector is None:
+            vector = self._prepare_vectors(self._encode_batch([text]))[0]
+        vector = np.array(vector, dtype="float32")
+
+        new_id = self.next_chunk_id
+        self.next_chunk_id += 1
+        document = sources[0]
+        self.metadata.add(new_id, document, text)
+        self.manifest.setdefault(document["source_file"], []).append(new_id)
+        self.lexical_index.add(new_id, text)
+        self._new_vectors[new_id] = vector
+        if self.index is not None:
+            self.index.add_with_ids(vector.reshape(1, -1), np.array([new_id], dtype=np.int64))
+
+        if fingerprint is not None:
+            self.duplicates.add(new_id, fingerprint)
+        for source in sources[1:]:
+            self.duplicates.add_duplicate(new_id, source)
+        for source_file in {source["source_file"] for source in sources}:
+            self._refresh_document(source_file)
+
+    def _prepare_vectors(self, vectors: np.ndarray) -> np.ndarray:
+        """Normalize vectors in place for cosine search; L2 search uses them unchanged."""
+        vectors = np.ascontiguousarray(vectors, dtype="float32")
+        if self.metric == "cosine" and len(vectors):
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors /= np.maximum(norms, 1e-12)
+        return vectors
+
+    def _index_pending(self, pending: List[str], pending_ids: List[int]) -> None:
+        embeddings = self._prepare_vectors(self._encode_batch(pending))
+        # Vectors stay referenced until the next save writes them into the segment.
+        self._new_vectors.update(zip(pending_ids, embeddings))
+        if pending_ids and self.index is not None:
+            self.index.add_with_ids(embeddings, np.array(pending_ids, dtype=np.int64))
+
+    def _refresh_document(self, source_file: str) -> None:
+        """Recompute a document's centroid and facet coverage from its current chunks."""
+        self.content_version += 1
+        if source_file not in self.manifest:
+            self.document_index.remove(source_file)
+            self.facets.remove_document(source_file)
+            return
+
+        vectors = [self._stored_vector(cid) for cid in self.manifest[source_file]]
+        vectors = [vector for vector in vectors if vector is not None]
+        self.document_index.set(source_file, np.stack(vectors) if vectors else np.empty((0, self.dimension)))
+        self._refresh_facets(source_file)
+
+    def _refresh_facets(self, source_file: str) -> None:
+        state = self.file_state.get(source_file, {})
+        self._set_facets(self.facets, source_file, self.manifest[source_file], state, self.duplicates, self.metadata.document)
+
+    @staticmethod
+    def _set_facets(
+        facets: FacetIndex,
+        source_file: str,
+        chunk_ids: List[int],
+        state: Dict,
+        duplicates: DuplicateIndex,
+        document: Callable[[int], Dict],
+    ) -> None:
+        url = state.get("url") or (document(chunk_ids[0]).get("url", "") if chunk_ids else "")
+        facets.set_document(
+            source_file,
+            url,
+            state.get("content_type") or content_type_for(url),
+            state.get("crawled", state.get("mtime", 0.0)),
+            chunk_ids + duplicates.duplicates_of(source_file),
+        )
+
+    def _rebuild_document_index(self) -> None:
+        """Rebuild document centroids and facet bitmaps for every document in the manifest."""
+        self.document_index = self._document_index_for(self.manifest, self.metadata)
+        self.facets = self._facets_for(self.manifest, self.file_state, self.duplicates, self.metadata.document)
+
+    def _document_index_for(self, manifest: Dict[str, List[int]], chunk_store: ChunkStore) -> DocumentIndex:
+        """Centroids of every document whose chunk vectors are all stored in chunk_store's segment."""
+        document_index = DocumentIndex(self.dimension, self.metric)
+        for source_file, chunk_ids in manifest.items():
+            rows = [row for row in (chunk_store.base_row(cid) for cid in chunk_ids) if row >= 0]
+            vectors = chunk_store.segment.embeddings[rows] if rows else np.empty((0, self.dimension))
+            document_index.set(source_file, np.asarray(vectors, dtype="float32"))
+        return document_index
+
+    def _facets_for(
+        self,
+        manifest: Dict[str, List[int]],
+        file_state: Dict[str, Dict],
+        duplicates: DuplicateIndex,
+        document: Callable[[int], Dict],
+    ) -> FacetIndex:
+        """Facet bitmaps for every document in manifest; ``document`` looks up a chunk's page metadata."""
+        facets = FacetIndex()
+        for source_file, chunk_ids in manifest.items():
+            self._set_facets(facets, source_file, chunk_ids, file_state.get(source_file, {}), duplicates, document)
+        return facets
 
     def update_document(self, source_file_path: str) -> bool:
-        """Atomically update the embeddings for a single document."""
+        """Update the embeddings for a single document and record the change in the update log."""
         logger.info(f"🔄 Updating document: {source_file_path}")
         path_obj = Path(source_file_path)
 
@@ -170,150 +766,932 @@ class VectorEmbeddingSystem:
             logger.error(f"File not found: {source_file_path}")
             return False
 
-        old_ids = self.manifest.get(str(path_obj), [])
-        if old_ids:
-            if FAISS_AVAILABLE and self.index is not None:
-                self.index.remove_ids(np.array(old_ids, dtype=np.int64))
-            for cid in old_ids:
-                self.metadata.pop(cid, None)
-            logger.info(f"Removed {len(old_ids)} old chunks.")
+        with self._lock:
+            source_file = self._source_key(path_obj)
+            if source_file not in self.manifest:
+                source_file = self._known_sources().get(path_obj.resolve(), source_file)
+            try:
+                doc = self._load_single_document(path_obj)
+                doc["source_file"] = source_file
+                chunks = self.chunk_text(doc["text"])
+            except Exception as exc:
+                logger.error(f"Failed to process file: {exc}")
+                return False
+
+            new_chunks: List[str] = []
+            new_ids: List[int] = []
+            # Searches on other threads must not see the index or chunk store half-updated.
+            with self._writing():
+                removed = self._remove_document(source_file)
+                self._add_chunks(doc, chunks, new_chunks, new_ids)
+                self._index_pending(new_chunks, new_ids)
+                self._refresh_document(doc["source_file"])
+            if removed:
+                logger.info(f"Removed {removed} old chunks.")
+            logger.info(f"Added {len(new_ids)} new chunks.")
+
+            if self.update_log is None:
+                # No published snapshot to log against yet.
+                self.save_vector_store()
+                return True
+            self.update_log.append(self._update_record(doc, new_chunks, new_ids))
+
+        self._maybe_compact()
+        return True
+
+    def _update_record(self, doc: Dict, texts: List[str], chunk_ids: List[int]) -> Dict:
+        vectors = np.stack([self._new_vectors[cid] for cid in chunk_ids]) if chunk_ids else np.empty((0, self.dimension))
+        return {
+            "source_file": doc["source_file"],
+            "document": {
+                key: doc[key] for key in ("url", "title", "source_file", "mtime", "content_hash", "content_type", "crawled")
+            },
+            "chunk_ids": chunk_ids,
+            "texts": texts,
+            "vectors": encode_vectors(vectors),
+            "duplicate_of": self.duplicates.duplicates_of(doc["source_file"]),
+        }
 
+    def _replay_update(self, record: Dict) -> None:
+        """Re-apply a logged update_document call using its recorded chunk ids and vectors."""
+        source_file = record["source_file"]
+        doc = record["document"]
+        chunk_ids = record["chunk_ids"]
+        vectors = decode_vectors(record["vectors"], len(chunk_ids))
+
+        self._remove_document(source_file)
+        self.manifest[source_file] = list(chunk_ids)
+        self.file_state[source_file] = self._file_state_entry(doc)
+        for chunk_id, text in zip(chunk_ids, record["texts"]):
+            self.metadata.add(chunk_id, doc, text)
+            self.lexical_index.add(chunk_id, text)
+            fingerprint = self._fingerprint(text)
+            if fingerprint is not None:
+                self.duplicates.add(chunk_id, fingerprint)
+        for canonical_id in record.get("duplicate_of", []):
+            self.duplicates.add_duplicate(canonical_id, doc)
+
+        if chunk_ids:
+            self._new_vectors.update(zip(chunk_ids, vectors))
+            if self.index is not None:
+                self.index.add_with_ids(vectors, np.array(chunk_ids, dtype=np.int64))
+            self.next_chunk_id = max(self.next_chunk_id, max(chunk_ids) + 1)
+        self._refresh_document(source_file)
+
+    def _maybe_compact(self) -> None:
+        """Fold the update log into a new snapshot on a background thread once it grows large enough."""
+        log = self.update_log
+        if log is None or (log.records < Config.WAL_COMPACT_RECORDS and log.size_bytes() < Config.WAL_COMPACT_BYTES):
+            return
+        if self._compaction is not None and self._compaction.is_alive():
+            return
+
+        logger.info(f"Compacting {log.records} logged updates into a new snapshot in the background.")
+        # Not a daemon thread, so a CLI process finishes publishing the snapshot before exiting.
+        self._compaction = threading.Thread(target=self._compact, name="vector-store-compaction")
+        self._compaction.start()
+
+    def _compact(self) -> None:
         try:
-            doc = self._load_single_document(path_obj)
-            chunks = self.chunk_text(doc["text"])
+            self.save_vector_store()
         except Exception as exc:
-            logger.error(f"Failed to process file: {exc}")
-            return False
+            logger.error(f"Background compaction failed; updates remain in the log: {exc}")
+
+    def wait_for_compaction(self) -> None:
+        if self._compaction is not None:
+            self._compaction.join()
+
+    def sync_directory(self, text_dir: str = "extracted_text") -> Dict[str, int]:
+        """Add, replace and delete documents so the store mirrors text_dir, persisting once."""
+        directory = Path(text_dir).resolve()
+        summary = {"added": 0, "updated": 0, "deleted": 0, "unchanged": 0, "failed": 0}
+
+        with self._lock:
+            # Match files by resolved path, so "./extracted_text", an absolute path or a trailing slash
+            # all find the documents added under another spelling.
+            known = self._known_sources()
+            on_disk = {
+                known.get(path.resolve(), self._source_key(path)): path for path in directory.glob("*.txt")
+            } if directory.exists() else {}
+            self._sync(directory, on_disk, summary)
+        return summary
+
+    def _sync(self, directory: Path, on_disk: Dict[str, Path], summary: Dict[str, int]) -> None:
+        deleted = [
+            source_file
+            for source_file in self.manifest
+            if Path(source_file).resolve().parent == directory and source_file not in on_disk
+        ]
+        summary["deleted"] += len(deleted)
+        changed: List[Tuple[Dict, List[str]]] = []
+
+        for source_file, path_obj in sorted(on_disk.items()):
+            state = self.file_state.get(source_file)
+            if state and state["mtime"] == path_obj.stat().st_mtime:
+                summary["unchanged"] += 1
+                continue
 
-        new_embeddings: List[np.ndarray] = []
-        new_ids: List[int] = []
-        self.manifest[str(path_obj)] = []
+            try:
+                doc = self._load_single_document(path_obj)
+                doc["source_file"] = source_file
+                chunks = self.chunk_text(doc["text"])
+            except Exception as exc:
+                logger.error(f"Failed to process {source_file}: {exc}")
+                summary["failed"] += 1
+                continue
 
-        for chunk in chunks:
-            if not chunk.strip():
+            if state and state["content_hash"] == doc["content_hash"]:
+                state["mtime"] = doc["mtime"]
+                summary["unchanged"] += 1
                 continue
 
-            embedding = self._encode_text(chunk)
-            chunk_id = self.next_chunk_id
-            self.next_chunk_id += 1
+            summary["updated" if source_file in self.manifest else "added"] += 1
+            changed.append((doc, chunks))
+
+        pending: List[str] = []
+        pending_ids: List[int] = []
+        with self._writing():
+            for source_file in deleted:
+                self._remove_document(source_file)
+            for doc, chunks in changed:
+                self._remove_document(doc["source_file"])
+                self._add_chunks(doc, chunks, pending, pending_ids)
+            self._index_pending(pending, pending_ids)
+            for doc, _ in changed:
+                self._refresh_document(doc["source_file"])
+        logger.info(
+            f"Sync complete: {summary['added']} added, {summary['updated']} updated, "
+            f"{summary['deleted']} deleted, {summary['unchanged']} unchanged ({len(pending_ids)} chunks encoded)."
+        )
+        self.save_vector_store()
 
-            new_embeddings.append(embedding)
-            new_ids.append(chunk_id)
+    def _vectors_from_index(self) -> Dict[int, np.ndarray]:
+        """Recover stored vectors from a flat FAISS index (used when converting legacy stores)."""
+        if not (self.use_faiss and self.index is not None and self.index.ntotal):
+            return {}
+        try:
+            ids = faiss.vector_to_array(self.index.id_map)
+            vectors = faiss.downcast_index(self.index.index).reconstruct_n(0, self.index.ntotal)
+        except Exception as exc:
+            logger.error(f"Could not reconstruct vectors from the FAISS index: {exc}")
+            return {}
+        return dict(zip(ids.tolist(), vectors))
+
+    def _release_segment(self) -> None:
+        self.metadata.close()
+
+    def _write_segment(self, segment_dir: Path, id_map: Optional[Dict[int, int]] = None) -> None:
+        """Write every live chunk and its vector to a new segment directory, renumbered by id_map if given."""
+        store = self.metadata
+        chunk_ids = sorted(store)
+        fallback_vectors: Optional[Dict[int, np.ndarray]] = None
+
+        writer = SegmentWriter(segment_dir, self.dimension, len(chunk_ids))
+        for chunk_id in chunk_ids:
+            new_id = id_map[chunk_id] if id_map is not None else chunk_id
+            row = store.base_row(chunk_id)
+            if row >= 0:
+                segment = store.segment
+                writer.add(
+                    new_id,
+                    segment.document(row),
+                    segment.embeddings[row],
+                    compressed=segment.compressed_text(row),
+                    word_count=int(segment.records[row]["word_count"]),
+                )
+                continue
 
-            self.metadata[chunk_id] = {
-                "id": chunk_id,
-                "url": doc["url"],
-                "title": doc["title"],
-                "chunk_text": chunk,
-                "source_file": str(path_obj),
-            }
-            self.manifest[str(path_obj)].append(chunk_id)
+            vector = self._new_vectors.get(chunk_id)
+            if vector is None:
+                if fallback_vectors is None:
+                    fallback_vectors = self._vectors_from_index()
+                vector = fallback_vectors.get(chunk_id)
+            if vector is None:
+                logger.warning(f"No stored vector for chunk {chunk_id}; writing zeros.")
+                vector = np.zeros(self.dimension, dtype="float32")
+
+            writer.add(
+                new_id,
+                store.document(chunk_id),
+                vector,
+                text=store.text(chunk_id),
+                word_count=store.word_count(chunk_id),
+            )
+        writer.close()
+
+    @contextmanager
+    def _reading(self):
+        """Mark a search in flight; snapshot swaps wait for it, and it waits for a swap already under way."""
+        with self._state_changed:
+            while self._publishing:
+                self._state_changed.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._state_changed:
+                self._readers -= 1
+                if not self._readers:
+                    self._state_changed.notify_all()
+
+    @contextmanager
+    def _writing(self):
+        """Hold off new searches, and wait for those in flight, while the store is changed in place."""
+        with self._state_changed:
+            while self._publishing:
+                self._state_changed.wait()
+            self._publishing = True
+            while self._readers:
+                self._state_changed.wait()
+        try:
+            yield
+        finally:
+            with self._state_changed:
+                self._publishing = False
+                self._state_changed.notify_all()
+
+    def _publish(self, **state) -> None:
+        """Replace store attributes together, once no search is reading the old ones."""
+        with self._writing():
+            for name, value in state.items():
+                setattr(self, name, value)
+
+    def _attach_segment(self, segment_dir: Path, **state) -> None:
+        """Serve chunks from a freshly published segment, swapping in the rest of its state at the same time."""
+        previous = self.metadata
+        previous_index = self.index
+        chunk_store = ChunkStore.open(segment_dir)
+        state.update(metadata=chunk_store, _new_vectors={})
+        if self.num_shards > 1:
+            # Shards are rebuilt from the segment, which holds live chunks only and may be renumbered.
+            # The new workers load before the swap; searches keep using the old ones meanwhile.
+            state["index"] = self._start_shards(segment_dir.parent)
+            state["tombstones"] = set()
+        elif not self.use_faiss:
+            # The segment now holds every live vector, so search it in place.
+            state["index"] = self._segment_index(chunk_store)
+        self._publish(**state)
+        # _publish waited for the searches that were reading the previous segment and shards.
+        previous.close()
+        if isinstance(previous_index, ShardedIndex):
+            previous_index.close()
+
+    def _index_from_segment(self, segment: Segment):
+        """Build an index over a segment's embeddings, training on a sample and adding block by block."""
+        embeddings = segment.embeddings
+        training = None
+        if len(embeddings):
+            sample_size = min(len(embeddings), Config.INDEX_TRAINING_SAMPLE)
+            rows = np.sort(np.random.default_rng(0).choice(len(embeddings), sample_size, replace=False))
+            training = np.asarray(embeddings[rows], dtype="float32")
+        index = self._create_index(training)
+
+        block_rows = Config.NUMPY_SEARCH_BLOCK_ROWS
+        for start in range(0, len(embeddings), block_rows):
+            block = np.asarray(embeddings[start : start + block_rows], dtype="float32")
+            index.add_with_ids(block, np.asarray(segment.chunk_ids[start : start + block_rows], dtype=np.int64))
+        return index
+
+    def _start_shards(self, snapshot_dir: Path) -> ShardedIndex:
+        """Serve the snapshot from NUM_SHARDS worker processes, partitioned by SHARD_KEY."""
+        options = {
+            "dimension": self.dimension,
+            "index_type": self.index_type,
+            "metric": self.metric,
+            "storage": self.storage,
+            "use_faiss": self.use_faiss,
+            "shard_key": Config.SHARD_KEY,
+            "block_rows": Config.NUMPY_SEARCH_BLOCK_ROWS,
+        }
+        return ShardedIndex(self.num_shards, snapshot_dir, options, self._shard_of_chunk)
+
+    def _shard_of_chunk(self, chunk_id: int) -> int:
+        return shard_for(self.metadata.document(chunk_id), self.num_shards, Config.SHARD_KEY)
+
+    def _segment_index(self, chunk_store: Optional[ChunkStore] = None) -> NumpyFlatIndex:
+        metric_type = METRIC_INNER_PRODUCT if self.metric == "cosine" else METRIC_L2
+        segment = (self.metadata if chunk_store is None else chunk_store).segment
+        return NumpyFlatIndex.from_segment(segment, metric_type, Config.NUMPY_SEARCH_BLOCK_ROWS)
+
+    def save_vector_store(self, compact: Optional[bool] = None) -> None:
+        """Write index, chunk segment, and manifest as a new snapshot and atomically publish it.
+
+        Args:
+            compact: Rebuild the index without tombstoned vectors and renumber chunk ids densely
+                from 0. Defaults to compacting once tombstones exceed TOMBSTONE_COMPACT_RATIO.
+        """
+        with self._lock:
+            if compact is None:
+                compact = self.tombstone_ratio() > Config.TOMBSTONE_COMPACT_RATIO
+            version, staging = self.snapshots.begin()
+
+            id_map = {chunk_id: new_id for new_id, chunk_id in enumerate(sorted(self.metadata))} if compact else None
+            self._write_segment(staging / "segment", id_map)
+            if id_map is not None:
+                state = self._renumbered_state(staging / "segment", id_map)
+            else:
+                state = {
+                    "index": self.index,
+                    "lexical_index": self.lexical_index,
+                    "manifest": self.manifest,
+                    # The NumPy engine is rebuilt from the segment, which holds live chunks only.
+                    "tombstones": self.tombstones if self.use_faiss else set(),
+                    "next_chunk_id": self.next_chunk_id,
+                    "duplicates": self.duplicates,
+                    "facets": self.facets,
+                }
+            self._write_snapshot(staging, version, state)
+            snapshot_dir = self.snapshots.publish(version, staging)
+
+            if id_map is not None:
+                logger.info(f"Compacted {len(self.tombstones)} tombstones; renumbered {len(id_map)} chunks.")
+            # Renumbered ids must never meet the previous chunk store, so everything is swapped in at once.
+            self._attach_segment(snapshot_dir / "segment", **state)
+            if self._scratch_dir is not None:
+                # _attach_segment closed the scratch chunk store it replaced.
+                shutil.rmtree(self._scratch_dir, ignore_errors=True)
+                self._scratch_dir = None
+            self.snapshot_version = version
+            self.update_log = UpdateLog(self.snapshots.wal_path(version))
+            logger.info(f"Published vector store snapshot {version} ({len(self.metadata)} chunks).")
+
+    def _renumbered_state(self, segment_dir: Path, id_map: Dict[int, int]) -> Dict:
+        """Index, lexical index, manifest and facets rebuilt for a segment written with renumbered chunk ids."""
+        manifest = {
+            source_file: [id_map[cid] for cid in chunk_ids if cid in id_map]
+            for source_file, chunk_ids in self.manifest.items()
+        }
+        duplicates = self.duplicates.remapped(id_map)
 
-        if new_embeddings and FAISS_AVAILABLE and self.index is not None:
-            self.index.add_with_ids(np.array(new_embeddings), np.array(new_ids, dtype=np.int64))
+        segment = Segment(segment_dir)
+        try:
+            index = None
+            if self.use_faiss and self.num_shards == 1 and self.index is not None:
+                index = self._index_from_segment(segment)
+
+            lexical_index = BM25Index(self.lexical_index.k1, self.lexical_index.b)
+            rows: Dict[int, int] = {}
+            for row, chunk_id in enumerate(segment.chunk_ids.tolist()):
+                lexical_index.add(chunk_id, segment.text(row))
+                rows[chunk_id] = row
+            # Facet bitmaps are keyed by chunk id, so they are rebuilt from the renumbered manifest.
+            facets = self._facets_for(manifest, self.file_state, duplicates, lambda cid: segment.document(rows[cid]))
+        finally:
+            segment.close()
 
-        logger.info(f"Added {len(new_ids)} new chunks.")
-        self.save_vector_store()
-        return True
+        return {
+            "index": index,
+            "lexical_index": lexical_index,
+            "manifest": manifest,
+            "tombstones": set(),
+            "next_chunk_id": len(id_map),
+            "duplicates": duplicates,
+            "facets": facets,
+        }
 
-    def save_vector_store(self) -> None:
-        """Persist index, metadata, and manifest to disk."""
-        if FAISS_AVAILABLE and self.index is not None:
-            faiss.write_index(self.index, "vector_store/nitkkr_index.faiss")
+    def _write_snapshot(self, directory: Path, version: int, state: Dict) -> None:
+        if self.use_faiss and state["index"] is not None and not isinstance(state["index"], ShardedIndex):
+            faiss.write_index(state["index"], str(directory / "nitkkr_index.faiss"))
+            np.save(directory / "tombstones.npy", np.array(sorted(state["tombstones"]), dtype=np.int64))
 
-        meta_save = {str(k): v for k, v in self.metadata.items()}
-        with open("vector_store/metadata.json", "w", encoding="utf-8") as meta_file:
-            json.dump(meta_save, meta_file)
+        state["lexical_index"].save(directory / "lexical")
+        state["duplicates"].save(directory / "duplicates")
+        self.document_index.save(directory / "documents")
 
-        with open("vector_store/manifest.json", "w", encoding="utf-8") as manifest_file:
-            json.dump(self.manifest, manifest_file, indent=2)
+        with open(directory / "manifest.json", "w", encoding="utf-8") as manifest_file:
+            json.dump(state["manifest"], manifest_file, indent=2)
+
+        with open(directory / "file_state.json", "w", encoding="utf-8") as state_file:
+            json.dump(self.file_state, state_file)
 
         info = {
-            "next_chunk_id": self.next_chunk_id,
+            "version": version,
+            "next_chunk_id": state["next_chunk_id"],
             "model_name": self.model_name,
+            "encoder": self.encoder_name,
+            "embedding_backend": self.backend,
+            "index_type": self.index_type,
+            "metric": self.metric,
+            "vector_storage": self.storage,
             "total_chunks": len(self.metadata),
+            "tombstones": len(state["tombstones"]),
+            "duplicate_chunks": state["duplicates"].duplicate_count,
         }
-        with open("vector_store/model_info.json", "w", encoding="utf-8") as info_file:
+        with open(directory / "model_info.json", "w", encoding="utf-8") as info_file:
             json.dump(info, info_file, indent=2)
 
     def load_vector_store(self) -> bool:
-        """Load FAISS index, metadata dict, and manifest from disk."""
+        """Load the current snapshot (index, memory-mapped chunk segment, manifest) and replay the update log."""
         try:
-            index_path = Path("vector_store/nitkkr_index.faiss")
-            if FAISS_AVAILABLE and index_path.exists():
-                self.index = faiss.read_index(str(index_path))
+            root = self.snapshots.current_dir()
+            version = self.snapshots.current_version()
+            info: Dict = {}
+            info_path = root / "model_info.json"
+            if info_path.exists():
+                with info_path.open("r", encoding="utf-8") as info_file:
+                    info = json.load(info_file)
+                    self.next_chunk_id = info.get("next_chunk_id", 0)
+                    self.metric = info.get("metric", self.metric)
 
-            metadata_path = Path("vector_store/metadata.json")
-            if metadata_path.exists():
+            index_path = root / "nitkkr_index.faiss"
+            tombstones_path = root / "tombstones.npy"
+            if self.use_faiss and self.num_shards == 1 and index_path.exists():
+                self.index = faiss.read_index(str(index_path))
+                apply_search_params(self.index)
+                self.tombstones = set(np.load(tombstones_path).tolist()) if tombstones_path.exists() else set()
+                # Queries must be scored the way the stored index was built, whatever Config says now.
+                self.metric = "cosine" if self.index.metric_type == faiss.METRIC_INNER_PRODUCT else "l2"
+
+            chunk_store = ChunkStore.open(root / "segment")
+            metadata_path = self._legacy_metadata_path()
+            if chunk_store is not None:
+                self._release_segment()
+                self.metadata = chunk_store
+            elif metadata_path.exists():
+                logger.warning("Loading legacy metadata.json; run 'python main.py convert' for faster startup.")
                 with metadata_path.open("r", encoding="utf-8") as meta_file:
                     meta_raw = json.load(meta_file)
-                    self.metadata = {int(k): v for k, v in meta_raw.items()}
+                self._release_segment()
+                self.metadata = ChunkStore()
+                for chunk_id in sorted(int(k) for k in meta_raw):
+                    meta = meta_raw[str(chunk_id)]
+                    self.metadata.add(chunk_id, meta, meta.get("chunk_text", ""))
 
-            manifest_path = Path("vector_store/manifest.json")
+            manifest_path = root / "manifest.json"
             if manifest_path.exists():
                 with manifest_path.open("r", encoding="utf-8") as manifest_file:
                     self.manifest = json.load(manifest_file)
 
-            info_path = Path("vector_store/model_info.json")
-            if info_path.exists():
-                with info_path.open("r", encoding="utf-8") as info_file:
-                    info = json.load(info_file)
-                    self.next_chunk_id = info.get("next_chunk_id", 0)
-
+            state_path = root / "file_state.json"
+            if state_path.exists():
+                with state_path.open("r", encoding="utf-8") as state_file:
+                    self.file_state = json.load(state_file)
+
+            if self.num_shards > 1:
+                if isinstance(self.index, ShardedIndex):
+                    self.index.close()
+                self.index = self._start_shards(root)
+            elif not self.use_faiss and self.metadata.segment is not None:
+                self.index = self._segment_index()
+            elif self.use_faiss and not index_path.exists() and self.metadata.segment is not None:
+                # Snapshots published by a sharded process carry no single-process index.
+                self.index = self._index_from_segment(self.metadata.segment)
+
+            lexical_path = root / "lexical"
+            if (lexical_path / "terms.json").exists():
+                self.lexical_index = BM25Index.load(lexical_path)
+            else:
+                self._rebuild_lexical_index()
+
+            duplicates_path = root / "duplicates"
+            if (duplicates_path / "sources.json").exists():
+                self.duplicates = DuplicateIndex.load(duplicates_path, Config.NEAR_DUPLICATE_MAX_DISTANCE)
+            else:
+                self._rebuild_fingerprints()
+
+            documents_path = root / "documents"
+            if (documents_path / "documents.json").exists():
+                self.document_index = DocumentIndex.load(documents_path)
+                self.facets = self._facets_for(self.manifest, self.file_state, self.duplicates, self.metadata.document)
+            else:
+                self._rebuild_document_index()
+
+            stored_encoder = info.get("encoder", info.get("model_name", self.encoder_name))
+            if stored_encoder != self.encoder_name:
+                logger.error(
+                    f"Vector store was built with '{stored_encoder}' but queries would be encoded with "
+                    f"'{self.encoder_name}'. Dense search is disabled; install the original model or rebuild."
+                )
+                if isinstance(self.index, ShardedIndex):
+                    self.index.close()
+                self.index = None
+
+            self.snapshot_version = version
+            self.update_log = UpdateLog(self.snapshots.wal_path(version)) if version is not None else None
+            if self.update_log is not None:
+                records = self.update_log.read()
+                for record in records:
+                    self._replay_update(record)
+                if records:
+                    logger.info(f"Replayed {len(records)} logged updates on top of snapshot {version}.")
+
+            self.content_version += 1
             return True
         except Exception as exc:
             logger.error(f"Failed to load vector store: {exc}")
             return False
 
-    def search(self, query: str, k: int = 5) -> List[Dict]:
-        """Search using FAISS and retrieve metadata."""
-        if not query.strip():
-            return []
+    def _legacy_metadata_path(self) -> Path:
+        """Where a pre-segment store keeps its chunk metadata; shared by the loader and the converter."""
+        return self.snapshots.current_dir() / "metadata.json"
+
+    def build_segment(self, files: List[str], directory: Path) -> int:
+        """Chunk and encode files into a self-contained segment with local chunk ids 0..n-1.
+
+        Writes ``unit.json`` (partial manifest, file state, encoder) and the unit's near-duplicate
+        fingerprints next to the segment files so merge_segments can combine segments built by
+        independent workers.
+        """
+        def documents() -> Iterator[Dict]:
+            for file_name in files:
+                try:
+                    yield self._load_single_document(Path(file_name))
+                except Exception as exc:
+                    logger.error(f"Error loading {file_name}: {exc}")
+
+        duplicates = DuplicateIndex(Config.NEAR_DUPLICATE_MAX_DISTANCE)
+        manifest, file_state, num_chunks = self._stream_to_segment(documents, directory, duplicates=duplicates)
+        duplicates.save(directory / "duplicates")
+
+        unit = {
+            "num_chunks": num_chunks,
+            "encoder": self.encoder_name,
+            "dimension": self.dimension,
+            "metric": self.metric,
+            "manifest": manifest,
+            "file_state": file_state,
+        }
+        with open(directory / "unit.json", "w", encoding="utf-8") as unit_file:
+            json.dump(unit, unit_file)
+        return num_chunks
+
+    def merge_segments(self, unit_dirs: List[Path], merged_dir: Path) -> int:
+        """Merge segments from build_segment, in order, into one store with global chunk ids and publish it.
+
+        Chunks get global ids in unit order, so the result only depends on the unit order, not on
+        which worker finished first. A chunk that nearly duplicates one from an earlier unit is
+        collapsed into it, as it would have been in a single-process build.
+        """
+        units = []
+        for unit_dir in unit_dirs:
+            with open(unit_dir / "unit.json", "r", encoding="utf-8") as unit_file:
+                unit = json.load(unit_file)
+            if unit["encoder"] != self.encoder_name or unit["dimension"] != self.dimension or unit["metric"] != self.metric:
+                raise ValueError(f"{unit_dir} was built with a different encoder or metric.")
+            units.append((unit_dir, unit))
+
+        # Assign global ids to the chunks that stay; each unit's local ids are its segment rows.
+        duplicates = DuplicateIndex(Config.NEAR_DUPLICATE_MAX_DISTANCE)
+        global_ids: List[Dict[int, int]] = []
+        total = 0
+        for unit_dir, unit in units:
+            unit_duplicates = (
+                DuplicateIndex.load(unit_dir / "duplicates")
+                if (unit_dir / "duplicates" / "sources.json").exists()
+                else DuplicateIndex(Config.NEAR_DUPLICATE_MAX_DISTANCE)
+            )
+            segment = Segment(unit_dir)
+            id_map: Dict[int, int] = {}
+            collapsed_into: Dict[int, int] = {}
+            for row in range(len(segment)):
+                fingerprint = unit_duplicates.fingerprints.get(row)
+                canonical_id = duplicates.find(fingerprint) if fingerprint is not None else None
+                if canonical_id is not None:
+                    collapsed_into[row] = canonical_id
+                    duplicates.add_duplicate(canonical_id, segment.document(row))
+                    continue
+                id_map[row] = total
+                if fingerprint is not None:
+                    duplicates.add(total, fingerprint)
+                total += 1
+            segment.close()
+            for local_id, sources in unit_duplicates.sources.items():
+                for source in sources:
+                    duplicates.add_duplicate(id_map.get(local_id, collapsed_into.get(local_id)), source)
+            global_ids.append(id_map)
+
+        manifest: Dict[str, List[int]] = {}
+        file_state: Dict[str, Dict] = {}
+        writer = SegmentWriter(merged_dir, self.dimension, total)
+        for (unit_dir, unit), id_map in zip(units, global_ids):
+            segment = Segment(unit_dir)
+            for row in range(len(segment)):
+                if row not in id_map:
+                    continue
+                writer.add(
+                    id_map[row],
+                    segment.document(row),
+                    segment.embeddings[row],
+                    compressed=segment.compressed_text(row),
+                    word_count=int(segment.records[row]["word_count"]),
+                )
+            segment.close()
+            for source_file, local_ids in unit["manifest"].items():
+                manifest[source_file] = [id_map[local_id] for local_id in local_ids if local_id in id_map]
+            file_state.update(unit["file_state"])
+        writer.close()
+
+        with self._lock:
+            previous, previous_index = self.metadata, self.index
+            merged = ChunkStore.open(merged_dir)
+            self._publish(
+                metadata=merged,
+                _new_vectors={},
+                manifest=manifest,
+                file_state=file_state,
+                tombstones=set(),
+                duplicates=duplicates,
+                next_chunk_id=total,
+                index=self._index_from_segment(merged.segment) if self.use_faiss else self._segment_index(merged),
+                lexical_index=self._lexical_index_for(merged),
+                document_index=self._document_index_for(manifest, merged),
+                facets=self._facets_for(manifest, file_state, duplicates, merged.document),
+            )
+            previous.close()
+            if isinstance(previous_index, ShardedIndex):
+                previous_index.close()
+            self.save_vector_store(compact=False)
+            merged.close()
+
+        logger.info(f"Merged {len(units)} segments into {total} chunks.")
+        return total
+
+    def convert_legacy_store(self) -> bool:
+        """Rewrite a metadata.json-based store into the segment format."""
+        legacy_path = self._legacy_metadata_path()
+        if not legacy_path.exists():
+            logger.error(f"No legacy {legacy_path} found to convert.")
+            return False
+        if not self.load_vector_store():
+            return False
+        if self.metadata.segment is not None:
+            logger.info("Vector store already uses the segment format.")
+            return True
 
-        if not (self.model and self.index):
+        self.save_vector_store()
+        legacy_path.rename(legacy_path.with_name("metadata.json.bak"))
+        logger.info(f"Converted {len(self.metadata)} chunks; legacy file kept as metadata.json.bak.")
+        return True
+
+    def search(self, query: str, k: int = 5, mode: Optional[str] = None, filters: Optional[Dict] = None) -> List[Dict]:
+        """Search using FAISS (or hybrid BM25 + FAISS) and retrieve metadata."""
+        if not query.strip():
             return []
 
-        query_embedding = self.model.encode(query).astype("float32").reshape(1, -1)
-        scores, indices = self.index.search(query_embedding, k)
+        return self.search_many([query], k, mode, filters)["results"][0]
+
+    def search_many(
+        self, queries: List[str], k: int = 5, mode: Optional[str] = None, filters: Optional[Dict] = None
+    ) -> Dict[str, List]:
+        """Search several queries with one batched encode and a single FAISS call.
+
+        ``mode`` is "dense" or "hybrid" (defaults to Config.SEARCH_MODE); hybrid fuses dense and
+        BM25 candidates with reciprocal rank fusion and reports the fused score as similarity_score.
+
+        ``filters`` restricts results to matching pages, e.g. ``{"url_prefix": "nitkkr.ac.in/cse",
+        "content_type": "pdf", "crawled_after": "2024-01-01"}`` (see facet_index.parse_filters).
+        The filter is applied inside the index search, so up to k matching chunks are returned.
+
+        Returns ``results`` (one hit list per query, aligned with ``queries``) and ``fused``
+        (hits deduplicated by chunk id, keeping each chunk's best score and the query that found it).
+        """
+        parsed = parse_filters(filters)
+        with self._reading():
+            return self._search_many(queries, k, mode, parsed)
+
+    def _search_many(self, queries: List[str], k: int, mode: Optional[str], filters: Dict) -> Dict[str, List]:
+        mode = (mode or Config.SEARCH_MODE).lower()
+        allowed = self.facets.bitmap(filters, self.next_chunk_id) if filters else None
+        per_query: List[List[Dict]] = [[] for _ in queries]
+        active = [i for i, query in enumerate(queries) if query.strip()]
+        texts = [queries[i] for i in active]
+
+        if not active or (self.index is None and mode != "hybrid"):
+            return {"results": per_query, "fused": []}
+
+        dense = self._dense_candidates(texts, k, allowed) if self.index is not None else [[] for _ in texts]
+        if mode == "hybrid":
+            ranked = [
+                self._fuse_hybrid(hits, self.lexical_index.search(text, k, allowed), k) for hits, text in zip(dense, texts)
+            ]
+        else:
+            ranked = [[(idx, score, {}) for idx, score in hits] for hits in dense]
 
-        results: List[Dict] = []
-        for score, idx in zip(scores[0], indices[0]):
-            if idx == -1:
-                continue
-            metadata = self.metadata.get(int(idx))
-            if not metadata:
+        best: Dict[int, Dict] = {}
+        for row, query_pos in enumerate(active):
+            for idx, score, extra in ranked[row]:
+                view = self.metadata.get(idx)
+                if view is None:
+                    continue
+                # Hand out plain dicts; a ChunkView reads from a segment that later writes may replace.
+                item = dict(view)
+                item.update(extra)
+                item["source_urls"] = self.duplicates.source_urls(idx, item["url"])
+                item["similarity_score"] = score
+                item["matched_query"] = queries[query_pos]
+                per_query[query_pos].append(item)
+
+                current = best.get(item["id"])
+                if current is None or item["similarity_score"] > current["similarity_score"]:
+                    best[item["id"]] = item
+
+        fused = sorted(best.values(), key=lambda hit: hit["similarity_score"], reverse=True)
+        return {"results": per_query, "fused": fused}
+
+    def _dense_candidates(
+        self, texts: List[str], k: int, allowed: Optional[np.ndarray] = None
+    ) -> List[List[Tuple[int, float]]]:
+        """Top-k (chunk_id, similarity) per query from the vector index, limited to ``allowed`` chunk ids if given."""
+        query_embeddings = self._prepare_vectors(self._encode_queries(texts))
+        rescore = Config.EXACT_RESCORE_FACTOR > 1
+        fetch_k = k * Config.EXACT_RESCORE_FACTOR if rescore else k
+        if allowed is not None:
+            all_scores, all_indices = self._filtered_search(query_embeddings, fetch_k, allowed)
+        elif Config.TWO_STAGE_SEARCH and len(self.document_index) and not isinstance(self.index, ShardedIndex):
+            all_scores, all_indices = self._two_stage_search(query_embeddings, fetch_k)
+        else:
+            all_scores, all_indices = self._index_search(query_embeddings, fetch_k)
+
+        candidates: List[List[Tuple[int, float]]] = []
+        for row in range(len(texts)):
+            scores, indices = all_scores[row], all_indices[row]
+            if rescore:
+                scores, indices = self._rescore_exact(query_embeddings[row], indices, k)
+            candidates.append(
+                [(int(idx), self._similarity(float(score))) for score, idx in zip(scores, indices) if idx != -1]
+            )
+        return candidates
+
+    def _index_search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Search the vector index, skipping tombstoned chunk ids."""
+        if not self.tombstones:
+            return self.index.search(queries, k)
+
+        # Read the generation first: a change racing with this search then only causes a rebuild next time.
+        key = self.tombstone_generation
+        tombstones = self.tombstones
+        if self._tombstone_params is None or self._tombstone_params[0] != key:
+            excluded = np.fromiter(tombstones, dtype=np.int64, count=len(tombstones))
+            searches_faiss = self.use_faiss and not isinstance(self.index, ShardedIndex)
+            self._tombstone_params = (key, excluded, filter_search_params(self.index, excluded) if searches_faiss else None)
+        _, excluded, params = self._tombstone_params
+
+        if params is None:
+            return self.index.search(queries, k, excluded=excluded)
+        return self.index.search(queries, k, params=params)
+
+    def _filtered_search(self, queries: np.ndarray, k: int, allowed: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Search only chunk ids set in a facet bitmap; bitmaps hold live chunks only, so tombstones drop out too."""
+        if isinstance(self.index, ShardedIndex):
+            return self.index.search(queries, k, allowed=allowed)
+        if isinstance(self.index, NumpyFlatIndex):
+            return self.index.search(queries, k, included=np.flatnonzero(np.unpackbits(allowed, bitorder="little")))
+        return self.index.search(queries, k, params=bitmap_search_params(self.index, allowed))
+
+    def _two_stage_search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Find the TWO_STAGE_DOCUMENTS best documents by centroid, then search only their chunks.
+
+        The manifest lists live chunks only, so tombstoned vectors are never candidates.
+        """
+        scores = np.zeros((len(queries), k), dtype="float32")
+        ids = np.full((len(queries), k), -1, dtype=np.int64)
+        top_documents = self.document_index.search(queries, Config.TWO_STAGE_DOCUMENTS)
+
+        for row, source_files in enumerate(top_documents):
+            candidates = np.array(
+                sorted(cid for source_file in source_files for cid in self.manifest.get(source_file, ())), dtype=np.int64
+            )
+            if not len(candidates):
                 continue
-            item = metadata.copy()
-            item["similarity_score"] = 1.0 / (1.0 + float(score))
-            results.append(item)
-
-        return results
+            query = queries[row : row + 1]
+            if isinstance(self.index, NumpyFlatIndex):
+                found_scores, found_ids = self.index.search(query, k, included=candidates)
+            else:
+                found_scores, found_ids = self.index.search(query, k, params=include_search_params(self.index, candidates))
+            scores[row], ids[row] = found_scores[0], found_ids[0]
+        return scores, ids
+
+    def tombstone_ratio(self) -> float:
+        """Fraction of indexed vectors that belong to deleted chunks."""
+        total = self.index.ntotal if self.index is not None else 0
+        return len(self.tombstones) / total if total else 0.0
+
+    def dedup_ratio(self) -> float:
+        """Fraction of all chunks seen that were collapsed into another chunk's vector."""
+        collapsed = self.duplicates.duplicate_count
+        total = collapsed + len(self.metadata)
+        return collapsed / total if total else 0.0
+
+    def _fuse_hybrid(
+        self, dense: List[Tuple[int, float]], lexical: List[Tuple[int, float]], k: int
+    ) -> List[Tuple[int, float, Dict]]:
+        """Reciprocal rank fusion of dense and BM25 hits, scaled so a chunk ranked first by both scores 1.0."""
+        rrf_k = Config.HYBRID_RRF_K
+        fused: Dict[int, float] = {}
+        extras: Dict[int, Dict] = {}
+
+        for source, hits in (("dense_score", dense), ("bm25_score", lexical)):
+            for rank, (idx, score) in enumerate(hits):
+                fused[idx] = fused.get(idx, 0.0) + 1.0 / (rrf_k + rank + 1)
+                extras.setdefault(idx, {})[source] = score
+
+        scale = 2.0 / (rrf_k + 1)
+        ranked = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(idx, score / scale, extras[idx]) for idx, score in ranked]
+
+    def _rebuild_lexical_index(self) -> None:
+        """Build the BM25 index from stored chunk text (for stores written before it existed)."""
+        self.lexical_index = self._lexical_index_for(self.metadata)
+
+    @staticmethod
+    def _lexical_index_for(chunk_store: ChunkStore) -> BM25Index:
+        lexical_index = BM25Index()
+        if chunk_store:
+            logger.info("Building lexical index from stored chunks...")
+        for chunk_id in sorted(chunk_store):
+            lexical_index.add(chunk_id, chunk_store.text(chunk_id))
+        return lexical_index
+
+    def _rebuild_fingerprints(self) -> None:
+        """Fingerprint stored chunks (for stores written before deduplication) so new chunks collapse into them."""
+        self.duplicates = DuplicateIndex(Config.NEAR_DUPLICATE_MAX_DISTANCE)
+        if not Config.NEAR_DUPLICATE_DEDUP or not self.metadata:
+            return
+        logger.info("Fingerprinting stored chunks for near-duplicate detection...")
+        for chunk_id in sorted(self.metadata):
+            fingerprint = simhash(self.metadata.text(chunk_id))
+            if fingerprint is not None:
+                self.duplicates.add(chunk_id, fingerprint)
+
+    def _similarity(self, score: float) -> float:
+        """Map a raw FAISS score to a similarity: cosine as-is, L2 distance to 1/(1+d)."""
+        if self.metric == "cosine":
+            return score
+        return 1.0 / (1.0 + score)
+
+    def _stored_vector(self, chunk_id: int) -> Optional[np.ndarray]:
+        """Full-precision vector for a chunk, read from the memory-mapped segment or pending updates."""
+        vector = self._new_vectors.get(chunk_id)
+        if vector is None:
+            row = self.metadata.base_row(chunk_id)
+            if row >= 0:
+                vector = self.metadata.segment.embeddings[row]
+        return vector
+
+    def _rescore_exact(self, query: np.ndarray, indices: np.ndarray, k: int):
+        """Re-rank quantized candidates by exact float32 scores and keep the best k."""
+        candidates = [(int(idx), self._stored_vector(int(idx))) for idx in indices if idx != -1]
+        candidates = [(idx, vec) for idx, vec in candidates if vec is not None]
+        if not candidates:
+            return np.empty(0, dtype="float32"), np.empty(0, dtype=np.int64)
+
+        ids = np.array([idx for idx, _ in candidates], dtype=np.int64)
+        vectors = np.stack([vec for _, vec in candidates]).astype("float32")
+        if self.metric == "cosine":
+            exact = vectors @ query
+            order = np.argsort(-exact)[:k]
+        else:
+            exact = ((vectors - query) ** 2).sum(axis=1)
+            order = np.argsort(exact)[:k]
+        return exact[order], ids[order]
 
     def get_stats(self) -> Dict:
         """Return high-level stats for the vector store."""
         total_chunks = len(self.metadata)
-        total_words = sum(len(meta.get("chunk_text", "").split()) for meta in self.metadata.values())
+        total_words = self.metadata.total_words
         avg_chunk_length = total_words / total_chunks if total_chunks else 0.0
 
-        return {
+        stats = {
             "total_chunks": total_chunks,
             "unique_documents": len(self.manifest),
             "total_words": total_words,
             "average_chunk_length": avg_chunk_length,
             "next_chunk_id": self.next_chunk_id,
+            "content_version": self.content_version,
             "model_name": self.model_name,
             "embedding_dimension": self.dimension,
+            "embedding_backend": self.backend,
+            "chunk_store_bytes": self.metadata.memory_bytes(),
+            "index_type": self.index_type,
+            "metric": self.metric,
+            "vector_storage": self.storage,
+            "index_vectors": self.index.ntotal if self.index is not None else 0,
+            "tombstones": len(self.tombstones),
+            "tombstone_ratio": self.tombstone_ratio(),
+            "duplicate_chunks": self.duplicates.duplicate_count,
+            "dedup_ratio": self.dedup_ratio(),
+            "document_centroids": len(self.document_index),
+            "two_stage_search": Config.TWO_STAGE_SEARCH,
+            "filterable_documents": len(self.facets),
+            "lexical_terms": len(self.lexical_index.postings),
+            "search_mode": Config.SEARCH_MODE,
         }
+        if isinstance(self.index, ShardedIndex):
+            stats["shards"] = self.index.get_stats()
+        if self.embedding_cache is not None:
+            stats.update(self.embedding_cache.get_stats())
+        if self.query_cache is not None:
+            stats.update(self.query_cache.get_stats())
+
+        return stats
 
 
 def main() -> None:
     system = VectorEmbeddingSystem()
-    documents = system.load_scraped_data()
-    if not documents:
+    if not system.generate_embeddings():
         logger.error("No documents found. Please run the scraper first.")
         return
 
-    system.generate_embeddings(documents)
     system.save_vector_store()
     stats = system.get_stats()
     logger.info(f"Embedding generation completed. Total chunks: {stats['total_chunks']}")